@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import ast
+import inspect
+
+from ..exceptions import WorkflowTaskExecException
+from .PythonScriptEngine import PythonScriptEngine
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+
+class AsyncScriptEngine(PythonScriptEngine):
+    """
+    A script engine whose scripts may await coroutines at their top level,
+    e.g. the ones of async helpers that are passed in as scripting
+    additions::
+
+        engine = AsyncScriptEngine(scriptingAdditions={'fetch': fetch})
+
+    with a script like::
+
+        response = await fetch(url)
+
+    Scripts that await are run by AsyncBpmnWorkflow.do_engine_steps_async();
+    running them synchronously raises a WorkflowTaskExecException. Scripts
+    that do not await run either way.
+    """
+
+    def compile_script(self, script):
+        """
+        Returns the code object for the given script, which returns a
+        coroutine when it is run if the script awaits.
+        """
+        return self._get_cached(
+            'async_exec', script,
+            lambda: compile(script, '<string>', 'exec',
+                            flags=ast.PyCF_ALLOW_TOP_LEVEL_AWAIT))
+
+    def execute(self, task, script, data, external_methods=None):
+        """
+        Execute the script, within the context of the specified task
+        """
+        context = self._execution_context(data, external_methods)
+        try:
+            result = eval(self.compile_script(script), context, context)
+        except Exception as err:
+            raise self._execution_error(task, script, err)
+        finally:
+            self._convert_touched(context, data)
+        if inspect.iscoroutine(result):
+            result.close()
+            raise WorkflowTaskExecException(
+                task, 'The script awaits, so it has to be run by '
+                      'do_engine_steps_async()')
+
+    async def execute_async(self, task, script, data, external_methods=None):
+        """
+        Execute the script, within the context of the specified task, and
+        await it if it awaits.
+        """
+        context = self._execution_context(data, external_methods)
+        try:
+            result = eval(self.compile_script(script), context, context)
+            if inspect.iscoroutine(result):
+                await result
+        except Exception as err:
+            raise self._execution_error(task, script, err)
+        finally:
+            self._convert_touched(context, data)
@@ -317,15 +317,13 @@ class FeelLikeScriptEngine(PythonScriptEngine):
                 raise Exception("error parsing expression "+text + " " +
                                 str(e))
 
-    def _evaluate(self, expression, external_methods=None, **kwargs):
+    def _evaluation_context(self, data, external_methods=None):
         """
-        Evaluate the given expression, within the context of the given task and
-        return the result.
+        Adds the FEEL functions to the namespace expressions are evaluated in.
         """
-        if external_methods is None:
-            external_methods = {}
-        external_methods.update(externalFuncs)
-        return super()._evaluate(expression,external_methods,**kwargs)
+        methods = dict(external_methods or {})
+        methods.update(externalFuncs)
+        return super()._evaluation_context(data, methods)
 
     def execute(self, task, script, data, external_methods=None):
         """
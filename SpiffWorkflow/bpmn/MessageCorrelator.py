@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+from collections import OrderedDict
+
+from ..task import Task
+from .specs.event_definitions import MessageEventDefinition
+
+
+class MessageCorrelator(object):
+    """
+    Routes messages to the right one of many workflows, without asking each
+    workflow whether it is waiting for the message, e.g.::
+
+        correlator = MessageCorrelator(load_workflow, save_workflow)
+        for workflow_id, summary in stored_summaries:
+            correlator.add_summary(workflow_id, summary)
+        correlator.correlate('Payment', payload, correlation_key=order_id)
+
+    The correlator indexes the tasks that wait for a message by the message
+    (its id as well as its name) and by their correlation key, which is
+    evaluated from the correlation properties of the message. Workflows are
+    either added as they are, or as the summary that get_summary() returns,
+    which can be stored alongside the serialized workflow. In the latter
+    case, the workflow is only loaded when a message is routed to it.
+    """
+
+    def __init__(self, load_workflow=None, save_workflow=None):
+        """
+        Constructor.
+
+        :param load_workflow: a function that returns the workflow with the
+          given id; required for workflows that were added as a summary.
+        :param save_workflow: a function that is called with the id and the
+          workflow after a message was routed to a workflow that was added
+          as a summary (optional).
+        """
+        self.load_workflow = load_workflow
+        self.save_workflow = save_workflow
+        self._index = {}
+        self._workflows = {}
+        self._entries = {}
+
+    @staticmethod
+    def get_summary(workflow):
+        """
+        Returns a list with the messages that the given workflow is waiting
+        for, which can be serialized as JSON as long as the correlation keys
+        can.
+        """
+        summary = []
+        for task in workflow.get_tasks(Task.WAITING):
+            event_definition = getattr(task.task_spec, 'event_definition',
+                                       None)
+            if not isinstance(event_definition, MessageEventDefinition):
+                continue
+            summary.append({
+                'message': event_definition.message,
+                'name': event_definition.name,
+                'correlation_key':
+                    event_definition.get_correlation_key(task),
+                'task_id': str(task.id),
+            })
+        return summary
+
+    def add_workflow(self, workflow_id, workflow):
+        """
+        Adds the given workflow, or updates it after it changed.
+        """
+        self.add_summary(workflow_id, self.get_summary(workflow))
+        self._workflows[workflow_id] = workflow
+
+    def add_summary(self, workflow_id, summary):
+        """
+        Adds the workflow with the given id by the summary that
+        get_summary() returned for it, or updates it.
+        """
+        self.remove(workflow_id)
+        entries = []
+        for waiting in summary:
+            for message in (waiting['message'], waiting['name']):
+                if not message:
+                    continue
+                entries.append((message, None))
+                if waiting['correlation_key'] is not None:
+                    entries.append((message, waiting['correlation_key']))
+        for entry in entries:
+            self._index.setdefault(entry, OrderedDict())[workflow_id] = None
+        self._entries[workflow_id] = entries
+
+    def remove(self, workflow_id):
+        """
+        Removes the workflow with the given id, if it was added.
+        """
+        self._workflows.pop(workflow_id, None)
+        for entry in self._entries.pop(workflow_id, []):
+            workflow_ids = self._index.get(entry)
+            if workflow_ids is None:
+                continue
+            workflow_ids.pop(workflow_id, None)
+            if not workflow_ids:
+                del self._index[entry]
+
+    def get_workflow_ids(self, message_name, correlation_key=None):
+        """
+        Returns the ids of the workflows that wait for the given message
+        (its id or its name), in the order they were added. If a
+        correlation key is given, only the workflows that wait for the
+        message with this correlation key are returned.
+        """
+        return list(self._index.get((message_name, correlation_key), []))
+
+    def correlate(self, message_name, payload, result_var=None,
+                  correlation_key=None):
+        """
+        Sends the given message to the first workflow that waits for it and
+        updates the index of that workflow. Returns the id of the workflow,
+        or None if no workflow is waiting for the message.
+        """
+        for workflow_id in self.get_workflow_ids(message_name,
+                                                 correlation_key):
+            workflow = self._workflows.get(workflow_id)
+            needs_load = workflow is None
+            if needs_load:
+                workflow = self.load_workflow(workflow_id)
+            received = workflow.message(message_name, payload, result_var,
+                                        correlation_key=correlation_key)
+            if not needs_load:
+                self.add_workflow(workflow_id, workflow)
+                if received:
+                    return workflow_id
+                continue
+            # The summary was stale if the message was not received.
+            if received and self.save_workflow is not None:
+                self.save_workflow(workflow_id, workflow)
+            self.add_summary(workflow_id, self.get_summary(workflow))
+            if received:
+                return workflow_id
+        return None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, workflow_id):
+        return workflow_id in self._entries
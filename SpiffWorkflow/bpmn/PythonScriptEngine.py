@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 import copy
-import sys
 import traceback
 from builtins import object
 import ast
 import datetime
+from collections import OrderedDict, namedtuple
 from datetime import timedelta
 from decimal import Decimal
+from threading import Lock
 
 import dateparser
 import pytz
@@ -92,6 +93,142 @@ class Box(dict):
         del self.__dict__[key]
 
 
+class EvaluationContext(dict):
+    """
+    The namespace an expression is evaluated in. Names are looked up in the
+    task data first, then in the given namespaces, such as the external
+    methods and the globals of the script engine; none of them are copied or
+    changed. Dictionaries from the task data are wrapped in a Box when they
+    are first used.
+    """
+
+    def __init__(self, data, *namespaces):
+        super(EvaluationContext, self).__init__()
+        self._data = data
+        self._namespaces = namespaces
+        self._locals = {}
+
+    def __getitem__(self, key):
+        if key in self._locals:
+            return self._locals[key]
+        if key in self._data:
+            value = self._data[key]
+            if isinstance(value, dict):
+                value = self._locals[key] = Box(value)
+            return value
+        for namespace in self._namespaces:
+            if key in namespace:
+                return namespace[key]
+        # The builtins, which eval() adds to the dict itself.
+        return super(EvaluationContext, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._locals[key] = value
+
+    def __contains__(self, key):
+        return key in self._locals or key in self._data or \
+            any(key in namespace for namespace in self._namespaces) or \
+            super(EvaluationContext, self).__contains__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class ExecutionContext(dict):
+    """
+    The namespace a script is executed in. Unlike the EvaluationContext it
+    holds a private copy of the engine globals, and it reads and writes the
+    task data in place. Containers from the task data are converted to Boxes
+    only when the script first uses them; the names that were touched are
+    kept in self.touched, so that only those need converting back.
+    """
+
+    def __init__(self, data, convert, *args, **kwargs):
+        super(ExecutionContext, self).__init__(*args, **kwargs)
+        self._data = data
+        self._convert = convert
+        self.touched = set()
+
+    def __getitem__(self, key):
+        if key not in self._data:
+            return super(ExecutionContext, self).__getitem__(key)
+        value = self._data[key]
+        if key not in self.touched and isinstance(value, (dict, list)):
+            value = self._data[key] = self._convert(value)
+            self.touched.add(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self.touched.add(key)
+
+    def __delitem__(self, key):
+        if key in self._data:
+            del self._data[key]
+            self.touched.discard(key)
+        else:
+            super(ExecutionContext, self).__delitem__(key)
+
+    def __contains__(self, key):
+        return key in self._data or \
+            super(ExecutionContext, self).__contains__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class CodeCache(object):
+    """
+    A bounded cache that keeps the most recently used compiled expressions
+    and scripts, so that evaluating the same text again skips parsing and
+    compiling it.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, create):
+        """
+        Returns the cached value for the given key, calling create() to
+        build it if it is not in the cache.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+        value = create()
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._items))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 default_header = """
 
 
@@ -108,8 +245,20 @@ class PythonScriptEngine(object):
     If you are uncomfortable with the use of eval() and exec, then you should
     provide a specialised subclass that parses and executes the scripts /
     expressions in a mini-language of your own.
+
+    Compiled expressions and scripts are kept in code_cache, which is shared
+    by all engines and keyed by the engine class and the source text. Set it
+    to None in a subclass whose validate_expression() depends on the state
+    of the engine instance.
+
+    Expressions are evaluated in an EvaluationContext that reads the task
+    data in place. Set copy_context to True to evaluate them in a boxed copy
+    of the data instead.
     """
 
+    code_cache = CodeCache()
+    copy_context = False
+
     def __init__(self, scriptingAdditions=None):
         if scriptingAdditions is None:
             scriptingAdditions = {}
@@ -140,6 +289,31 @@ class PythonScriptEngine(object):
                 raise Exception("error parsing expression " + text + " " +
                                 str(e))
 
+    def _get_cached(self, kind, text, create):
+        if self.code_cache is None:
+            return create()
+        return self.code_cache.get((self.__class__, kind, text), create)
+
+    def _validate_expression(self, text):
+        return self._get_cached('validate', text,
+                                lambda: self.validate_expression(text))
+
+    def compile_expression(self, expression):
+        """
+        Returns the code object for the given expression.
+        """
+        def create():
+            text, valid = self.validate_expression(expression)
+            return compile(text, '<string>', 'eval')
+        return self._get_cached('eval', expression, create)
+
+    def compile_script(self, script):
+        """
+        Returns the code object for the given script.
+        """
+        return self._get_cached(
+            'exec', script, lambda: compile(script, '<string>', 'exec'))
+
     def eval_dmn_expression(self, inputExpr, matchExpr, **kwargs):
         """
         Here we need to handle a few things such as if it is an equality or if
@@ -155,7 +329,7 @@ class PythonScriptEngine(object):
             nolhs = True
             matchExpr = matchExpr.replace('?', 'dmninputexpr')
 
-        rhs, needsEquals = self.validate_expression(matchExpr)
+        rhs, needsEquals = self._validate_expression(matchExpr)
 
         extra = {
             'datetime': datetime,
@@ -164,7 +338,7 @@ class PythonScriptEngine(object):
             'Box': Box
         }
 
-        lhs, lhsNeedsEquals = self.validate_expression(inputExpr)
+        lhs, lhsNeedsEquals = self._validate_expression(inputExpr)
         if not lhsNeedsEquals:
             raise WorkflowException(
                 "Input Expression '%s' is malformed" % inputExpr)
@@ -196,7 +370,7 @@ class PythonScriptEngine(object):
                 # expression judging from the contents of operators.py
                 return expression._matches(task)
             else:
-                return self._evaluate(expression, **task.data)
+                return self._evaluate_data(expression, task.data_view)
         except Exception as e:
             raise WorkflowTaskExecException(task,
                                             "Error evaluating expression "
@@ -208,20 +382,31 @@ class PythonScriptEngine(object):
         Evaluate the given expression, within the context of the given task and
         return the result.
         """
-        if external_methods is None:
-            external_methods = {}
+        return self._evaluate_data(expression, kwargs, external_methods)
 
-        expression, valid = self.validate_expression(expression)
-        lcls = {}
-        lcls.update(kwargs)
-        globals = copy.copy(self.globals)  # else we pollute all later evals.
-        for x in lcls.keys():
-            if isinstance(lcls[x], dict):
-                lcls[x] = Box(lcls[x])
-        globals.update(lcls)
-        globals.update(external_methods)
-        return eval(expression, globals, lcls)
+    def _evaluate_data(self, expression, data, external_methods=None):
+        """
+        Evaluate the given expression over the given mapping of data, which
+        is neither copied nor changed, and return the result.
+        """
+        code = self.compile_expression(expression)
+        context = self._evaluation_context(data, external_methods)
+        return eval(code, context, context)
 
+    def _evaluation_context(self, data, external_methods=None):
+        """
+        Returns the namespace that expressions over the given data are
+        evaluated in, so that it can be reused for several expressions.
+        """
+        if external_methods is None:
+            external_methods = {}
+        if not self.copy_context:
+            return EvaluationContext(data, external_methods, self.globals)
+        context = copy.copy(self.globals)  # else we pollute all later evals.
+        context.update(external_methods)
+        for key, value in data.items():
+            context[key] = Box(value) if isinstance(value, dict) else value
+        return context
 
     def convertToBoxSub(self, data):
         if isinstance(data, list):
@@ -254,35 +439,54 @@ class PythonScriptEngine(object):
         """
         Execute the script, within the context of the specified task
         """
-        if external_methods is None:
-            external_methods = {}
-        globals = self.globals
-
-        self.convertToBox(data)
-        # data.update({'task':task}) # one of our legacy tests is looking at task.
-        # this may cause a problem down the road if we
-        # actually have a variable named 'task'
-        globals.update(
-            data)  # dict comprehensions cause problems when the variables are not viable.
-        globals.update(external_methods)
+        context = self._execution_context(data, external_methods)
         try:
-            exec(script, globals, data)
+            exec(self.compile_script(script), context, context)
         except Exception as err:
-            if len(err.args) > 0:
-                detail = err.args[0]
-            else:
-                detail = err.__class__.__name__
-            line_number = 0
-            error_line = ''
-            cl, exc, tb = sys.exc_info()
-            # Loop back through the stack trace to find the file called
-            # 'string' - which is the script we are executing, then use that
-            # to parse and pull out the offending line.
-            for frameSummary in traceback.extract_tb(tb):
-                if frameSummary.filename == '<string>':
-                    line_number = frameSummary.lineno
-                    error_line = script.splitlines()[line_number - 1]
-            raise WorkflowTaskExecException(task, detail, err, line_number,
-                                            error_line)
-        self.convertFromBox(data)
+            raise self._execution_error(task, script, err)
+        finally:
+            self._convert_touched(context, data)
+
+    async def execute_async(self, task, script, data, external_methods=None):
+        """
+        Execute the script, within the context of the specified task. The
+        script is run synchronously, see AsyncScriptEngine for scripts that
+        await.
+        """
+        self.execute(task, script, data, external_methods=external_methods)
+
+    def _execution_context(self, data, external_methods=None):
+        if external_methods is None:
+            external_methods = {}
+        # The globals are copied so that neither the task data nor the
+        # external methods leak into later executions.
+        return ExecutionContext(data, self.convertToBoxSub, self.globals,
+                                **external_methods)
+
+    def _convert_touched(self, context, data):
+        for key in context.touched:
+            if key in data:
+                data[key] = self.convertFromBoxSub(data[key])
+
+    def _execution_error(self, task, script, err):
+        """
+        Returns the WorkflowTaskExecException for the given error that was
+        raised by the script, pointing to the line of the script that raised
+        it.
+        """
+        if len(err.args) > 0:
+            detail = err.args[0]
+        else:
+            detail = err.__class__.__name__
+        line_number = 0
+        error_line = ''
+        # Loop back through the stack trace to find the file called
+        # 'string' - which is the script we are executing, then use that
+        # to parse and pull out the offending line.
+        for frameSummary in traceback.extract_tb(err.__traceback__):
+            if frameSummary.filename == '<string>':
+                line_number = frameSummary.lineno
+                error_line = script.splitlines()[line_number - 1]
+        return WorkflowTaskExecException(task, detail, err, line_number,
+                                         error_line)
 
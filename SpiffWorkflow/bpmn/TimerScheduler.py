@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+import heapq
+import itertools
+import time
+
+
+class TimerScheduler(object):
+    """
+    Keeps many workflows ordered by the due time of their earliest timer, so
+    that a service can sleep until the next timer is due and then refresh
+    only the workflows whose timers are due, e.g.::
+
+        scheduler = TimerScheduler()
+        for workflow in workflows:
+            scheduler.schedule(workflow)
+        while True:
+            due_time = scheduler.get_next_due_time()
+            if due_time is None:
+                break
+            time.sleep(max(0, due_time - time.time()))
+            scheduler.run_due_workflows()
+
+    A workflow has to be scheduled again whenever its timers may have
+    changed, e.g. after completing one of its tasks.
+    """
+
+    def __init__(self):
+        # A heap of [due time, sequence number, workflow] entries; the
+        # workflow of an entry is set to None once it is outdated.
+        self._heap = []
+        self._entries = {}
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, workflow):
+        return workflow in self._entries
+
+    def schedule(self, workflow):
+        """
+        Schedules the workflow at the due time of its earliest timer, or
+        removes it if it does not wait for any timer. Returns the due time.
+        """
+        self.unschedule(workflow)
+        due_time = workflow.get_next_due_time()
+        if due_time is not None:
+            entry = [due_time, next(self._sequence), workflow]
+            self._entries[workflow] = entry
+            heapq.heappush(self._heap, entry)
+        return due_time
+
+    def unschedule(self, workflow):
+        """
+        Removes the workflow from the scheduler, if it is scheduled.
+        """
+        entry = self._entries.pop(workflow, None)
+        if entry is not None:
+            entry[2] = None
+
+    def get_next_due_time(self):
+        """
+        Returns the time (as a timestamp) at which the earliest timer of the
+        scheduled workflows is due, or None if no workflow is scheduled.
+        """
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due_workflows(self, now=None):
+        """
+        Removes the workflows whose earliest timer is due at the given time
+        (now by default) from the scheduler and returns them, earliest first.
+        """
+        if now is None:
+            now = time.time()
+        workflows = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, sequence, workflow = heapq.heappop(self._heap)
+            if workflow is not None:
+                del self._entries[workflow]
+                workflows.append(workflow)
+        return workflows
+
+    def run_due_workflows(self, now=None):
+        """
+        Refreshes the due tasks of the workflows whose timers are due and
+        runs their engine steps, then schedules them again. Returns the
+        workflows.
+        """
+        workflows = self.pop_due_workflows(now)
+        for workflow in workflows:
+            workflow.refresh_due_tasks()
+            workflow.do_engine_steps()
+            self.schedule(workflow)
+        return workflows
@@ -19,6 +19,7 @@ from builtins import object
 # 02110-1301  USA
 
 import glob
+from io import BytesIO
 from ..workflow import BpmnWorkflow
 from .ValidationException import ValidationException
 from ..specs.BoundaryEvent import BoundaryEvent
@@ -34,6 +35,8 @@ from ..specs.ScriptTask import ScriptTask
 from ..specs.StartEvent import StartEvent
 from ..specs.UserTask import UserTask
 from ..specs.EndEvent import EndEvent
+from .ElementIndex import ElementIndex
+from .SpecCache import SpecCache
 from .ProcessParser import ProcessParser
 from .util import full_tag, xpath_eval, first
 from .task_parsers import (StartEventParser, EndEventParser, UserTaskParser,
@@ -85,12 +88,29 @@ class BpmnParser(object):
     PROCESS_PARSER_CLASS = ProcessParser
     WORKFLOW_CLASS = BpmnWorkflow
 
-    def __init__(self):
+    def __init__(self, spec_cache=None, executor=None):
         """
         Constructor.
+
+        :param spec_cache: Optionally, a SpecCache to load the specs of the
+          processes in BPMN files from, instead of parsing the files. Files
+          whose processes are all found in the cache are not parsed at all,
+          so their ProcessParsers only exist once a spec has to be parsed.
+        :param executor: Optionally, a concurrent.futures.Executor (e.g. a
+          ProcessPoolExecutor) to validate the BPMN and DMN files on, and to
+          build the specs that get_specs() returns on. The files are then
+          only parsed in this process when a spec is built here. This
+          requires a parser class that can be constructed without arguments.
         """
         self.process_parsers = {}
         self.process_parsers_by_name = {}
+        self.spec_cache = spec_cache
+        self.executor = executor
+        self._process_summaries = {}
+        self._process_ids_by_name = {}
+        self._bpmn_contents = {}
+        self._unparsed_bpmn = {}
+        self._cached_specs = {}
 
     def _get_parser_class(self, tag):
         if tag in self.OVERRIDE_PARSER_CLASSES:
@@ -104,6 +124,13 @@ class BpmnParser(object):
         Returns the ProcessParser for the given process ID or name. It matches
         by name first.
         """
+        process_id = self._get_process_id(process_id_or_name)
+        if process_id is not None:
+            filename = self._process_summaries[process_id]['filename']
+            if filename in self._unparsed_bpmn:
+                self.add_bpmn_xml(
+                    etree.parse(BytesIO(self._unparsed_bpmn.pop(filename))),
+                    filename=filename)
         if process_id_or_name in self.process_parsers_by_name:
             return self.process_parsers_by_name[process_id_or_name]
         else:
@@ -126,6 +153,9 @@ class BpmnParser(object):
         """
         Add all filenames in the given list to the parser's set.
         """
+        if self.spec_cache is not None or self.executor is not None:
+            self._add_lazy_bpmn_files(filenames)
+            return
         for filename in filenames:
             f = open(filename, 'r')
             try:
@@ -133,6 +163,144 @@ class BpmnParser(object):
             finally:
                 f.close()
 
+    def _add_lazy_bpmn_files(self, filenames):
+        # The summaries of the processes of each file are loaded from the
+        # spec cache, or made on the executor, or made by parsing the file
+        # here. Only the files parsed here are added right away.
+        loaded = []
+        for filename in filenames:
+            with open(filename, 'rb') as f:
+                content = f.read()
+            digest = SpecCache.get_digest(content)
+            summaries = future = None
+            if self.spec_cache is not None:
+                summaries = self.spec_cache.load(
+                    'summary', self._get_cache_key(['summary', digest]))
+            if summaries is None and self.executor is not None:
+                future = self.executor.submit(
+                    _summarize_bpmn_file, type(self), content, filename)
+            loaded.append((filename, content, digest, summaries, future))
+
+        for filename, content, digest, summaries, future in loaded:
+            cached = summaries is not None
+            bpmn = None
+            if future is not None:
+                summaries = future.result()
+            if summaries is None:
+                bpmn = etree.parse(BytesIO(content))
+                summaries = [self._summarize_process(node)
+                             for node in xpath_eval(bpmn)('.//bpmn:process')]
+            self._check_process_summaries(summaries, filename)
+            if bpmn is None:
+                self._unparsed_bpmn[filename] = content
+            else:
+                self.add_bpmn_xml(bpmn, filename=filename)
+            if self.spec_cache is not None and not cached:
+                self.spec_cache.store(
+                    'summary', self._get_cache_key(['summary', digest]),
+                    summaries)
+            self._bpmn_contents[filename] = content
+            for summary in summaries:
+                summary = dict(summary, filename=filename, digest=digest)
+                self._process_summaries[summary['id']] = summary
+                self._process_ids_by_name[summary['name']] = summary['id']
+
+    def _summarize_process(self, node):
+        """
+        Returns what has to be known about the given process node without
+        parsing it: its ID and name, and the processes it calls.
+        """
+        called = [call.get('calledElement')
+                  for call in xpath_eval(node)('.//bpmn:callActivity')
+                  if call.get('calledElement')]
+        return {'id': node.get('id'),
+                'name': node.get('name', default=node.get('id')),
+                'called': called}
+
+    def _check_process_summaries(self, summaries, filename):
+        ids = set()
+        names = set()
+        for summary in summaries:
+            if (summary['id'] in ids or
+                    summary['id'] in self.process_parsers or
+                    summary['id'] in self._process_summaries):
+                raise ValidationException(
+                    'Duplicate process ID', filename=filename)
+            if (summary['name'] in names or
+                    summary['name'] in self.process_parsers_by_name or
+                    summary['name'] in self._process_ids_by_name):
+                raise ValidationException(
+                    'Duplicate process name', filename=filename)
+            ids.add(summary['id'])
+            names.add(summary['name'])
+
+    def _check_duplicate_ids(self, index, filename):
+        # do a check on our bpmn to ensure that no id appears twice
+        # this *should* be taken care of by our modeler - so this test
+        # should never fail.
+        if index.duplicate_ids:
+            node = index.duplicate_ids[0]
+            raise ValidationException(
+                'The bpmn document should have no repeating ids but (%s) repeats'%node.get('id'),
+                node=node,
+                filename=filename)
+
+    def _get_process_id(self, process_id_or_name):
+        # Returns the ID of a process that came from a file added with a
+        # spec cache or an executor, or None.
+        if process_id_or_name in self._process_ids_by_name:
+            return self._process_ids_by_name[process_id_or_name]
+        if process_id_or_name in self._process_summaries:
+            return process_id_or_name
+        return None
+
+    def _get_cache_key(self, parts):
+        return SpecCache.get_key(
+            [type(self).__module__, type(self).__name__] + parts)
+
+    def _get_spec_key_parts(self, process_id, seen):
+        """
+        Returns the strings that identify the content the spec of the given
+        process is built from, or None if it cannot be cached.
+        """
+        summary = self._process_summaries.get(process_id)
+        if summary is None or process_id in seen:
+            return None
+        seen = seen | set([process_id])
+        parts = [process_id, summary['digest']]
+        for called in summary['called']:
+            called_parts = self._get_spec_key_parts(
+                self._get_process_id(called), seen)
+            if called_parts is None:
+                return None
+            parts.extend(called_parts)
+        return parts
+
+    def _get_worker_state(self, process_id):
+        """
+        Returns what an executor needs to build the spec of the given
+        process: the summaries, and the files of the process and of the
+        processes it calls.
+        """
+        filenames = set()
+        pending = [process_id]
+        while pending:
+            summary = self._process_summaries[pending.pop()]
+            if summary['filename'] not in filenames:
+                filenames.add(summary['filename'])
+                pending.extend(self._get_process_id(called)
+                               for called in summary['called'])
+        return {'summaries': self._process_summaries,
+                'bpmn': dict((filename, self._bpmn_contents[filename])
+                             for filename in filenames)}
+
+    def _set_worker_state(self, state):
+        self._process_summaries = state['summaries']
+        self._process_ids_by_name = dict(
+            (summary['name'], summary['id'])
+            for summary in state['summaries'].values())
+        self._unparsed_bpmn = state['bpmn']
+
     def add_bpmn_xml(self, bpmn, svg=None, filename=None):
         """
         Add the given lxml representation of the BPMN file to the parser's set.
@@ -142,25 +310,14 @@ class BpmnParser(object):
         :param filename: Optionally, provide the source filename.
         """
         xpath = xpath_eval(bpmn)
-        # do a check on our bpmn to ensure that no id appears twice
-        # this *should* be taken care of by our modeler - so this test
-        # should never fail.
-        ids = [x for x in xpath('.//bpmn:*[@id]')]
-        foundids = {}
-        for node in ids:
-            id = node.get('id')
-            if foundids.get(id,None) is not None:
-                raise ValidationException(
-                    'The bpmn document should have no repeating ids but (%s) repeats'%id,
-                    node=node,
-                    filename=filename)
-            else:
-                foundids[id] = 1
+        index = ElementIndex(bpmn)
+        self._check_duplicate_ids(index, filename)
 
-        processes = xpath('.//bpmn:process')
+        processes = index.get_by_tag(full_tag('process'))
         for process in processes:
             process_parser = self.PROCESS_PARSER_CLASS(
-                self, process, svg, filename=filename, doc_xpath=xpath)
+                self, process, svg, filename=filename, doc_xpath=xpath,
+                doc_index=index)
             if process_parser.get_id() in self.process_parsers:
                 raise ValidationException(
                     'Duplicate process ID', node=process, filename=filename)
@@ -221,5 +378,95 @@ class BpmnParser(object):
         Parses the required subset of the BPMN files, in order to provide an
         instance of BpmnProcessSpec (i.e. WorkflowSpec)
         for the given process ID or name. The Name is matched first.
+
+        With a spec cache, the spec is loaded from the cache unless one of
+        the files it is built from has changed since it was stored.
         """
-        return self.get_process_parser(process_id_or_name).get_spec()
+        process_id = self._get_process_id(process_id_or_name)
+        if process_id is None:
+            return self.get_process_parser(process_id_or_name).get_spec()
+        if process_id in self._cached_specs:
+            return self._cached_specs[process_id]
+        parts = self._get_spec_key_parts(process_id, set())
+        if parts is None:
+            return self.get_process_parser(process_id).get_spec()
+        spec = self._load_spec(parts)
+        if spec is None:
+            spec = self.get_process_parser(process_id).get_spec()
+            self._store_spec(parts, spec)
+        self._cached_specs[process_id] = spec
+        return spec
+
+    def get_specs(self, process_ids_or_names):
+        """
+        Returns a dictionary of the specs of the given processes, by the
+        given process IDs or names (see get_spec()). With an executor, the
+        specs that are not in the spec cache are built on it at the same
+        time; specs that need processes or decisions that were not added
+        from files are built here.
+        """
+        futures = {}
+        if self.executor is not None:
+            for process_id_or_name in process_ids_or_names:
+                process_id = self._get_process_id(process_id_or_name)
+                if (process_id is None or process_id in futures or
+                        process_id in self._cached_specs):
+                    continue
+                parts = self._get_spec_key_parts(process_id, set())
+                if parts is None or self._load_spec(parts) is not None:
+                    continue
+                futures[process_id] = (parts, self.executor.submit(
+                    _build_spec, type(self),
+                    self._get_worker_state(process_id), process_id))
+        for process_id, (parts, future) in futures.items():
+            spec = future.result()
+            if spec is not None:
+                self._store_spec(parts, spec)
+                self._cached_specs[process_id] = spec
+        return dict((process_id_or_name, self.get_spec(process_id_or_name))
+                    for process_id_or_name in process_ids_or_names)
+
+    def _load_spec(self, parts):
+        if self.spec_cache is None:
+            return None
+        return self.spec_cache.load('spec', self._get_cache_key(
+            ['spec'] + parts))
+
+    def _store_spec(self, parts, spec):
+        if self.spec_cache is not None:
+            self.spec_cache.store('spec', self._get_cache_key(
+                ['spec'] + parts), spec)
+
+
+# The errors of invalid files. The jobs of the executor of a parser return
+# None when they run into one of them, and the parser does the job again,
+# so that it raises the error the way it does without an executor (the
+# errors refer to lxml elements, which cannot be pickled).
+_FILE_ERRORS = (etree.LxmlError, ValidationException)
+
+
+def _summarize_bpmn_file(parser_class, content, filename):
+    # Runs on the executor of a parser: validates the file the way
+    # add_bpmn_xml() does, without parsing its processes, and returns the
+    # summaries of its processes.
+    parser = parser_class()
+    try:
+        index = ElementIndex(etree.parse(BytesIO(content)))
+        parser._check_duplicate_ids(index, filename)
+        summaries = [parser._summarize_process(node)
+                     for node in index.get_by_tag(full_tag('process'))]
+        parser._check_process_summaries(summaries, filename)
+    except _FILE_ERRORS:
+        return None
+    return summaries
+
+
+def _build_spec(parser_class, state, process_id):
+    # Runs on the executor of a parser: builds the spec of the given process
+    # out of the files it needs.
+    parser = parser_class()
+    parser._set_worker_state(state)
+    try:
+        return parser.get_spec(process_id)
+    except _FILE_ERRORS:
+        return None
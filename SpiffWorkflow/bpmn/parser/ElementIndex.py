@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from .util import BPMN_MODEL_NS, full_tag
+
+
+class ElementIndex(object):
+    """
+    Looks up the elements of a BPMN document by ID, by tag, and by the
+    sourceRef and attachedToRef attributes. The document is walked once when
+    the index is built, so that the parsers do not have to search the whole
+    document for each task they parse.
+
+    Only the elements in the BPMN namespace are indexed by ID and attribute,
+    and the root element itself is not indexed at all. The elements of each
+    lookup are kept in document order.
+    """
+
+    def __init__(self, node):
+        """
+        Constructor.
+
+        :param node: the XML node of the document, or an lxml ElementTree
+        """
+        if hasattr(node, 'getroot'):
+            node = node.getroot()
+        self.by_id = {}
+        self.by_tag = {}
+        self.by_source_ref = {}
+        self.by_attached_to_ref = {}
+        self.duplicate_ids = []
+        bpmn_prefix = '{%s}' % BPMN_MODEL_NS
+        for element in node.iterdescendants():
+            tag = element.tag
+            if not isinstance(tag, str):
+                # Comments and processing instructions.
+                continue
+            self.by_tag.setdefault(tag, []).append(element)
+            if not tag.startswith(bpmn_prefix):
+                continue
+            attrib = element.attrib
+            element_id = attrib.get('id')
+            if element_id is not None:
+                if element_id in self.by_id:
+                    self.duplicate_ids.append(element)
+                self.by_id.setdefault(element_id, []).append(element)
+            if 'sourceRef' in attrib:
+                self.by_source_ref.setdefault(
+                    attrib['sourceRef'], []).append(element)
+            if 'attachedToRef' in attrib:
+                self.by_attached_to_ref.setdefault(
+                    attrib['attachedToRef'], []).append(element)
+
+    @staticmethod
+    def _filter(elements, tag):
+        if tag is None:
+            return list(elements)
+        tag = full_tag(tag)
+        return [element for element in elements if element.tag == tag]
+
+    def get_by_id(self, element_id, tag=None):
+        """
+        Returns the BPMN elements with the given ID, optionally only those
+        with the given BPMN tag (e.g. 'escalation').
+        """
+        return self._filter(self.by_id.get(element_id, ()), tag)
+
+    def get_by_tag(self, tag):
+        """
+        Returns the elements with the given full tag (including the
+        namespace).
+        """
+        return list(self.by_tag.get(tag, ()))
+
+    def get_by_source_ref(self, source_ref, tag=None):
+        """
+        Returns the BPMN elements (e.g. sequence flows) whose sourceRef is
+        the given ID, optionally only those with the given BPMN tag.
+        """
+        return self._filter(self.by_source_ref.get(source_ref, ()), tag)
+
+    def get_by_attached_to_ref(self, attached_to_ref, tag=None):
+        """
+        Returns the BPMN elements (i.e. boundary events) whose attachedToRef
+        is the given ID, optionally only those with the given BPMN tag.
+        """
+        return self._filter(
+            self.by_attached_to_ref.get(attached_to_ref, ()), tag)
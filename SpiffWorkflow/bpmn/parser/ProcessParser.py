@@ -20,7 +20,9 @@ from builtins import object
 
 from .ValidationException import ValidationException
 from ..specs.BpmnProcessSpec import BpmnProcessSpec
-from .util import xpath_eval, DIAG_COMMON_NS
+from .ElementIndex import ElementIndex
+from .util import (xpath_eval, full_tag, DIAG_COMMON_NS,
+                   DIAG_INTERCHANGE_NS)
 
 
 class ProcessParser(object):
@@ -29,7 +31,8 @@ class ProcessParser(object):
     process.
     """
 
-    def __init__(self, p, node, svg=None, filename=None, doc_xpath=None):
+    def __init__(self, p, node, svg=None, filename=None, doc_xpath=None,
+                 doc_index=None):
         """
         Constructor.
 
@@ -38,10 +41,15 @@ class ProcessParser(object):
         :param svg: the SVG representation of this process as a string
           (optional)
         :param filename: the source BPMN filename (optional)
+        :param doc_index: the ElementIndex of the BPMN document (optional,
+          it is built from the document of the node if it is not given)
         """
         self.parser = p
         self.node = node
         self.doc_xpath = doc_xpath
+        if doc_index is None:
+            doc_index = ElementIndex(node.getroottree())
+        self.doc_index = doc_index
         self.xpath = xpath_eval(node)
         self.spec = BpmnProcessSpec(
             name=self.get_id(), description=self.get_name(), svg=svg,
@@ -57,6 +65,8 @@ class ProcessParser(object):
         self._init_coord_lookup()
         self.message_lookup = {}  # Dictionary of positional arguments for each node.
         self._init_message_lookup()
+        self.correlation_lookup = {}
+        self._init_correlation_lookup()
 
     def get_id(self):
         """
@@ -98,7 +108,7 @@ class ProcessParser(object):
 
     def _init_lane_lookup(self):
         self.id_to_lane_lookup = {}
-        for lane in self.xpath('.//bpmn:lane'):
+        for lane in self.doc_index.get_by_tag(full_tag('lane')):
             name = lane.get('name')
             if name:
                 for ref in xpath_eval(lane)('bpmn:flowNodeRef'):
@@ -117,17 +127,37 @@ class ProcessParser(object):
         """Creates a lookup table for the name/id of all messages in the workflow
         """
         self.message_lookup = {}
-        for message in self.doc_xpath('.//bpmn:message'):
+        for message in self.doc_index.get_by_tag(full_tag('message')):
             self.message_lookup[message.attrib['id']] = message.attrib['name']
-        for message in self.doc_xpath('.//bpmn:signal'):
+        for message in self.doc_index.get_by_tag(full_tag('signal')):
             self.message_lookup[message.attrib['id']] = message.attrib['name']
 
+    def _init_correlation_lookup(self):
+        """Creates a lookup table with the correlation key expression of
+        each message, made of the message paths of the correlation properties
+        that retrieve a value from the message."""
+        paths = {}
+        for expression in self.doc_index.get_by_tag(
+                full_tag('correlationPropertyRetrievalExpression')):
+            for path in xpath_eval(expression)('bpmn:messagePath'):
+                if path.text and path.text.strip():
+                    paths.setdefault(expression.get('messageRef'), []).append(
+                        path.text.strip())
+        self.correlation_lookup = {}
+        for message, message_paths in paths.items():
+            if len(message_paths) == 1:
+                self.correlation_lookup[message] = message_paths[0]
+            else:
+                self.correlation_lookup[message] = \
+                    '(%s)' % ', '.join(message_paths)
+
     def _init_coord_lookup(self):
         """Creates a lookup table with the x/y coordinates of each shape.
         Only tested with the output from the Camunda modeler, which provides
         these details in the bpmndi / and dc namespaces."""
         self.id_to_coords_lookup = {}
-        for position in self.doc_xpath('.//bpmndi:BPMNShape'):
+        for position in self.doc_index.get_by_tag(
+                '{%s}BPMNShape' % DIAG_INTERCHANGE_NS):
             bounds = xpath_eval(position)("dc:Bounds")
             if len(bounds) > 0 and 'bpmnElement' in position.attrib:
                 bound = bounds[0]
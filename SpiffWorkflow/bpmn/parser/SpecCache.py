@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+
+from ...version import __version__
+
+
+class SpecCache(object):
+    """
+    Keeps the specs that a BpmnParser builds in a directory, so that other
+    parsers (e.g. those of other processes, or of the next start) do not
+    have to parse the BPMN and DMN files again::
+
+        parser = BpmnDmnParser(spec_cache=SpecCache('/var/cache/specs'))
+        parser.add_bpmn_files_by_glob('processes/*.bpmn')
+        parser.add_dmn_files_by_glob('processes/*.dmn')
+        spec = parser.get_spec('Process')
+
+    The entries are keyed by the hashes of the contents of the files they
+    were made of: a spec is parsed again once the file of its process, of
+    one of the processes it calls or of one of the decisions it makes
+    changes, while the other specs are still loaded from the cache. Old
+    entries are never removed; call clear() to do so.
+
+    The entries are pickled, so the directory must not be writable by
+    anyone who is not trusted to run code.
+    """
+
+    def __init__(self, directory):
+        """
+        Constructor.
+
+        :param directory: the directory to keep the entries in, which is
+          created if it does not exist.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def get_digest(content):
+        """
+        Returns the hash of the given file content (bytes).
+        """
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def get_key(parts):
+        """
+        Returns the key for an entry that depends on the given strings, and
+        on the version of this library.
+        """
+        return SpecCache.get_digest(
+            '\0'.join([__version__] + list(parts)).encode('utf-8'))
+
+    def _get_path(self, kind, key):
+        return os.path.join(self.directory, '%s.%s' % (key, kind))
+
+    def load(self, kind, key):
+        """
+        Returns the entry of the given kind (e.g. 'spec') with the given key,
+        or None if there is no such entry or it cannot be loaded.
+        """
+        try:
+            with open(self._get_path(kind, key), 'rb') as fp:
+                return pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError):
+            return None
+
+    def store(self, kind, key, value):
+        """
+        Stores the given entry. Parsers that run at the same time may store
+        the same entry, each of them replaces it as a whole.
+        """
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump(value, fp, pickle.HIGHEST_PROTOCOL)
+            os.replace(path, self._get_path(kind, key))
+        except BaseException:
+            os.remove(path)
+            raise
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        for path in glob.glob(os.path.join(self.directory, '*.*')):
+            os.remove(path)
@@ -62,6 +62,7 @@ class TaskParser(object):
         self.process_parser = process_parser
         self.spec_class = spec_class
         self.process_xpath = self.process_parser.xpath
+        self.doc_index = self.process_parser.doc_index
         self.spec = self.process_parser.spec
         self.node = node
         self.xpath = xpath_eval(node)
@@ -69,10 +70,9 @@ class TaskParser(object):
     def _detect_multiinstance(self):
 
         # get special task decorators from XML
-        multiinstanceElement = self.process_xpath(
-            './/*[@id="%s"]/bpmn:multiInstanceLoopCharacteristics' % self.get_id())
-        standardLoopElement = self.process_xpath(
-            './/*[@id="%s"]/bpmn:standardLoopCharacteristics' % self.get_id())
+        multiinstanceElement = self.xpath(
+            './bpmn:multiInstanceLoopCharacteristics')
+        standardLoopElement = self.xpath('./bpmn:standardLoopCharacteristics')
 
         # initialize variables
         isMultiInstance = len(multiinstanceElement) > 0
@@ -97,16 +97,16 @@ class TaskParser(object):
 
                 if sequentialText == 'true':
                     isSequential = True
-                loopCardinality = self.process_xpath(
-                    './/*[@id="%s"]/bpmn:multiInstanceLoopCharacteristics/bpmn:loopCardinality' % self.get_id())
+                loopCardinality = self.xpath(
+                    './bpmn:multiInstanceLoopCharacteristics/bpmn:loopCardinality')
                 if len(loopCardinality) > 0:
                     loopcount = loopCardinality[0].text
                 elif collectionText is not None:
                     loopcount = collectionText
                 else:
                     loopcount = '1'
-                completionCondition = self.process_xpath(
-                    './/*[@id="%s"]/bpmn:multiInstanceLoopCharacteristics/bpmn:completionCondition' % self.get_id())
+                completionCondition = self.xpath(
+                    './bpmn:multiInstanceLoopCharacteristics/bpmn:completionCondition')
                 if len(completionCondition) > 0:
                     completecondition = completionCondition[0].text
 
@@ -182,8 +182,8 @@ class TaskParser(object):
 
             self._detect_multiinstance()
 
-            boundary_event_nodes = self.process_xpath(
-                './/bpmn:boundaryEvent[@attachedToRef="%s"]' % self.get_id())
+            boundary_event_nodes = self.doc_index.get_by_attached_to_ref(
+                self.get_id(), 'boundaryEvent')
             if boundary_event_nodes:
                 parent_task = _BoundaryEventParent(
                     self.spec, '%s.BoundaryEventParent' % self.get_id(),
@@ -205,8 +205,8 @@ class TaskParser(object):
                     self.node.get('id')] = self.task
 
             children = []
-            outgoing = self.process_xpath(
-                './/bpmn:sequenceFlow[@sourceRef="%s"]' % self.get_id())
+            outgoing = self.doc_index.get_by_source_ref(
+                self.get_id(), 'sequenceFlow')
             if len(outgoing) > 1 and not self.handles_multiple_outgoing():
                 raise ValidationException(
                     'Multiple outgoing flows are not supported for '
@@ -216,9 +216,7 @@ class TaskParser(object):
             for sequence_flow in outgoing:
                 target_ref = sequence_flow.get('targetRef')
                 try:
-                    target_node = one(
-                         self.process_xpath('.//bpmn:*[@id="%s"]'% \
-                                target_ref))
+                    target_node = one(self.doc_index.get_by_id(target_ref))
                 except:
                     raise ValidationException(
                         'When looking for a task spec, we found two items, '
@@ -82,8 +82,8 @@ class EndEventParser(TaskParser):
         if escalation_event_definition is not None:
             escalation_ref = escalation_event_definition.get('escalationRef')
             if escalation_ref:
-                escalation = one(self.process_parser.doc_xpath(
-                    './/bpmn:escalation[@id="%s"]' % escalation_ref))
+                escalation = one(self.process_parser.doc_index.get_by_id(
+                    escalation_ref, 'escalation'))
                 escalation_code = escalation.get('escalationCode')
         if terminate_event_definition:
             terminate_event_definition = True  # here it is just assigning the lxml object, I couldn't see where it was
@@ -226,9 +226,9 @@ class SubWorkflowParser(CallActivityParser):
 
 
     def get_subprocess_parser(self):
-        thisTask = self.process_xpath('.//*[@id="%s"]'% self.get_id())[0]
-        workflowStartEvent = self.process_xpath('.//*[@id="%s"]/bpmn:startEvent' % self.get_id())
-        workflowEndEvent =  self.process_xpath('.//*[@id="%s"]/bpmn:endEvent' % self.get_id())
+        thisTask = self.node
+        workflowStartEvent = self.xpath('./bpmn:startEvent')
+        workflowEndEvent = self.xpath('./bpmn:endEvent')
         if len(workflowStartEvent) != 1:
             raise ValidationException(
                 'Multiple Start points are not allowed in SubWorkflow Task',
@@ -344,7 +344,8 @@ class IntermediateCatchEventParser(TaskParser):
         """
         escalationRef = escalationEventDefinition.get('escalationRef')
         if escalationRef:
-            escalation = one(self.process_parser.doc_xpath('.//bpmn:escalation[@id="%s"]' % escalationRef))
+            escalation = one(self.process_parser.doc_index.get_by_id(
+                escalationRef, 'escalation'))
             escalation_code = escalation.get('escalationCode')
         else:
             escalation_code = None
@@ -365,7 +366,10 @@ class IntermediateCatchEventParser(TaskParser):
             message = messageEventDefinition.get('messageRef')
             if message is None:
                 message = self.node.get('name')
-        return MessageEventDefinition(message,name=self.process_parser.message_lookup.get(message,''))
+        return MessageEventDefinition(
+            message, name=self.process_parser.message_lookup.get(message, ''),
+            correlation_key=self.process_parser.correlation_lookup.get(
+                message))
 
     def get_signal_event_definition(self, signalEventDefinition):
         """
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.serializer.binary import BinarySerializer, is_binary
+from SpiffWorkflow.serializer.json import JSONSerializer
+from .BpmnSerializer import BpmnSerializer
+
+
+class BpmnBinarySerializer(BpmnSerializer, BinarySerializer):
+    """
+    Serializes running BPMN workflows like the BpmnSerializer, but to the
+    compact binary format of the BinarySerializer instead of JSON. Workflow
+    specs are still deserialized from BPMN packages, too.
+    """
+
+    # The methods below skip the JSONSerializer, so that the
+    # BinarySerializer encodes the state.
+
+    def serialize_workflow(self, workflow, include_spec=True, **kwargs):
+        assert isinstance(workflow, BpmnWorkflow)
+        return super(JSONSerializer, self).serialize_workflow(
+            workflow, include_spec=include_spec, **kwargs)
+
+    def deserialize_workflow(self, s_state, workflow_spec=None,
+                             read_only=False, **kwargs):
+        return super(JSONSerializer, self).deserialize_workflow(
+            s_state, wf_class=BpmnWorkflow, wf_spec=workflow_spec,
+            read_only=read_only, **kwargs)
+
+    def serialize_workflow_spec(self, wf_spec, **kwargs):
+        return super(JSONSerializer, self).serialize_workflow_spec(
+            wf_spec, **kwargs)
+
+    def deserialize_workflow_spec(self, s_state, filename=None):
+        if is_binary(s_state):
+            return super(JSONSerializer, self).deserialize_workflow_spec(
+                s_state)
+        return super(BpmnBinarySerializer, self).deserialize_workflow_spec(
+            s_state, filename=filename)
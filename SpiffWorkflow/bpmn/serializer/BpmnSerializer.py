@@ -58,7 +58,8 @@ class BpmnSerializer(spiff_json.JSONSerializer):
     def serialize_task(self, task, skip_children=False, **kwargs):
         return super().serialize_task(task,
                                       skip_children=skip_children,
-                                      allow_subs=True)
+                                      allow_subs=True,
+                                      data_table=kwargs.get('data_table'))
 
     def deserialize_workflow(self, s_state,  workflow_spec=None,
                              read_only=False, **kwargs):
@@ -69,38 +70,43 @@ class BpmnSerializer(spiff_json.JSONSerializer):
                                             read_only=read_only,
                                             **kwargs)
 
-    def _deserialize_task_children(self, task, s_state):
+    def _deserialize_task_children(self, task, s_state, data_table=None):
         """Reverses the internal process that will merge children from a
         sub-workflow in the top level workflow.  This copies the states
         back into the sub-workflow after generating it from the base spec"""
         if not isinstance(task.task_spec, CallActivity):
-            return super()._deserialize_task_children(task, s_state)
+            return super()._deserialize_task_children(task, s_state,
+                                                      data_table)
         else:
 
             sub_workflow = task.task_spec.create_sub_workflow(task)
             children = []
             for c in s_state['children']:
                 if sub_workflow.get_tasks_from_spec_name(c['task_spec']):
-                    start_task = self.deserialize_task(sub_workflow, c)
+                    start_task = self.deserialize_task(sub_workflow, c,
+                                                       data_table)
                     children.append(start_task)
-                    start_task.parent = task.id
+                    start_task.parent = task
                     sub_workflow.task_tree = start_task
                     # get a list of tasks in reverse order of change
-                    # our last task should be on the top.
-                    tasks = sub_workflow.get_tasks(task.COMPLETED)
+                    # our last task should be on the top. The task index is
+                    # rebuilt once the whole tree is restored, so walk it.
+                    tasks = list(
+                        sub_workflow.get_tasks_iterator(task.COMPLETED))
                     tasks.sort(key=lambda x: x.last_state_change,reverse=True)
                     if len(tasks)>0:
                         last_task = tasks[0]
                         sub_workflow.last_task = last_task
                 else:
-                    resume_task = self.deserialize_task(task.workflow, c)
-                    resume_task.parent = task.id
+                    resume_task = self.deserialize_task(task.workflow, c,
+                                                        data_table)
+                    resume_task.parent = task
                     children.append(resume_task)
             return children
 
-    def deserialize_task(self, workflow, s_state):
+    def deserialize_task(self, workflow, s_state, data_table=None):
         assert isinstance(workflow, BpmnWorkflow)
-        return super().deserialize_task(workflow, s_state)
+        return super().deserialize_task(workflow, s_state, data_table)
 
     def deserialize_workflow_spec(self, s_state, filename=None):
         """
@@ -39,8 +39,8 @@ class _BoundaryEventParent(BpmnSpecMixin):
                         (isinstance(sibling.task_spec, BoundaryEvent)
                          and not sibling._is_finished())):
                         sibling.cancel()
-            for t in child_task.workflow._get_waiting_tasks():
-                t.task_spec._update(t)
+            child_task.workflow._update_waiting_tasks(
+                [child_task.task_spec])
 
     def _predict_hook(self, my_task):
         # We default to MAYBE
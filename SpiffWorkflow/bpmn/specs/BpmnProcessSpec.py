@@ -57,9 +57,13 @@ class _EndJoin(UnstructuredJoin):
 
         return force or len(waiting_tasks) == 0, waiting_tasks
 
+    def _get_wakeup_events(self, my_task):
+        # Waits for all tasks, including the ones of sub workflows.
+        return None
+
     def _on_complete_hook(self, my_task):
         super(_EndJoin, self)._on_complete_hook(my_task)
-        my_task.workflow.data.update(my_task.data)
+        my_task.workflow.data.update(my_task.data_view)
 
     def serialize(self, serializer):
         return serializer.serialize_join(self)
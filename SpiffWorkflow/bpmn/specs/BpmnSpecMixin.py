@@ -203,7 +203,6 @@ class BpmnSpecMixin(TaskSpec):
 
     def _on_cancel(self, my_task):
         super(BpmnSpecMixin, self)._on_cancel(my_task)
-        my_task.workflow._task_cancelled_notify(my_task)
         if not my_task.workflow._is_busy_with_restore():
             self.entering_cancelled_state(my_task)
 
@@ -96,6 +96,15 @@ class InclusiveGateway(UnstructuredJoin):
 
         return force or len(waiting_tasks) == 0, waiting_tasks
 
+    def _get_wakeup_events(self, my_task):
+        # The gateway is blocked by the tasks that may still reach one of
+        # its inputs without a token, until they complete or are cancelled;
+        # a token arriving on one of the inputs updates the instance of the
+        # gateway below it.
+        may_fire, waiting_tasks = self._check_threshold_unstructured(my_task)
+        specs = list(set(task.task_spec for task in waiting_tasks))
+        return specs + [('cancel', spec) for spec in specs]
+
     def _has_directed_path_to(self, task, task_spec,
                               without_using_sequence_flow_from=None):
         q = deque()
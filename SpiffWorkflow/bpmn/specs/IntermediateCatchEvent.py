@@ -48,6 +48,8 @@ class IntermediateCatchEvent(Simple, BpmnSpecMixin):
                 resultVar = my_task.task_spec.name + '_Response'
             my_task.data[resultVar] = message[0]
             # this next line actually matters for some start events.
+            for child in my_task.children:
+                my_task._child_removed_notify(child)
             my_task.children = []
             my_task._sync_children(my_task.task_spec.outputs)
             super(IntermediateCatchEvent, self)._update_hook(my_task)
@@ -56,6 +58,8 @@ class IntermediateCatchEvent(Simple, BpmnSpecMixin):
             repeat = my_task.internal_data.get('repeat', 0)
             repeat_count = my_task.internal_data.get('repeat_count', 0)
             if (repeat >= repeat_count) and fired:
+                for child in my_task.children:
+                    my_task._child_removed_notify(child)
                 my_task.children = []
                 my_task._sync_children(my_task.task_spec.outputs)
                 super(IntermediateCatchEvent, self)._update_hook(my_task)
@@ -75,6 +79,16 @@ class IntermediateCatchEvent(Simple, BpmnSpecMixin):
                 if not my_task.workflow._is_busy_with_restore():
                     self.entering_waiting_state(my_task)
 
+    def _get_wakeup_events(self, my_task):
+        if self.event_definition is None:
+            return None
+        return self.event_definition._get_wakeup_events(my_task)
+
+    def _get_wakeup_time(self, my_task):
+        if self.event_definition is None:
+            return None
+        return self.event_definition._get_wakeup_time(my_task)
+
     def _on_ready_hook(self, my_task):
         self._predict(my_task)
 
@@ -254,6 +254,8 @@ class MultiInstanceTask(TaskSpec):
         self.connect(end_gw_spec)
         self.outputs = [end_gw_spec]
         end_gw.parent = my_task
+        for child in my_task.children:
+            my_task._child_removed_notify(child)
         my_task.children = [end_gw]
 
     def multiinstance_info(self, my_task):
@@ -299,6 +301,7 @@ class MultiInstanceTask(TaskSpec):
 
         new_child.children = []  # these will be updated later
         # in the case of parallel, the children list will get updated during the predict loop
+        my_task.workflow._task_added_notify(new_child)
         return new_child
 
     def _expand_sequential(self,my_task,split_n):
@@ -440,13 +443,14 @@ class MultiInstanceTask(TaskSpec):
         else:
             runtimesvar = runtimes
 
-        if self.elementVar in my_task.data and isinstance(my_task.data[self.elementVar], dict):
+        data = my_task.data_view
+        if self.elementVar in data and isinstance(data[self.elementVar], dict):
             collect[runtimesvar] = DeepMerge.merge(collect.get(runtimesvar, {}),
-                                                   copy.copy(my_task.data[self.elementVar]))
+                                                   copy.copy(data[self.elementVar]))
 
         LOG.debug(my_task.task_spec.name + 'complete hook')
-        my_task.data = DeepMerge.merge(my_task.data,
-                                       gendict(colvarname.split('/'), collect))
+        DeepMerge.merge(my_task._get_own_data(),
+                        gendict(colvarname.split('/'), collect))
 
 
     def _update_sibling_data(self,my_task,runtimes,runcount,colvarname,collect):
@@ -516,6 +520,14 @@ class MultiInstanceTask(TaskSpec):
 
         return serializer.serialize_multi_instance(self)
 
+    def __reduce_ex__(self, protocol):
+        # The classes made by getDynamicMIClass() cannot be looked up by
+        # name, so they are pickled as the class they were made from.
+        if type(self) is MultiInstanceTask:
+            return super(MultiInstanceTask, self).__reduce_ex__(protocol)
+        return (_new_dynamic_mi_task,
+                (type(self).__name__, self.prevtaskclass), self.__dict__)
+
     @classmethod
     def deserialize(self, serializer, wf_spec, s_state):
         prevclass = get_class(s_state['prevtaskclass'])
@@ -524,7 +536,23 @@ class MultiInstanceTask(TaskSpec):
 
         return serializer.deserialize_multi_instance(wf_spec, s_state, spec)
 
+
+_dynamic_mi_classes = {}
+
+
 def getDynamicMIClass(id,prevclass):
     id = re.sub('(.+)_[0-9]$','\\1',id)
-    return type(id + '_class', (
-        MultiInstanceTask, prevclass), {})
+    return _get_dynamic_mi_class(id + '_class', prevclass)
+
+
+def _get_dynamic_mi_class(name, prevclass):
+    key = (name, prevclass)
+    if key not in _dynamic_mi_classes:
+        _dynamic_mi_classes[key] = type(name, (MultiInstanceTask, prevclass),
+                                        {})
+    return _dynamic_mi_classes[key]
+
+
+def _new_dynamic_mi_task(name, prevtaskclass):
+    cls = _get_dynamic_mi_class(name, get_class(prevtaskclass))
+    return cls.__new__(cls)
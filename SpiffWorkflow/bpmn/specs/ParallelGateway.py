@@ -50,6 +50,12 @@ class ParallelGateway(UnstructuredJoin):
         return (force or len(completed_inputs) >= len(self.inputs),
                 waiting_tasks)
 
+    def _get_wakeup_events(self, my_task):
+        # A token arriving on one of the inputs updates the instance of the
+        # join below it, which checks the threshold for all the instances
+        # that are waiting.
+        return []
+
     @classmethod
     def deserialize(self, serializer, wf_spec, s_state):
         return serializer.deserialize_generic(wf_spec, s_state, ParallelGateway)
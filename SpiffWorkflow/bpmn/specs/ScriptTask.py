@@ -48,7 +48,11 @@ class ScriptTask(Simple, BpmnSpecMixin):
             return
         assert not task.workflow.read_only
         try:
-            task.workflow.script_engine.execute(task, self.script, task.data)
+            future = task.workflow._pop_execution(task)
+            if future is None:
+                self._execute(task, task._get_own_data())
+            else:
+                task.data = dict(future.result())
         except Exception as e:
             LOG.error('Error executing ScriptTask; task=%r',
                       task, exc_info=True)
@@ -63,6 +67,23 @@ class ScriptTask(Simple, BpmnSpecMixin):
                     task, 'Error during script execution:' + str(e), e)
         super(ScriptTask, self)._on_complete_hook(task)
 
+    def _execute(self, task, data):
+        """
+        Runs the script on the given data, and returns the data. May be
+        called from another thread, with a copy of the task data.
+        """
+        task.workflow.script_engine.execute(task, self.script, data)
+        return data
+
+    async def _execute_async(self, task, data):
+        """
+        Runs the script on the given data, awaiting it if it awaits, and
+        returns the data.
+        """
+        await task.workflow.script_engine.execute_async(task, self.script,
+                                                        data)
+        return data
+
     def serialize(self, serializer):
         return serializer.serialize_script_task(self)
 
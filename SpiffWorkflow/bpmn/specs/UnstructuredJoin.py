@@ -129,7 +129,7 @@ class UnstructuredJoin(Join, BpmnSpecMixin):
         # Update data from all the same thread tasks.
         thread_tasks.sort(key=lambda t: t.parent.last_state_change)
         for task in thread_tasks:
-            self.data.update(task.data)
+            self.data.update(task._get_shared_data())
 
         # Mark the identified task instances as COMPLETED. The exception
         # is the most recently changed task, for which we assume READY.
@@ -138,7 +138,7 @@ class UnstructuredJoin(Join, BpmnSpecMixin):
         # (re)built underneath the node.
         for task in thread_tasks:
             if task == last_changed:
-                task.data.update(self.data)
+                task._get_own_data().update(self.data)
                 self.entered_event.emit(my_task.workflow, my_task)
                 task._ready()
             else:
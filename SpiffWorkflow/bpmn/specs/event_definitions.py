@@ -23,10 +23,14 @@ import datetime
 import sys
 import datetime
 import logging
+import time
 
 
 LOG = logging.getLogger(__name__)
 
+# The format of the start time of a timer.
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
 
 class CatchingEventDefinition(object):
     """
@@ -50,6 +54,21 @@ class CatchingEventDefinition(object):
     def _fire(self, my_task):
         my_task._set_internal_data(event_fired=True)
 
+    def _get_wakeup_events(self, my_task):
+        """
+        Returns the events a task waiting for this event must be updated on,
+        see TaskSpec._get_wakeup_events(). By default, the task is updated
+        whenever any task completes.
+        """
+        return None
+
+    def _get_wakeup_time(self, my_task):
+        """
+        Returns the time after which a task waiting for this event must be
+        updated, see TaskSpec._get_wakeup_time().
+        """
+        return None
+
 
 class ThrowingEventDefinition(object):
     """
@@ -65,16 +84,22 @@ class MessageEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
     for Message Events.
     """
 
-    def __init__(self, message,payload="",name="",resultVar=None):
+    def __init__(self, message,payload="",name="",resultVar=None,
+                 correlation_key=None):
         """
         Constructor.
 
         :param message: The message to wait for.
+
+        :param correlation_key: An expression that is evaluated against the
+        data of a waiting task. A message that is sent with a correlation
+        key is only received by the tasks whose correlation key equals it.
         """
         self.message = message
         self.payload = payload
         self.resultVar = resultVar
         self.name = name
+        self.correlation_key = correlation_key
 
     def has_fired(self, my_task):
         """
@@ -83,10 +108,24 @@ class MessageEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
         """
         return my_task._get_internal_data('event_fired', False)
 
+    def get_correlation_key(self, my_task):
+        """
+        Returns the correlation key of the given waiting task, or None if
+        the event has no correlation key.
+        """
+        if self.correlation_key is None:
+            return None
+        return my_task.workflow.script_engine.evaluate(my_task,
+                                                       self.correlation_key)
+
     def _message_ready(self, my_task):
         waiting_messages = my_task.workflow.task_tree.internal_data.get('messages',{})
         if (self.message in waiting_messages.keys()):
             evaledpayload = waiting_messages[self.message]
+            # The payload, result variable and correlation key.
+            if len(evaledpayload) > 2 and evaledpayload[2] is not None and \
+                    evaledpayload[2] != self.get_correlation_key(my_task):
+                return False
             del(waiting_messages[self.message])
             return evaledpayload
         return False
@@ -102,9 +141,19 @@ class MessageEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
         self._fire(my_task)
         return True
 
+    def _get_wakeup_events(self, my_task):
+        # Messages are also received through accept_message(), which
+        # updates the task directly.
+        events = [('message', self.message)]
+        correlation_key = self.get_correlation_key(my_task)
+        if correlation_key is not None:
+            events.append(('message', self.message, correlation_key))
+        return events
+
     @classmethod
     def deserialize(self, dct):
-        return MessageEventDefinition(dct['message'],dct['payload'],dct['name'],dct['resultVar'])
+        return MessageEventDefinition(dct['message'],dct['payload'],dct['name'],dct['resultVar'],
+                                      dct.get('correlation_key'))
 
     def serialize(self):
         retdict = {}
@@ -114,6 +163,7 @@ class MessageEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
         retdict['payload'] = self.payload
         retdict['resultVar'] = self.resultVar
         retdict['name'] = self.name
+        retdict['correlation_key'] = self.correlation_key
         return retdict
 
 class SignalEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
@@ -156,6 +206,9 @@ class SignalEventDefinition(CatchingEventDefinition, ThrowingEventDefinition):
         self._fire(my_task)
         return True
 
+    def _get_wakeup_events(self, my_task):
+        return [('signal', self.message)]
+
     @classmethod
     def deserialize(self, dct):
         return SignalEventDefinition(dct['message'],dct['name'])
@@ -203,6 +256,9 @@ class CancelEventDefinition(CatchingEventDefinition):
         self._fire(my_task)
         return True
 
+    def _get_wakeup_events(self, my_task):
+        return [('cancel', 'TokenReset')]
+
     @classmethod
     def deserialize(self, dct):
         return CancelEventDefinition(dct['message'],dct['name'])
@@ -237,32 +293,59 @@ class TimerEventDefinition(CatchingEventDefinition):
 
     def has_fired(self, my_task):
         """
-        The Timer is considered to have fired if the evaluated dateTime
-        expression is before datetime.datetime.now()
+        The Timer is considered to have fired once its due time has passed.
         """
-        dt = my_task.workflow.script_engine.evaluate(my_task, self.dateTime)
-        if isinstance(dt,datetime.timedelta):
-            if my_task._get_internal_data('start_time',None) is not None:
-                start_time = datetime.datetime.strptime(my_task._get_internal_data('start_time',None),'%Y-%m-%d '
-                                                                                                   '%H:%M:%S.%f')
-                elapsed = datetime.datetime.now() - start_time
-                return elapsed > dt
-            else:
-                my_task.internal_data['start_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-                return False
+        due_time = self.get_due_time(my_task)
+        return due_time is not None and time.time() > due_time
 
-        if dt is None:
-            return False
+    def get_due_time(self, my_task):
+        """
+        Returns the time (as a timestamp) at which the timer of the given
+        task fires, or None if the dateTime expression does not evaluate to
+        a point in time or a duration.
+
+        The dateTime expression is evaluated when this is called for the
+        first time, which also starts the timer of a duration, and the due
+        time is stored with the task.
+        """
+        due_time = my_task._get_internal_data('due_time', None)
+        if due_time is None:
+            due_time = self._get_due_time(my_task)
+            if due_time is not None:
+                my_task.internal_data['due_time'] = due_time
+        return due_time
+
+    def _get_due_time(self, my_task):
+        dt = my_task.workflow.script_engine.evaluate(my_task, self.dateTime)
+        if isinstance(dt, datetime.timedelta):
+            return self._get_end_time(my_task, dt)
         if isinstance(dt, datetime.datetime):
-            if dt.tzinfo:
-                tz = dt.tzinfo
-                now = tz.fromutc(datetime.datetime.utcnow().replace(tzinfo=tz))
-            else:
-                now = datetime.datetime.now()
+            return dt.timestamp()
+        if isinstance(dt, datetime.date):
+            # The timer fires the day after the given date.
+            return datetime.datetime.combine(
+                dt + datetime.timedelta(days=1), datetime.time()).timestamp()
+        return None
+
+    def _get_end_time(self, my_task, duration):
+        """
+        Returns the timestamp at which the given duration has elapsed since
+        the timer of the given task started, and starts it if needed.
+        """
+        start_time = my_task._get_internal_data('start_time', None)
+        if start_time is None:
+            start_time = datetime.datetime.now()
+            my_task.internal_data['start_time'] = start_time.strftime(
+                TIME_FORMAT)
         else:
-            # assume type is a date, not datetime
-            now = datetime.date.today()
-        return now > dt
+            start_time = datetime.datetime.strptime(start_time, TIME_FORMAT)
+        return (start_time + duration).timestamp()
+
+    def _get_wakeup_events(self, my_task):
+        return []
+
+    def _get_wakeup_time(self, my_task):
+        return self.get_due_time(my_task)
 
     @classmethod
     def deserialize(self, dct):
@@ -315,6 +398,10 @@ class EscalationEventDefinition(CatchingEventDefinition, ThrowingEventDefinition
                         return True
         return False
 
+    def _get_wakeup_events(self, my_task):
+        # Escalations are only received through accept_message().
+        return []
+
     @classmethod
     def deserialize(self, dct):
         return EscalationEventDefinition(dct['escalation_code'])
@@ -339,30 +426,34 @@ class CycleTimerEventDefinition(TimerEventDefinition):
 
     def has_fired(self, my_task):
         """
-        The Timer is considered to have fired if the evaluated dateTime
-        expression is before datetime.datetime.now()
+        The Timer is considered to have fired once its due time has passed,
+        as long as it did not fire as often as it repeats. It is restarted
+        each time it fires.
         """
-        repeat,dt = my_task.workflow.script_engine.evaluate(my_task, self.dateTime)
-
-        repeat_count = my_task._get_internal_data('repeat_count',0)
+        due_time = self.get_due_time(my_task)
+        repeat_count = my_task._get_internal_data('repeat_count', 0)
+        if time.time() > due_time and \
+                repeat_count < my_task._get_internal_data('repeat', 0):
+            my_task.internal_data['repeat_count'] = repeat_count + 1
+            del my_task.internal_data['start_time']
+            del my_task.internal_data['due_time']
+            self.get_due_time(my_task)
+            return True
+        return False
 
-        if my_task._get_internal_data('start_time',None) is not None:
-            start_time = datetime.datetime.strptime(my_task._get_internal_data('start_time',None),'%Y-%m-%d '
-                                                                                                  '%H:%M:%S.%f')
-            elapsed = datetime.datetime.now() - start_time
-            fire = elapsed > dt
-            if fire and repeat_count < repeat:
-                my_task.internal_data['repeat'] = repeat
-                my_task.internal_data['repeat_count'] = repeat_count + 1
-                my_task.internal_data['start_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-                return True
-            else:
-                return False
-        else:
-            my_task.internal_data['repeat'] = repeat
-            my_task.internal_data['repeat_count'] = repeat_count
-            my_task.internal_data['start_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-            return False
+    def _get_due_time(self, my_task):
+        repeat, dt = my_task.workflow.script_engine.evaluate(my_task,
+                                                             self.dateTime)
+        my_task.internal_data['repeat'] = repeat
+        my_task.internal_data.setdefault('repeat_count', 0)
+        return self._get_end_time(my_task, dt)
+
+    def _get_wakeup_time(self, my_task):
+        due_time = self.get_due_time(my_task)
+        if my_task._get_internal_data('repeat_count', 0) >= \
+                my_task._get_internal_data('repeat', 0):
+            return None
+        return due_time
 
     @classmethod
     def deserialize(self, dct):
@@ -16,11 +16,41 @@ from __future__ import division
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
+import asyncio
+import copy
+import time
+
+from .AsyncScriptEngine import AsyncScriptEngine
 from .PythonScriptEngine import PythonScriptEngine
 from ..task import Task
 from ..workflow import Workflow
 
 
+class _TaskDataCopy(dict):
+    """
+    The data of a task for work that runs apart from the workflow, such as
+    a script on an executor. Each value is deep copied once it is first
+    looked up, so that the work cannot change the data of other tasks,
+    while the values that it does not use are not copied at all. Turn it
+    into a dict once the work is done.
+    """
+
+    def __init__(self, data):
+        super(_TaskDataCopy, self).__init__(data)
+        self._copied = set()
+
+    def __getitem__(self, key):
+        value = super(_TaskDataCopy, self).__getitem__(key)
+        if key not in self._copied:
+            self._copied.add(key)
+            value = copy.deepcopy(value)
+            super(_TaskDataCopy, self).__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
 class BpmnWorkflow(Workflow):
     """
     The engine that executes a BPMN workflow. This specialises the standard
@@ -28,7 +58,7 @@ class BpmnWorkflow(Workflow):
     """
 
     def __init__(self, workflow_spec, name=None, script_engine=None,
-                 read_only=False, **kwargs):
+                 read_only=False, executor=None, **kwargs):
         """
         Constructor.
 
@@ -40,12 +70,30 @@ class BpmnWorkflow(Workflow):
         cannot change. It can only be queried to find out about the current
         state. This is used in conjunction with the CompactWorkflowSerializer
         to provide read only access to a previously saved workflow.
+
+        :param executor: a concurrent.futures.Executor (e.g. a
+        ThreadPoolExecutor) to run the scripts and decisions of the engine
+        tasks that are READY at the same time on, such as the script tasks
+        of parallel branches. Each of them works on a copy of the task data
+        whose values are deep copied once they are used, which replaces the
+        data of the task once it completes. The
+        tasks are still completed one by one and in the same order, so the
+        workflow itself is only changed by the calling thread. Sub workflows
+        use the executor of the top most workflow.
         """
         super(BpmnWorkflow, self).__init__(workflow_spec, **kwargs)
         self.name = name or workflow_spec.name
         self.__script_engine = script_engine or PythonScriptEngine()
         self._busy_with_restore = False
         self.read_only = read_only
+        self.executor = executor
+        # The futures of the work of the engine tasks that were started on
+        # the executor, by task.
+        self._executions = {}
+        if self.index_tasks and self.outer_workflow is self:
+            # The engine steps take the tasks from the queue, rather than
+            # looking through all the READY tasks each time.
+            self._ready_queue = dict.fromkeys(self.get_tasks(Task.READY))
 
     @property
     def script_engine(self):
@@ -89,26 +137,178 @@ class BpmnWorkflow(Workflow):
         :param exit_at: After executing a task with a name matching this param return the task object
         """
         assert not self.read_only
-        engine_steps = list(
-            [t for t in self.get_tasks(Task.READY)
-             if self._is_engine_task(t.task_spec)])
+        engine_steps = self._get_engine_steps()
         while engine_steps:
-            for task in engine_steps:
-                task.complete()
-                if task.task_spec.name == exit_at:
-                    return task
-
-            engine_steps = list(
-                [t for t in self.get_tasks(Task.READY)
-                 if self._is_engine_task(t.task_spec)])
+            self._start_executions(engine_steps)
+            idx = 0
+            try:
+                for idx, task in enumerate(engine_steps):
+                    if task._has_state(Task.CANCELLED):
+                        # An earlier task of the round cancelled it.
+                        continue
+                    task.complete()
+                    if task.task_spec.name == exit_at:
+                        # The work that was started for the tasks that are
+                        # left is used once they complete.
+                        self._requeue(engine_steps[idx + 1:])
+                        return task
+            except Exception:
+                self._requeue(engine_steps[idx + 1:])
+                self._cancel_executions(engine_steps)
+                raise
+            # Drop the work of the tasks that an earlier task of the round
+            # cancelled.
+            self._cancel_executions(engine_steps)
+
+            engine_steps = self._get_engine_steps()
+        self._cancel_executions(list(self._executions))
+
+    def _start_executions(self, engine_steps):
+        """
+        Starts the work of the given engine tasks on the executor, if there
+        is more than one task whose spec can do its work apart from the
+        workflow (by implementing _execute()).
+        """
+        executor = self._get_executor()
+        if executor is None:
+            return
+        tasks = self._get_independent_steps(engine_steps, '_execute')
+        if len(tasks) < 2:
+            return
+        for task in tasks:
+            self._executions[task] = executor.submit(
+                task.task_spec._execute, task,
+                _TaskDataCopy(task._get_shared_data()))
+
+    def _get_independent_steps(self, engine_steps, method):
+        """
+        Returns the engine tasks whose work may start ahead of time: those
+        whose spec does its work apart from the workflow (by implementing
+        the given method), up to the first one that does not. Completing
+        that task, such as a terminating end event, may cancel the tasks
+        after it, so their work must not run before it completed.
+        """
+        tasks = []
+        for task in engine_steps:
+            if not hasattr(task.task_spec, method):
+                break
+            if task not in self._executions:
+                tasks.append(task)
+        return tasks
+
+    def _cancel_executions(self, tasks):
+        """
+        Drops the work that was started for the given tasks but not used;
+        the tasks do it themselves if they complete later on. The work that
+        already runs is kept for the tasks that are still READY, such as
+        those left by an exception, so that their scripts do not run twice.
+        """
+        for task in tasks:
+            future = self._executions.get(task)
+            if future is None:
+                continue
+            if task._has_state(Task.READY) and \
+                    not self._cancel_if_pending(future):
+                continue
+            future.cancel()
+            del self._executions[task]
+
+    def _cancel_if_pending(self, future):
+        return future.cancel()
+
+    def _get_executor(self):
+        workflow = self
+        while workflow.outer_workflow is not workflow:
+            workflow = workflow.outer_workflow
+        return getattr(workflow, 'executor', None)
+
+    def _pop_execution(self, task):
+        """
+        Returns the future of the work of the given task that was started on
+        the executor, or None if it was not started.
+        """
+        for workflow in [self] + list(self._get_outer_workflows()):
+            executions = getattr(workflow, '_executions', None)
+            if executions:
+                future = executions.pop(task, None)
+                if future is not None:
+                    return future
+        return None
+
+    def _get_engine_steps(self):
+        """
+        Returns the READY engine tasks in the order of the task tree. These
+        are taken from the ready queue, if the workflow keeps one: all of
+        them are completed in each round of the engine steps, so only the
+        tasks that became READY meanwhile are left to look at.
+        """
+        if self._ready_queue is None:
+            return [t for t in self.get_tasks(Task.READY)
+                    if self._is_engine_task(t.task_spec)]
+        ready_tasks = self._tasks_by_state[Task.READY]
+        ready_queue, self._ready_queue = self._ready_queue, {}
+        engine_steps = [t for t in ready_queue
+                        if t in ready_tasks and
+                        self._is_engine_task(t.task_spec)]
+        if len(engine_steps) > 1:
+            self._sort_by_tree_position(engine_steps)
+        return engine_steps
+
+    def _requeue(self, tasks):
+        if self._ready_queue is not None:
+            self._ready_queue.update(dict.fromkeys(tasks))
+
     def refresh_waiting_tasks(self):
         """
         Refresh the state of all WAITING tasks. This will, for example, update
         Catching Timer Events whose waiting time has passed.
         """
         assert not self.read_only
-        for my_task in self.get_tasks(Task.WAITING):
-            my_task.task_spec._update(my_task)
+        self._update_waiting_tasks()
+
+    def get_next_due_time(self):
+        """
+        Returns the time (as a timestamp) at which the earliest timer of the
+        WAITING tasks is due, or None if no task waits for a timer. A
+        scheduler may sleep until then, and call refresh_due_tasks().
+
+        The due time of a timer is computed once, when the timer starts.
+        """
+        if not self.index_tasks:
+            due_times = [task.task_spec._get_wakeup_time(task)
+                         for task in self.get_tasks(Task.WAITING)]
+            due_times = [due for due in due_times if due is not None]
+            return min(due_times) if due_times else None
+        self._subscribe_waiting_tasks()
+        return self._get_next_deadline()
+
+    def get_due_tasks(self):
+        """
+        Returns the WAITING tasks whose timers are due.
+        """
+        now = time.time()
+        if self.index_tasks:
+            self._subscribe_waiting_tasks()
+            return self._get_due_tasks(now)
+        due_tasks = []
+        for task in self.get_tasks(Task.WAITING):
+            due_time = task.task_spec._get_wakeup_time(task)
+            if due_time is not None and due_time <= now:
+                due_tasks.append(task)
+        return due_tasks
+
+    def refresh_due_tasks(self):
+        """
+        Refresh the state of the WAITING tasks whose timers are due. Unlike
+        refresh_waiting_tasks(), this leaves the other WAITING tasks alone.
+        """
+        assert not self.read_only
+        if not self.index_tasks:
+            for my_task in self.get_due_tasks():
+                my_task.task_spec._update(my_task)
+            return
+        self._subscribe_waiting_tasks()
+        self._update_waiting_tasks([], any_event=False)
 
     def get_ready_user_tasks(self,lane=None):
         """
@@ -144,3 +344,127 @@ class BpmnWorkflow(Workflow):
 
     def _task_cancelled_notify(self, task):
         assert (not self.read_only) or self._is_busy_with_restore()
+        super(BpmnWorkflow, self)._task_cancelled_notify(task)
+
+
+class AsyncBpmnWorkflow(BpmnWorkflow):
+    """
+    A BPMN workflow whose engine steps are awaited, so that its scripts can
+    await coroutines (see AsyncScriptEngine, which is the default script
+    engine of the workflow). The scripts of the tasks that are READY at the
+    same time, such as the script tasks of parallel branches, run
+    concurrently, each on a copy of its task data. Many workflows can run
+    on the same event loop, e.g.::
+
+        await asyncio.gather(*[workflow.do_engine_steps_async()
+                               for workflow in workflows])
+
+    The workflow itself is changed in the order of do_engine_steps(), once
+    the script of a task is done. Use do_engine_steps_async() rather than
+    do_engine_steps() as soon as one of the scripts awaits, and likewise
+    the async variants of the methods that run the engine steps, such as
+    message_async() rather than message(). Scripts that await raise a
+    WorkflowTaskExecException when they are run by the sync methods.
+    """
+
+    def __init__(self, workflow_spec, name=None, script_engine=None,
+                 **kwargs):
+        super(AsyncBpmnWorkflow, self).__init__(
+            workflow_spec, name=name,
+            script_engine=script_engine or AsyncScriptEngine(), **kwargs)
+
+    async def do_engine_steps_async(self, exit_at=None):
+        """
+        Execute any READY tasks that are engine specific, like
+        do_engine_steps() does, and await their scripts.
+
+        :param exit_at: After executing a task with a name matching this param return the task object
+        """
+        assert not self.read_only
+        engine_steps = self._get_engine_steps()
+        while engine_steps:
+            self._start_async_executions(engine_steps)
+            idx = 0
+            try:
+                for idx, task in enumerate(engine_steps):
+                    if task._has_state(Task.CANCELLED):
+                        continue
+                    if task not in self._executions:
+                        # The work of the tasks after one that may cancel
+                        # them starts once they are reached.
+                        self._start_async_executions([task])
+                    future = self._executions.get(task)
+                    if future is not None:
+                        await asyncio.wait([future])
+                    task.complete()
+                    if task.task_spec.name == exit_at:
+                        self._requeue(engine_steps[idx + 1:])
+                        return task
+            except Exception:
+                self._requeue(engine_steps[idx + 1:])
+                self._cancel_executions(engine_steps)
+                raise
+            self._cancel_executions(engine_steps)
+
+            engine_steps = self._get_engine_steps()
+        self._cancel_executions(list(self._executions))
+
+    async def accept_message_async(self, message):
+        """
+        Like accept_message(), but awaits the engine steps.
+        """
+        assert not self.read_only
+        self.refresh_waiting_tasks()
+        await self.do_engine_steps_async()
+        for my_task in Task.Iterator(self.task_tree, Task.WAITING):
+            my_task.task_spec.accept_message(my_task, message)
+
+    async def message_async(self, message_name, payload, resultVar,
+                            correlation_key=None):
+        """
+        Like message(), but awaits the engine steps.
+        """
+        if not self._send_message(message_name, payload, resultVar,
+                                  correlation_key):
+            return False
+        await self.do_engine_steps_async()
+        self.task_tree.internal_data['messages'] = {}
+        return True
+
+    async def signal_async(self, message_name):
+        """
+        Like signal(), but awaits the engine steps.
+        """
+        if not self._send_signal(message_name):
+            return False
+        await self.do_engine_steps_async()
+        self.task_tree.internal_data['signals'] = {}
+        return True
+
+    async def cancel_notify_async(self):
+        """
+        Like cancel_notify(), but awaits the engine steps.
+        """
+        self._send_cancel()
+        await self.do_engine_steps_async()
+        self.task_tree.internal_data['cancels'] = {}
+
+    def _cancel_if_pending(self, future):
+        # A coroutine may have got past any of its awaits, so the work of
+        # the tasks that are still READY is kept.
+        return False
+
+    def _start_async_executions(self, engine_steps):
+        """
+        Starts the work of the given engine tasks whose spec can await it
+        (by implementing _execute_async()) on the running event loop, up to
+        the first task that may cancel the ones after it.
+        """
+        tasks = self._get_independent_steps(engine_steps, '_execute_async')
+        for task in tasks:
+            if len(tasks) > 1:
+                data = _TaskDataCopy(task._get_shared_data())
+            else:
+                data = task._get_own_data()
+            self._executions[task] = asyncio.ensure_future(
+                task.task_spec._execute_async(task, data))
@@ -1,13 +1,388 @@
+import ast
 import logging
 import re
+import datetime
+from bisect import bisect_left
+from datetime import timedelta
+from decimal import Decimal
+
+from SpiffWorkflow.bpmn.FeelLikeScriptEngine import FeelLikeScriptEngine
+from SpiffWorkflow.bpmn.PythonScriptEngine import Box
+from SpiffWorkflow.exceptions import WorkflowException
 from SpiffWorkflow.util import levenshtein
 
+try:
+    import numpy
+except ImportError:
+    have_numpy = False
+else:
+    have_numpy = True
+
+# The name the value of the input expression is bound to while an input
+# entry is evaluated.
+INPUT_NAME = 'dmninputexpr'
+
+DMN_METHODS = {
+    'datetime': datetime,
+    'timedelta': timedelta,
+    'Decimal': Decimal,
+    'Box': Box,
+}
+
+# The types of the values that can be looked up in a column index.
+EQUALITY_TYPES = (int, float, str, bool, Decimal, type(None))
+INTERVAL_TYPES = (int, float, Decimal)
+
+# Numbers that a float64 holds exactly.
+FLOAT_LIMIT = 2 ** 53
+
+# Swaps the sides of a comparison, so that the input is on the left.
+FLIPPED = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+
+NOTHING = object()
+
+
+class Predicate(object):
+    """
+    An input entry of a decision table, compiled by a script engine. The '?'
+    placeholder and the implicit equality of the entry are resolved when it
+    is compiled, so that calling the predicate only evaluates a code object
+    against the value of the input expression.
+    """
+
+    def __init__(self, script_engine, lhs):
+        self.lhs = lhs
+        self.error = None
+        self.equals = NOTHING
+        self.interval = None
+        try:
+            expression = self._get_expression(script_engine, lhs)
+            self.code = script_engine.compile_expression(expression)
+        except Exception as e:
+            # Raised when the entry is checked, like any other error in the
+            # entry.
+            self.code = None
+            self.error = e
+        else:
+            self._analyze(script_engine, expression)
+
+    @staticmethod
+    def _get_expression(script_engine, lhs):
+        if '?' in lhs:
+            # The question mark allows a double ended test, e.g. '4 < ? < 6'
+            rhs, needsEquals = script_engine._validate_expression(
+                lhs.replace('?', INPUT_NAME))
+            return rhs
+        rhs, needsEquals = script_engine._validate_expression(lhs)
+        if needsEquals:
+            return INPUT_NAME + ' == ' + rhs
+        return INPUT_NAME + ' ' + rhs
+
+    def __call__(self, context):
+        return eval(self.code, context, context)
+
+    def _analyze(self, script_engine, expression):
+        """
+        Recognizes the entries that compare the input with literals: sets
+        self.equals to the literal the input must equal, or self.interval to
+        a (low, low_closed, high, high_closed) tuple, where an open end is
+        None.
+        """
+        try:
+            node = ast.parse(expression, mode='eval').body
+        except SyntaxError:
+            return
+        if not isinstance(node, ast.Compare):
+            return
+        operands = [node.left] + node.comparators
+        if len(node.ops) == 1 and isinstance(node.ops[0], ast.Eq):
+            other = self._get_other_operand(*operands)
+            value = _literal(other)
+            if value is not NOTHING and type(value) in EQUALITY_TYPES:
+                self.equals = value
+            elif isinstance(script_engine, FeelLikeScriptEngine):
+                self.interval = _feel_interval(other)
+            return
+        bounds = {}
+        for left, op, right in zip(operands, node.ops, operands[1:]):
+            if _is_input(right):
+                left, right, op = right, left, FLIPPED.get(type(op), ast.Eq)()
+            value = _literal(right)
+            if not _is_input(left) or type(value) not in INTERVAL_TYPES or \
+                    type(op) not in FLIPPED:
+                return
+            side = 'high' if isinstance(op, (ast.Lt, ast.LtE)) else 'low'
+            if side in bounds:
+                return
+            bounds[side] = (value, isinstance(op, (ast.LtE, ast.GtE)))
+        low, low_closed = bounds.get('low', (None, False))
+        high, high_closed = bounds.get('high', (None, False))
+        self.interval = (low, low_closed, high, high_closed)
+
+    @staticmethod
+    def _get_other_operand(left, right):
+        if _is_input(left):
+            return right
+        if _is_input(right):
+            return left
+        return None
+
+
+def _is_input(node):
+    return isinstance(node, ast.Name) and node.id == INPUT_NAME
+
+
+def _literal(node):
+    if node is None:
+        return NOTHING
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return NOTHING
+
+
+def _feel_interval(node):
+    """
+    Returns the interval of a FeelInterval(begin, end, leftOpen, rightOpen)
+    call with literal arguments, converting float bounds like FeelInterval
+    does.
+    """
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name) \
+            or node.func.id != 'FeelInterval':
+        return None
+    args = [_literal(arg) for arg in node.args]
+    kwargs = dict((keyword.arg, _literal(keyword.value))
+                  for keyword in node.keywords)
+    if len(args) != 2 or any(type(arg) not in INTERVAL_TYPES for arg in args) \
+            or not set(kwargs).issubset(('leftOpen', 'rightOpen')) \
+            or any(type(arg) is not bool for arg in kwargs.values()):
+        return None
+    begin, end = [Decimal("%0.5f" % arg) if isinstance(arg, float) else arg
+                  for arg in args]
+    return (begin, not kwargs.get('leftOpen', False),
+            end, not kwargs.get('rightOpen', False))
+
+
+class ColumnIndex(object):
+    """
+    Finds the rules whose entries in a column of the decision table may match
+    a value, as a bit mask with a bit per rule: a hash index holds the
+    entries that test for equality with a literal, a sorted list of interval
+    boundaries the entries that compare the input with literals, and the
+    rules with an empty entry are always candidates.
+    """
+
+    def __init__(self):
+        self.wildcards = 0
+        self.equals = {}
+        self.intervals = []
+        self.boundaries = []
+        self.segments = []
+
+    @classmethod
+    def build(cls, entries):
+        """
+        Builds the index of a column from the predicates of each rule in it,
+        returns None if an entry is neither empty nor a simple comparison.
+        """
+        index = cls()
+        intervals = []
+        for idx, predicates in enumerate(entries):
+            bit = 1 << idx
+            if predicates is None or len(predicates) > 1:
+                return None
+            if not predicates:
+                index.wildcards |= bit
+            elif predicates[0].equals is not NOTHING:
+                value = predicates[0].equals
+                index.equals[value] = index.equals.get(value, 0) | bit
+            elif predicates[0].interval is not None:
+                intervals.append((predicates[0].interval, bit))
+            else:
+                return None
+        if intervals:
+            index._add_intervals(intervals)
+        return index
+
+    def _add_intervals(self, intervals):
+        # The boundaries split the number line into segments: segment 2i is
+        # the open range below boundary i, and segment 2i + 1 the boundary
+        # itself. The mask of each segment is accumulated from the changes
+        # at the first and past the last segment of each interval.
+        self.intervals = intervals
+        values = set()
+        for (low, low_closed, high, high_closed), bit in intervals:
+            values.update(value for value in (low, high) if value is not None)
+        self.boundaries = sorted(values)
+        last = 2 * len(self.boundaries)
+        changes = [0] * (last + 2)
+        for (low, low_closed, high, high_closed), bit in intervals:
+            first = 0
+            if low is not None:
+                first = 2 * bisect_left(self.boundaries, low) + \
+                    (1 if low_closed else 2)
+            end = last
+            if high is not None:
+                end = 2 * bisect_left(self.boundaries, high) + \
+                    (1 if high_closed else 0)
+            if first <= end:
+                changes[first] ^= bit
+                changes[end + 1] ^= bit
+        mask = 0
+        for change in changes[:-1]:
+            mask ^= change
+            self.segments.append(mask)
+
+    def get_matches(self, values, rule_count):
+        """
+        Returns a boolean NumPy array with a row per value and a column per
+        rule, telling which rules may match each value, or None if the values
+        cannot be compared as an array. Numbers are compared as floats, so
+        only the ones that a float holds exactly are supported.
+        """
+        if all(type(value) in (int, float, bool) and _is_exact(value)
+               for value in values):
+            array = numpy.array(values, dtype=float)
+            kind = (int, float, bool)
+        elif not self.intervals and all(
+                type(value) is str and not value.endswith('\x00')
+                for value in values):
+            array = numpy.array(values, dtype=str)
+            kind = (str,)
+        else:
+            return None
+        matches = numpy.zeros((len(values), rule_count), dtype=bool)
+        matches[:, _bit_indexes(self.wildcards)] = True
+        for literal, mask in self.equals.items():
+            # Literals of another type never equal the values.
+            if type(literal) in kind:
+                if kind[0] is int and not _is_exact(literal):
+                    return None
+                matches[:, _bit_indexes(mask)] |= \
+                    (array == literal)[:, numpy.newaxis]
+        for (low, low_closed, high, high_closed), bit in self.intervals:
+            if not all(_is_exact(bound) for bound in (low, high)):
+                return None
+            match = numpy.ones(len(values), dtype=bool)
+            if low is not None:
+                match &= array >= float(low) if low_closed \
+                    else array > float(low)
+            if high is not None:
+                match &= array <= float(high) if high_closed \
+                    else array < float(high)
+            matches[:, bit.bit_length() - 1] |= match
+        return matches
+
+    def get_candidates(self, value):
+        """
+        Returns the mask of the rules that may match the value, or None if
+        the value cannot be looked up in this index.
+        """
+        mask = self.wildcards
+        if self.equals:
+            if type(value) not in EQUALITY_TYPES:
+                return None
+            mask |= self.equals.get(value, 0)
+        if self.segments:
+            if not isinstance(value, INTERVAL_TYPES) or value != value:
+                return None
+            idx = bisect_left(self.boundaries, value)
+            if idx < len(self.boundaries) and self.boundaries[idx] == value:
+                mask |= self.segments[2 * idx + 1]
+            else:
+                mask |= self.segments[2 * idx]
+        return mask
+
+
+def _is_exact(value):
+    """
+    Tells whether a number (or a missing bound) can be compared as a float.
+    """
+    if value is None or isinstance(value, bool):
+        return True
+    if isinstance(value, int):
+        return -FLOAT_LIMIT <= value <= FLOAT_LIMIT
+    if isinstance(value, float):
+        return value == value
+    if isinstance(value, Decimal):
+        return value.is_finite() and Decimal(float(value)) == value
+    return False
+
+
+def _bit_indexes(mask):
+    """
+    Returns the positions of the bits set in the mask, in increasing order.
+    """
+    indexes = []
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        indexes.append(bit.bit_length() - 1)
+    return indexes
+
+
+class DecisionContext(object):
+    """
+    The state of a single decision. The namespace of each input is created
+    and its input expression evaluated only once, when a rule first needs
+    it, and is then shared by all the rules of the table.
+    """
+
+    def __init__(self, script_engine, inputData, inputKwargs):
+        self.script_engine = script_engine
+        self.inputData = inputData
+        self.inputKwargs = inputKwargs
+        self.contexts = {}
+
+    def get_data(self, idx):
+        if self.inputData and isinstance(self.inputData[idx], dict):
+            local_data = dict(self.inputKwargs)
+            local_data.update(self.inputData[idx])
+            return local_data
+        return self.inputKwargs
+
+    def get_context(self, idx, input):
+        """
+        Returns the namespace of the given input, with the value of its input
+        expression bound to INPUT_NAME.
+        """
+        if idx not in self.contexts:
+            context = self.script_engine._evaluation_context(
+                self.get_data(idx), DMN_METHODS)
+            context[INPUT_NAME] = self.get_input_value(idx, input, context)
+            self.contexts[idx] = context
+        return self.contexts[idx]
+
+    def get_input_value(self, idx, input, context):
+        if not input.expression:
+            if self.inputData:
+                return self.inputData[idx]
+            # Backwards compatibility
+            return self.inputKwargs[input.label]
+        expression = input.expression
+        lhs, lhsNeedsEquals = self.script_engine._validate_expression(
+            expression)
+        if not lhsNeedsEquals:
+            raise WorkflowException(
+                "Input Expression '%s' is malformed" % expression)
+        return eval(self.script_engine.compile_expression(expression),
+                    context, context)
+
 
 class DMNEngine:
     """
     Handles the processing of a decision table.
+
+    The input entries of the table are compiled into predicates the first
+    time the table is used with a given kind of script engine. The leading
+    columns whose entries are all empty or simple comparisons with literals
+    are indexed, so that only the rules that match them are checked, in
+    their order in the table.
     """
 
+    # The number of inputs decide_many matches at once with NumPy.
+    batch_size = 1024
+
     def __init__(self, decisionTable, debug=None):
         self.decisionTable = decisionTable
         self.debug = debug
@@ -15,52 +390,185 @@ class DMNEngine:
         if not self.logger.handlers:
             self.logger.addHandler(logging.StreamHandler())
         self.logger.setLevel(getattr(logging, 'DEBUG' if debug else 'INFO'))
+        self._compiled = {}
+        self._indexes = {}
+
+    def compile(self, script_engine):
+        """
+        Returns the predicates of each rule of the decision table, as a list
+        per input entry of the rule.
+        """
+        key = script_engine.__class__
+        if key not in self._compiled:
+            self._compiled[key] = [
+                [[Predicate(script_engine, lhs)
+                  for lhs in inputEntry.lhs if lhs is not None]
+                 for inputEntry in rule.inputEntries]
+                for rule in self.decisionTable.rules]
+        return self._compiled[key]
+
+    def get_indexes(self, script_engine):
+        """
+        Returns the ColumnIndex of each of the leading columns that can be
+        indexed.
+        """
+        key = script_engine.__class__
+        if key not in self._indexes:
+            compiled = self.compile(script_engine)
+            indexes = []
+            for column in range(len(self.decisionTable.inputs)):
+                index = ColumnIndex.build(
+                    [predicates[column] if column < len(predicates) else None
+                     for predicates in compiled])
+                if index is None:
+                    break
+                indexes.append(index)
+            self._indexes[key] = indexes
+        return self._indexes[key]
 
     def decide(self, script_engine, *inputArgs, **inputKwargs):
-        for rule in self.decisionTable.rules:
-            res = self.__checkRule(rule, script_engine, *inputArgs, **inputKwargs)
-            if res:
-                return rule
-
-    def __checkRule(self, rule, script_engine, *inputData, **inputKwargs):
-        for idx, inputEntry in enumerate(rule.inputEntries):
-            input = self.decisionTable.inputs[idx]
-            local_data = {}
-            local_data.update(inputKwargs)
-            if inputData and isinstance(inputData[idx], dict):
-                local_data.update(inputData[idx])
-
-            for lhs in inputEntry.lhs:
-                if lhs is not None:
-                    inputVal = DMNEngine.__getInputVal(inputEntry, idx, *inputData, **inputKwargs)
-                else:
-                    inputVal = None
+        decision = DecisionContext(script_engine, inputArgs, inputKwargs)
+        candidates, start = self.__getCandidates(script_engine, decision)
+        return self.__findRule(script_engine, decision,
+                               _bit_indexes(candidates), start)
+
+    def decide_many(self, script_engine, inputs, vectorize=None):
+        """
+        Makes a decision for each of the given dictionaries of input data,
+        and returns a list with the matching rule (or None) for each.
+
+        The compiled predicates and indexes of the table are shared by all
+        decisions, and the lookups of each input value are cached. With
+        vectorize (the default when NumPy is installed), the indexed columns
+        are matched against a whole batch of inputs at once.
+
+        :param script_engine: the script engine that evaluates the table
+        :param inputs: an iterable of dictionaries of input data
+        :param vectorize: whether to use NumPy
+        :returns: a list of rules
+        """
+        if vectorize is None:
+            vectorize = have_numpy
+        elif vectorize and not have_numpy:
+            raise Exception("Unable to import numpy.")
+        decisions = [DecisionContext(script_engine, (), data)
+                     for data in inputs]
+        rules = []
+        if vectorize:
+            for first in range(0, len(decisions), self.batch_size):
+                batch = decisions[first:first + self.batch_size]
+                matches, start = self.__getMatches(script_engine, batch)
+                for decision, match in zip(batch, matches):
+                    rules.append(self.__findRule(
+                        script_engine, decision,
+                        numpy.flatnonzero(match).tolist(), start))
+            return rules
+        cache = {}
+        for decision in decisions:
+            candidates, start = self.__getCandidates(script_engine, decision,
+                                                     cache)
+            rules.append(self.__findRule(script_engine, decision,
+                                         _bit_indexes(candidates), start))
+        return rules
+
+    def __findRule(self, script_engine, decision, candidates, start):
+        """
+        Returns the first of the candidate rules that matches the columns
+        from start on.
+        """
+        compiled = self.compile(script_engine)
+        rules = self.decisionTable.rules
+        for idx in candidates:
+            if self.__checkRule(rules[idx], compiled[idx], decision, start):
+                return rules[idx]
+
+    def __getInputValue(self, decision, column):
+        context = decision.get_context(column,
+                                       self.decisionTable.inputs[column])
+        return context[INPUT_NAME]
+
+    def __getMatches(self, script_engine, decisions):
+        """
+        Returns a boolean NumPy array with a row per decision, telling which
+        rules match the indexed columns, and the first column the candidates
+        still need to be checked against. See __getCandidates.
+        """
+        rule_count = len(self.decisionTable.rules)
+        matches = numpy.ones((len(decisions), rule_count), dtype=bool)
+        for column, index in enumerate(self.get_indexes(script_engine)):
+            if index.equals or index.segments:
+                try:
+                    values = [self.__getInputValue(decision, column)
+                              for decision in decisions]
+                    column_matches = index.get_matches(values, rule_count)
+                except Exception:
+                    column_matches = None
+                if column_matches is None:
+                    return matches, column
+                matches &= column_matches
+        return matches, len(self.get_indexes(script_engine))
+
+    def __getCandidates(self, script_engine, decision, cache=None):
+        """
+        Returns the mask of the rules that match the indexed columns, and the
+        first column the candidates still need to be checked against.
+
+        A rule that does not match a column is never checked against the
+        columns after it, so the index of a column can only be used if the
+        columns before it were indexed as well. Whenever an input cannot be
+        looked up, its column and the following ones are checked for each
+        candidate rule instead, which raises any errors as before.
+        """
+        candidates = (1 << len(self.decisionTable.rules)) - 1
+        for column, index in enumerate(self.get_indexes(script_engine)):
+            if index.equals or index.segments:
+                try:
+                    value = self.__getInputValue(decision, column)
+                    if cache is not None and type(value) in EQUALITY_TYPES:
+                        key = (column, type(value), value)
+                        if key not in cache:
+                            cache[key] = index.get_candidates(value)
+                        mask = cache[key]
+                    else:
+                        mask = index.get_candidates(value)
+                except Exception:
+                    mask = None
+                if mask is None:
+                    return candidates, column
+                candidates &= mask
+        return candidates, len(self.get_indexes(script_engine))
+
+    def __checkRule(self, rule, predicates, decision, start=0):
+        for idx, inputEntry in enumerate(rule.inputEntries[start:], start):
+            # Empty means ignore decision value
+            for predicate in predicates[idx]:
                 try:
-                    if not script_engine.eval_dmn_expression(inputVal, lhs, **local_data):
+                    if predicate.error is not None:
+                        raise predicate.error
+                    context = decision.get_context(idx, inputEntry.input)
+                    if not predicate(context):
                         return False
                 except NameError as e:
                     bad_variable = re.match("name '(.+)' is not defined",
                                             str(e)).group(1)
-                    most_similar = levenshtein.most_similar(bad_variable,
-                                                            local_data.keys(),
-                                                            3)
+                    most_similar = levenshtein.most_similar(
+                        bad_variable, decision.get_data(idx).keys(), 3)
                     raise NameError("Failed to execute "
                                     "expression: '%s' is '%s' in the "
                                     "Row with annotation '%s'.  The following "
                                     "value does not exist: %s - did you mean one of %s?" % (
-                                        inputVal, lhs, rule.description, str(e),str(most_similar)))
+                                        self.__getInputVal(inputEntry, idx, decision),
+                                        predicate.lhs, rule.description, str(e), str(most_similar)))
                 except Exception as e:
                     raise Exception("Failed to execute "
                                     "expression: '%s' is '%s' in the "
                                     "Row with annotation '%s', %s" % (
-                                        inputVal, lhs, rule.description, str(e)))
-                else:
-                    # Empty means ignore decision value
-                    continue  # Check the other operators/columns
+                                        self.__getInputVal(inputEntry, idx, decision),
+                                        predicate.lhs, rule.description, str(e)))
         return True
 
     @staticmethod
-    def __getInputVal(inputEntry, idx, *inputData, **inputKwargs):
+    def __getInputVal(inputEntry, idx, decision):
         """
         The input of the decision method can be an expression, args or kwargs.
         It prefers an input expression per the Specification, but will fallback
@@ -69,14 +577,13 @@ class DMNEngine:
 
         :param inputEntry:
         :param idx:
-        :param inputData:
-        :param inputKwargs:
+        :param decision:
         :return:
         """
         if inputEntry.input.expression:
             return inputEntry.input.expression
-        elif inputData:
-            return "%r" % inputData[idx]
+        elif decision.inputData:
+            return "%r" % decision.inputData[idx]
         else:
             # Backwards compatibility
-            return "%r" % inputKwargs[inputEntry.input.label]
+            return "%r" % decision.inputKwargs.get(inputEntry.input.label)
@@ -1,8 +1,12 @@
 import glob
+from io import BytesIO
 
 from SpiffWorkflow.bpmn.parser.util import xpath_eval
 
-from SpiffWorkflow.bpmn.parser.BpmnParser import BpmnParser, full_tag
+from SpiffWorkflow.bpmn.parser.BpmnParser import (BpmnParser, full_tag,
+                                                  CAMUNDA_MODEL_NS,
+                                                  _FILE_ERRORS)
+from SpiffWorkflow.bpmn.parser.SpecCache import SpecCache
 from SpiffWorkflow.dmn.parser.BusinessRuleTaskParser import BusinessRuleTaskParser
 from SpiffWorkflow.dmn.parser.DMNParser import DMNParser
 from SpiffWorkflow.dmn.specs.BusinessRuleTask import BusinessRuleTask
@@ -15,10 +19,56 @@ class BpmnDmnParser(BpmnParser):
                                        BusinessRuleTask)
     }
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, spec_cache=None, executor=None):
+        super().__init__(spec_cache=spec_cache, executor=executor)
         self.dmn_parsers = {}
         self.dmn_parsers_by_name = {}
+        self._dmn_digests = {}
+        self._dmn_files = {}
+        self._unparsed_dmn = {}
+
+    def get_process_parser(self, process_id_or_name):
+        # The processes may need any of the decisions, so DMN files that
+        # were not parsed yet are parsed first.
+        for filename in list(self._unparsed_dmn):
+            content = self._unparsed_dmn.pop(filename)
+            self.add_dmn_xml(etree.parse(BytesIO(content)).getroot(),
+                             filename=filename)
+        return super().get_process_parser(process_id_or_name)
+
+    def _summarize_process(self, node):
+        summary = super()._summarize_process(node)
+        summary['decisions'] = [
+            task.get('{%s}decisionRef' % CAMUNDA_MODEL_NS)
+            for task in xpath_eval(node)('.//bpmn:businessRuleTask')]
+        return summary
+
+    def _get_spec_key_parts(self, process_id, seen):
+        parts = super()._get_spec_key_parts(process_id, seen)
+        if parts is None:
+            return None
+        for decision in self._process_summaries[process_id]['decisions']:
+            if decision not in self._dmn_digests:
+                return None
+            parts.extend([decision, self._dmn_digests[decision]])
+        return parts
+
+    def _get_worker_state(self, process_id):
+        state = super()._get_worker_state(process_id)
+        decisions = set()
+        for summary in self._process_summaries.values():
+            if summary['filename'] in state['bpmn']:
+                decisions.update(summary['decisions'])
+        state['dmn'] = dict((decision, self._dmn_files[decision])
+                            for decision in decisions
+                            if decision in self._dmn_files)
+        state['dmn_digests'] = self._dmn_digests
+        return state
+
+    def _set_worker_state(self, state):
+        super()._set_worker_state(state)
+        self._dmn_digests = state['dmn_digests']
+        self._unparsed_dmn = dict(state['dmn'].values())
 
     def add_dmn_xml(self, node, svg=None, filename=None):
         """
@@ -29,6 +79,7 @@ class BpmnDmnParser(BpmnParser):
             self, node, svg, filename=filename, doc_xpath=xpath)
         self.dmn_parsers[dmn_parser.get_id()] = dmn_parser
         self.dmn_parsers_by_name[dmn_parser.get_name()] = dmn_parser
+        return dmn_parser
 
     def add_dmn_file(self, filename):
         """
@@ -47,9 +98,57 @@ class BpmnDmnParser(BpmnParser):
         """
         Add all filenames in the given list to the parser's set.
         """
+        if self.spec_cache is not None or self.executor is not None:
+            self._add_lazy_dmn_files(filenames)
+            return
         for filename in filenames:
             f = open(filename, 'r')
             try:
                 self.add_dmn_xml(etree.parse(f).getroot(), filename=filename)
             finally:
                 f.close()
+
+    def _add_lazy_dmn_files(self, filenames):
+        # Like the BPMN files, only the ID of the decision of each file is
+        # needed up front.
+        loaded = []
+        for filename in filenames:
+            with open(filename, 'rb') as f:
+                content = f.read()
+            digest = SpecCache.get_digest(content)
+            decision_id = future = None
+            if self.spec_cache is not None:
+                decision_id = self.spec_cache.load(
+                    'decision', self._get_cache_key(['decision', digest]))
+            if decision_id is None and self.executor is not None:
+                future = self.executor.submit(
+                    _summarize_dmn_file, type(self), content, filename)
+            loaded.append((filename, content, digest, decision_id, future))
+
+        for filename, content, digest, decision_id, future in loaded:
+            cached = decision_id is not None
+            if future is not None:
+                decision_id = future.result()
+            if decision_id is None:
+                decision_id = self.add_dmn_xml(
+                    etree.parse(BytesIO(content)).getroot(),
+                    filename=filename).get_id()
+            else:
+                self._unparsed_dmn[filename] = content
+            if self.spec_cache is not None and not cached:
+                self.spec_cache.store(
+                    'decision', self._get_cache_key(['decision', digest]),
+                    decision_id)
+            self._dmn_digests[decision_id] = digest
+            self._dmn_files[decision_id] = (filename, content)
+
+
+def _summarize_dmn_file(parser_class, content, filename):
+    # Runs on the executor of a parser: returns the ID of the decision of
+    # the file.
+    parser = parser_class()
+    try:
+        return parser.add_dmn_xml(etree.parse(BytesIO(content)).getroot(),
+                                  filename=filename).get_id()
+    except _FILE_ERRORS:
+        return None
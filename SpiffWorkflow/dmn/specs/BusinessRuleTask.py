@@ -25,15 +25,25 @@ class BusinessRuleTask(Simple, BpmnSpecMixin):
     @timeit
     def _on_complete_hook(self, my_task):
         try:
-            self.res = self.dmnEngine.decide(my_task.workflow.script_engine,
-                                             **my_task.data)
+            future = my_task.workflow._pop_execution(my_task)
+            if future is None:
+                self.res = self._execute(my_task, my_task.data_view)
+            else:
+                self.res = future.result()
             if self.res is not None:  # it is conceivable that no rules fire.
                 self.resDict = self.res.output_as_dict(my_task)
-                my_task.data = DeepMerge.merge(my_task.data,self.resDict)
+                DeepMerge.merge(my_task._get_own_data(), self.resDict)
             super(BusinessRuleTask, self)._on_complete_hook(my_task)
         except Exception as e:
             raise WorkflowTaskExecException(my_task, str(e))
 
+    def _execute(self, my_task, data):
+        """
+        Returns the rule that matches the given data. May be called from
+        another thread, with a copy of the task data.
+        """
+        return self.dmnEngine.decide(my_task.workflow.script_engine, **data)
+
     def serialize(self, serializer):
         return serializer.serialize_business_rule_task(self)
 
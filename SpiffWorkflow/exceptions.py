@@ -74,7 +74,7 @@ class WorkflowTaskExecException(WorkflowException):
         elif isinstance(exception, NameError):
             # Use Levenshitein to find most simiar items.
             bad_variable = re.match("name '(.+)' is not defined", str(exception)).group(1)
-            most_similar = levenshtein.most_similar(bad_variable, task.data.keys(), 3)
+            most_similar = levenshtein.most_similar(bad_variable, task.data_view.keys(), 3)
             error_msg = f'something you are referencing does not exist: ' \
                             f'"{exception}".'
             error_msg += f' Did you mean \'{most_similar}\'?'
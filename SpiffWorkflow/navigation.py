@@ -179,6 +179,8 @@ def set_deep_state(nav_items):
 def get_flat_nav_list(workflow):
     # This takes the flat navigation returned from the follow_tree, and
     # adds task states, producing a full flat navigation list.
+    if workflow.lazy_prediction:
+        workflow.predict()
     nav_items = []
     for top in workflow.task_tree.children[0].task_spec.outputs:
         nav_items.extend(follow_tree(top, output=[],
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+import pickle
+import struct
+import uuid
+from operator import itemgetter
+from .dict import DictionarySerializer
+
+MAGIC = b'SPFB\x01'
+
+(NONE, TRUE, FALSE, INT, FLOAT, STR, STR_REF, BYTES, BYTES_REF, PICKLE,
+ PICKLE_REF, UUID, LIST, DICT) = range(14)
+
+_double = struct.Struct('>d')
+_get_key = itemgetter(0)
+
+
+def _write_uint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _Encoder(object):
+    """
+    Writes a value made of dicts, lists, strings, bytes, numbers, UUIDs and
+    None. Each string and each bytes object is written once; the following
+    occurrences refer to the first one by its number. Any other object is
+    pickled, and its pickle is shared in the same way. Like in JSON, tuples
+    are written as lists, which the DictionarySerializer relies on, and the
+    items of dicts are sorted by key, so that equal states are written the
+    same way.
+    """
+
+    def __init__(self):
+        self.out = bytearray(MAGIC)
+        self.strings = {}
+        self.blobs = {}
+        self.pickles = {}
+
+    def write(self, value):
+        out = self.out
+        cls = type(value)
+        if value is None:
+            out.append(NONE)
+        elif cls is bool:
+            out.append(TRUE if value else FALSE)
+        elif cls is int:
+            out.append(INT)
+            _write_uint(out, value << 1 if value >= 0 else (~value << 1) | 1)
+        elif cls is str:
+            self._write_shared(STR, STR_REF, self.strings, value,
+                               value.encode('utf-8'))
+        elif cls is bytes:
+            self._write_shared(BYTES, BYTES_REF, self.blobs, value, value)
+        elif cls is dict:
+            out.append(DICT)
+            _write_uint(out, len(value))
+            try:
+                items = sorted(value.items(), key=_get_key)
+            except TypeError:
+                items = value.items()
+            for key, item in items:
+                self.write(key)
+                self.write(item)
+        elif cls is list or cls is tuple:
+            out.append(LIST)
+            _write_uint(out, len(value))
+            for item in value:
+                self.write(item)
+        elif cls is uuid.UUID:
+            out.append(UUID)
+            out += value.bytes
+        elif cls is float:
+            out.append(FLOAT)
+            out += _double.pack(value)
+        else:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._write_shared(PICKLE, PICKLE_REF, self.pickles, blob, blob)
+
+    def _write_shared(self, tag, ref_tag, table, key, data):
+        out = self.out
+        number = table.get(key)
+        if number is not None:
+            out.append(ref_tag)
+            _write_uint(out, number)
+            return
+        table[key] = len(table)
+        out.append(tag)
+        _write_uint(out, len(data))
+        out += data
+
+
+class _Decoder(object):
+
+    def __init__(self, data):
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError('Not a binary workflow state')
+        self.data = data
+        self.pos = len(MAGIC)
+        self.strings = []
+        self.blobs = []
+        self.pickles = []
+
+    def _read_uint(self):
+        data = self.data
+        result = shift = 0
+        while True:
+            byte = data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def _read_bytes(self):
+        length = self._read_uint()
+        start = self.pos
+        self.pos += length
+        return bytes(self.data[start:self.pos])
+
+    def read(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            value = self._read_uint()
+            return ~(value >> 1) if value & 1 else value >> 1
+        if tag == STR:
+            value = self._read_bytes().decode('utf-8')
+            self.strings.append(value)
+            return value
+        if tag == STR_REF:
+            return self.strings[self._read_uint()]
+        if tag == BYTES:
+            value = self._read_bytes()
+            self.blobs.append(value)
+            return value
+        if tag == BYTES_REF:
+            return self.blobs[self._read_uint()]
+        if tag == PICKLE:
+            value = self._read_bytes()
+            self.pickles.append(value)
+            return pickle.loads(value)
+        if tag == PICKLE_REF:
+            # Each occurrence of a pickled object is a copy of its own, as it
+            # was before it was written.
+            return pickle.loads(self.pickles[self._read_uint()])
+        if tag == DICT:
+            length = self._read_uint()
+            result = {}
+            for idx in range(length):
+                key = self.read()
+                result[key] = self.read()
+            return result
+        if tag == LIST:
+            return [self.read() for idx in range(self._read_uint())]
+        if tag == UUID:
+            start = self.pos
+            self.pos += 16
+            return uuid.UUID(bytes=bytes(self.data[start:self.pos]))
+        if tag == FLOAT:
+            start = self.pos
+            self.pos += 8
+            return _double.unpack(self.data[start:self.pos])[0]
+        raise ValueError('Invalid binary workflow state')
+
+
+def dumps(value):
+    """
+    Returns the given value (e.g. a serialized workflow) as bytes.
+    """
+    encoder = _Encoder()
+    encoder.write(value)
+    return bytes(encoder.out)
+
+
+def loads(data):
+    """
+    Returns the value that dumps() turned into the given bytes.
+    """
+    return _Decoder(memoryview(data)).read()
+
+
+def is_binary(data):
+    """
+    Returns True if the given object was made by dumps().
+    """
+    return isinstance(data, bytes) and data.startswith(MAGIC)
+
+
+class BinarySerializer(DictionarySerializer):
+    """
+    Serializes workflows and workflow specs to a compact binary format,
+    instead of JSON: the names of the task specs and all other strings are
+    written once and then referred to by number, UUIDs take their 16 bytes,
+    states are written as small integers, and identical data values (which
+    the tasks inherit from each other) are only written once.
+    """
+
+    def serialize_dict(self, thedict):
+        return dict((str(k), pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL))
+                    for k, v in list(thedict.items()))
+
+    def deserialize_dict(self, s_state):
+        return dict((k, pickle.loads(v)) for k, v in list(s_state.items()))
+
+    def serialize_list(self, thelist):
+        return [pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+                for v in thelist]
+
+    def deserialize_list(self, s_state):
+        return [pickle.loads(v) for v in s_state]
+
+    def serialize_workflow_spec(self, wf_spec, **kwargs):
+        thedict = super(BinarySerializer, self).serialize_workflow_spec(
+            wf_spec, **kwargs)
+        return dumps(thedict)
+
+    def deserialize_workflow_spec(self, s_state, **kwargs):
+        thedict = loads(s_state)
+        return super(BinarySerializer, self).deserialize_workflow_spec(
+            thedict, **kwargs)
+
+    def serialize_workflow(self, workflow, **kwargs):
+        thedict = super(BinarySerializer, self).serialize_workflow(
+            workflow, **kwargs)
+        return dumps(thedict)
+
+    def deserialize_workflow(self, s_state, **kwargs):
+        thedict = loads(s_state)
+        return super(BinarySerializer, self).deserialize_workflow(
+            thedict, **kwargs)
@@ -769,7 +769,16 @@ class DictionarySerializer(Serializer):
         s_state['success'] = workflow.success
 
         # task_tree
-        s_state['task_tree'] = self.serialize_task(workflow.task_tree)
+        if workflow.lazy_prediction:
+            workflow.predict()
+        # Most tasks inherit the same data, which is only written once to
+        # the task_data table; the tasks refer to it by its position. The
+        # table is passed down the calls, so that the serializer can be
+        # used by several threads at once.
+        data_table = {'ids': {}, 'contents': {}, 'objects': [], 'data': []}
+        s_state['task_tree'] = self.serialize_task(workflow.task_tree,
+                                                   data_table=data_table)
+        s_state['task_data'] = data_table['data']
 
         return s_state
 
@@ -799,27 +808,28 @@ class DictionarySerializer(Serializer):
         workflow.spec = wf_spec
 
         # task_tree
+        # Parents are connected while the children are deserialized.
+        data_table = {'data': s_state.get('task_data', []), 'objects': {}}
         workflow.task_tree = self.deserialize_task(
-            workflow, s_state['task_tree'])
+            workflow, s_state['task_tree'], data_table=data_table)
 
-        # Re-connect parents
-        tasklist = list(workflow.get_tasks())
-        for task in tasklist:
-            task.parent = workflow.get_task(task.parent,tasklist)
+        # task indexes and task_mapping
+        workflow.update_task_index()
 
         # last_task
-        workflow.last_task = workflow.get_task(s_state['last_task'],tasklist)
-
-        # task_mapping
-        workflow.update_task_mapping()
+        workflow.last_task = workflow.get_task(s_state['last_task'])
 
         return workflow
 
 
-    def serialize_task(self, task, skip_children=False, allow_subs=False):
+    def serialize_task(self, task, skip_children=False, allow_subs=False,
+                       data_table=None):
         """
              :param allow_subs: Allows sub-serialization to take place, otherwise
              assumes that the subworkflow is stored in internal data and raises an error.
+             :param data_table: The task_data table of the workflow that is
+             being serialized (see serialize_workflow()), or None to include
+             the data in the task.
         """
 
         assert isinstance(task, Task)
@@ -843,7 +853,8 @@ class DictionarySerializer(Serializer):
         # children
         if not skip_children:
             s_state['children'] = [
-                self.serialize_task(child) for child in task.children]
+                self.serialize_task(child, data_table=data_table)
+                for child in task.children]
 
         # state
         s_state['state'] = task.state
@@ -856,10 +867,14 @@ class DictionarySerializer(Serializer):
         s_state['last_state_change'] = task.last_state_change
 
         # data
-        s_state['data'] = self.serialize_dict(task.data)
+        if data_table is None:
+            s_state['data'] = self.serialize_dict(task._get_shared_data())
+        else:
+            s_state['data_ref'] = self._serialize_task_data_ref(task,
+                                                                data_table)
 
         # internal_data
-        s_state['internal_data'] = task.internal_data
+        s_state['internal_data'] = task._internal_data or {}
 
         return s_state
 
@@ -876,7 +891,7 @@ class DictionarySerializer(Serializer):
 
 
 
-    def deserialize_task(self, workflow, s_state):
+    def deserialize_task(self, workflow, s_state, data_table=None):
         assert isinstance(workflow, Workflow)
         splits = s_state['task_spec'].split('_')
         oldtaskname = s_state['task_spec']
@@ -970,12 +985,12 @@ class DictionarySerializer(Serializer):
         task.id = s_state['id']
 
         # parent
-        # as the task_tree might not be complete yet
-        # keep the ids so they can be processed at the end
-        task.parent = s_state['parent']
+        # is set by the deserializer of the parent task, see
+        # _deserialize_task_children()
 
         # children
-        task.children = self._deserialize_task_children(task, s_state)
+        task.children = self._deserialize_task_children(task, s_state,
+                                                        data_table)
 
         # state
         task._state = s_state['state']
@@ -985,14 +1000,60 @@ class DictionarySerializer(Serializer):
         task.last_state_change = s_state['last_state_change']
 
         # data
-        task.data = self.deserialize_dict(s_state['data'])
+        if 'data_ref' in s_state:
+            # Tasks with the same data share it until it is changed, as if
+            # they had inherited it.
+            task._data = None
+            task._shared_data = self._deserialize_task_data_ref(
+                s_state['data_ref'], data_table)
+        else:
+            task.data = self.deserialize_dict(s_state['data'])
 
         # internal_data
-        task.internal_data = s_state['internal_data']
+        task.internal_data = s_state['internal_data'] or None
         return task
 
-    def _deserialize_task_children(self, task, s_state):
+    def _serialize_task_data_ref(self, task, table):
+        """
+        Returns the position of the data of the given task in the given
+        task_data table of the workflow that is being serialized, and adds
+        the data to the table if it is not there yet. Data is found by
+        identity first, since inherited data is shared between the tasks,
+        and then by its serialized content.
+        """
+        data = task._get_shared_data()
+        ref = table['ids'].get(id(data))
+        if ref is not None:
+            return ref
+        s_data = self.serialize_dict(data)
+        try:
+            content = tuple(sorted(s_data.items()))
+            ref = table['contents'].get(content)
+        except TypeError:
+            content = None
+        if ref is None:
+            ref = len(table['data'])
+            table['data'].append(s_data)
+            if content is not None:
+                table['contents'][content] = ref
+        # Keep the data alive, so that its id is not reused while the
+        # workflow is serialized.
+        table['objects'].append(data)
+        table['ids'][id(data)] = ref
+        return ref
+
+    def _deserialize_task_data_ref(self, ref, table):
+        data = table['objects'].get(ref)
+        if data is None:
+            data = self.deserialize_dict(table['data'][ref])
+            table['objects'][ref] = data
+        return data
+
+    def _deserialize_task_children(self, task, s_state, data_table=None):
         """This may need to be overridden if you need to support
          deserialization of sub-workflows"""
-        return [self.deserialize_task(task.workflow, c)
-                         for c in s_state['children']]
+        children = [self.deserialize_task(task.workflow, c, data_table)
+                    for c in s_state['children']]
+        for child in children:
+            child.parent = task
+        return children
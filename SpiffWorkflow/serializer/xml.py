@@ -698,6 +698,8 @@ class XmlSerializer(Serializer):
 
         if workflow.success:
             SubElement(elem, 'success')
+        if workflow.lazy_prediction:
+            workflow.predict()
         task_tree_elem = SubElement(elem, 'task-tree')
         task_tree_elem.append(self.serialize_task(workflow.task_tree))
 
@@ -718,6 +720,8 @@ class XmlSerializer(Serializer):
         task_tree_elem = elem.find('task-tree')
         workflow.task_tree = self.deserialize_task(workflow, task_tree_elem[0])
 
+        workflow.update_task_index()
+
         # Re-connect parents
         for task in workflow.get_tasks():
             task.parent = workflow.get_task(task.parent)
@@ -757,9 +761,10 @@ class XmlSerializer(Serializer):
         SubElement(elem, 'spec').text = task.task_spec.name
         SubElement(elem, 'last-state-change').text = str(
             task.last_state_change)
-        self.serialize_value_map(SubElement(elem, 'data'), task.data)
+        self.serialize_value_map(SubElement(elem, 'data'), task.data_view)
         internal_data_elem = SubElement(elem, 'internal-data')
-        self.serialize_value_map(internal_data_elem, task.internal_data)
+        self.serialize_value_map(internal_data_elem,
+                                 task._internal_data or {})
 
         return elem
 
@@ -789,6 +794,7 @@ class XmlSerializer(Serializer):
         task.last_state_change = float(elem.findtext('last-state-change'))
         task.data = self.deserialize_value_map(elem.find('data'))
         internal_data_elem = elem.find('internal-data')
-        task.internal_data = self.deserialize_value_map(internal_data_elem)
+        task.internal_data = \
+            self.deserialize_value_map(internal_data_elem) or None
 
         return task
@@ -31,6 +31,9 @@ class CancelTask(Trigger):
     """
 
     def _on_complete_hook(self, my_task):
+        # Predicted tasks are cancelled as well.
+        if my_task.workflow.lazy_prediction:
+            my_task.workflow.predict()
         for task_name in self.context:
             cancel_tasks = my_task.workflow.get_task_spec_from_name(task_name)
             for cancel_task in my_task._get_root()._find_any(cancel_tasks):
@@ -58,6 +58,8 @@ class Choose(Trigger):
     def _on_complete_hook(self, my_task):
         context = my_task.workflow.get_task_spec_from_name(self.context)
         triggered = []
+        if my_task.workflow.lazy_prediction:
+            my_task.workflow.predict()
         for task in my_task.workflow.task_tree:
             if task.thread_id != my_task.thread_id:
                 continue
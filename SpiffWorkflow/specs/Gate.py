@@ -54,6 +54,8 @@ class Gate(TaskSpec):
     def _update_hook(self, my_task):
         context_task = my_task.workflow.get_task_spec_from_name(self.context)
         root_task = my_task.workflow.task_tree
+        if my_task.workflow.lazy_prediction:
+            my_task.workflow.predict()
         for task in root_task._find_any(context_task):
             if task.thread_id != my_task.thread_id:
                 continue
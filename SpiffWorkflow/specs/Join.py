@@ -132,9 +132,12 @@ class Join(TaskSpec):
             threshold = len(self.inputs)
 
         # Look at the tree to find all places where this task is used.
-        tasks = []
-        for input in self.inputs:
-            tasks += my_task.workflow.task_mapping[my_task.thread_id][input]
+        if my_task.workflow.lazy_prediction:
+            tasks = self._predict_inputs(my_task)
+        else:
+            tasks = []
+            for input in self.inputs:
+                tasks += my_task.workflow.task_mapping[my_task.thread_id][input]
 
         # Look up which tasks have already completed.
         waiting_tasks = []
@@ -148,6 +151,29 @@ class Join(TaskSpec):
         # If the threshold was reached, get ready to fire.
         return force or completed >= threshold, waiting_tasks
 
+    def _predict_inputs(self, my_task):
+        # The lazy prediction may have left out tasks of the inputs, so the
+        # branches that lead to them are predicted, and the tasks are looked
+        # up in the tree rather than in the task mapping of the workflow.
+        leading_specs = set(self.inputs)
+        specs = list(self.inputs)
+        while specs:
+            for spec in specs.pop().inputs:
+                if spec not in leading_specs:
+                    leading_specs.add(spec)
+                    specs.append(spec)
+
+        tasks = [task for task in Task.Iterator(my_task.workflow.task_tree,
+                                                Task.NOT_FINISHED_MASK)
+                 if task.thread_id == my_task.thread_id
+                 and task.task_spec in leading_specs
+                 and (task.parent is None or task.parent._is_finished())]
+        for task in tasks:
+            task.task_spec._predict(task, lazy=False)
+        return [task for task in my_task.workflow.task_tree
+                if task.thread_id == my_task.thread_id
+                and task.task_spec in self.inputs]
+
     def _check_threshold_structured(self, my_task, force=False):
         # Retrieve a list of all activated tasks from the associated
         # task that did the conditional parallel split.
@@ -167,7 +193,7 @@ class Join(TaskSpec):
         completed = 0
         for task in tasks:
             # Refresh path prediction.
-            task.task_spec._predict(task)
+            task.task_spec._predict(task, lazy=False)
 
             if not self._branch_may_merge_at(task):
                 completed += 1
@@ -179,6 +205,13 @@ class Join(TaskSpec):
         # If the threshold was reached, get ready to fire.
         return force or completed >= threshold, waiting_tasks
 
+    def _get_wakeup_events(self, my_task):
+        # Without a split task, only the tasks of the inputs are counted.
+        # Otherwise the threshold depends on any task of the branches.
+        if self.split_task is None:
+            return list(self.inputs)
+        return None
+
     def _start(self, my_task, force=False):
         """
         Checks whether the preconditions for going to READY state are met.
@@ -39,9 +39,9 @@ class Merge(Join):
                 LOG.debug("Merging %s (%s) into %s" % (task.get_name(),
                                                        task.get_state_name(
                 ), self.name),
-                    extra=dict(data=task.data))
-                _log_overwrites(my_task.data, task.data)
-                merge_dictionary(my_task.data, task.data)
+                    extra=dict(data=task.data_view))
+                _log_overwrites(my_task.data_view, task.data_view)
+                merge_dictionary(my_task._get_own_data(), task.data_view)
         return super(Merge, self)._do_join(my_task)
 
     @classmethod
@@ -112,6 +112,7 @@ class SubWorkflow(TaskSpec):
         for child in subworkflow.task_tree.children:
             my_task.children.insert(0, child)
             child.parent = my_task
+        subworkflow._integrate_task_index(subworkflow.task_tree.children)
 
     def _on_ready_hook(self, my_task):
         # Assign variables, if so requested.
@@ -128,7 +129,8 @@ class SubWorkflow(TaskSpec):
         # Assign variables, if so requested.
         for child in my_task.children:
             if subworkflow.last_task is not None:
-                child.data.update(subworkflow.last_task.data)
+                child._get_own_data().update(
+                    subworkflow.last_task._get_shared_data())
             if child.task_spec in self.outputs:
                 for assignment in self.out_assign:
                     assignment.assign(subworkflow, child)
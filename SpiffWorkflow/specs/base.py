@@ -233,7 +233,7 @@ class TaskSpec(object):
         if len(self.inputs) < 1:
             raise WorkflowException(self, 'No input task connected.')
 
-    def _predict(self, my_task, seen=None, looked_ahead=0):
+    def _predict(self, my_task, seen=None, looked_ahead=0, lazy=None):
         """
         Updates the branch such that all possible future routes are added.
 
@@ -245,9 +245,15 @@ class TaskSpec(object):
         :param seen: A list of already visited tasks.
         :type  looked_ahead: integer
         :param looked_ahead: The depth of the predicted path so far.
+        :type  lazy: bool
+        :param lazy: Whether definite paths are only predicted up to the
+                     lookahead as well. Defaults to the lazy_prediction
+                     setting of the workflow.
         """
         if my_task._is_finished():
             return
+        if lazy is None:
+            lazy = getattr(my_task.workflow, 'lazy_prediction', False)
         if seen is None:
             seen = []
         elif self in seen:
@@ -258,8 +264,10 @@ class TaskSpec(object):
             if looked_ahead + 1 >= self.lookahead:
                 return
             seen.append(self)
+        elif lazy and looked_ahead + 1 >= self.lookahead:
+            return
         for child in my_task.children:
-            child.task_spec._predict(child, seen[:], looked_ahead + 1)
+            child.task_spec._predict(child, seen[:], looked_ahead + 1, lazy)
 
     def _predict_hook(self, my_task):
         # If the task's status is not predicted, we default to FUTURE
@@ -305,6 +313,38 @@ class TaskSpec(object):
         self.entered_event.emit(my_task.workflow, my_task)
         my_task._ready()
 
+    def _get_wakeup_events(self, my_task):
+        """
+        Called when the given task remains in the WAITING state, to find
+        out what it is waiting for. Events are the task specs of tasks that
+        complete, ('cancel', task_spec) for tasks that are cancelled, or the
+        messages and signals that are sent. The task is
+        then only updated when one of these events occurs, or when all
+        waiting tasks are refreshed.
+
+        Returning None causes the task to be updated whenever any task
+        completes.
+
+        :type  my_task: Task
+        :param my_task: The associated task in the task tree.
+        :rtype:  list or None
+        :returns: The events the task is waiting for.
+        """
+        return None
+
+    def _get_wakeup_time(self, my_task):
+        """
+        Called when the given task remains in the WAITING state. Returns
+        the time (as a timestamp) after which the task has to be updated
+        again, or None if it does not wait for a point in time.
+
+        :type  my_task: Task
+        :param my_task: The associated task in the task tree.
+        :rtype:  float or None
+        :returns: The time to update the task at.
+        """
+        return None
+
     def _on_ready(self, my_task):
         """
         Return True on success, False otherwise.
@@ -370,6 +410,7 @@ class TaskSpec(object):
         :param my_task: The associated task in the task tree.
         """
         self.cancelled_event.emit(my_task.workflow, my_task)
+        my_task.workflow._task_cancelled_notify(my_task)
 
     def _on_trigger(self, my_task):
         """
@@ -23,6 +23,7 @@ from builtins import object
 from SpiffWorkflow.exceptions import WorkflowException
 import logging
 import time
+from types import MappingProxyType
 from uuid import uuid4
 import random
 
@@ -91,7 +92,25 @@ class Task(object):
     those tasks may be removed from the tree at runtime later. They are
     created to allow for visualizing the workflow at a time where
     the required decisions have not yet been made.
+
+    Since a tree may hold many predicted tasks, tasks are kept small: the
+    attributes are slots, the data, internal_data and mi_collect_data
+    dicts are created once they are used, and state_history and log are
+    only recorded if the workflow records the history of its tasks (see
+    Workflow). Task specs may still set attributes of their own.
+
+    The data that a task inherits from its parent is copied on write: the
+    task shares the data of its parent (as it was when it was inherited)
+    until the data of either of them is changed, which then gets a copy of
+    its own. Task.data counts as a change, since the dict it returns may
+    be changed at any time; use Task.data_view to only read the data.
     """
+    __slots__ = ('workflow', 'parent', 'children', '_state', 'triggered',
+                 'state_history', '_log', 'task_spec', 'id', 'thread_id',
+                 'last_state_change', '_data', '_shared_data', '_data_exposed',
+                 'terminate_current_loop', '_internal_data',
+                 '_mi_collect_data', '__dict__')
+
     # Note: The states in this list are ordered in the sequence in which
     # they may appear. Do not change.
     MAYBE = 1
@@ -210,18 +229,119 @@ class Task(object):
         self.children = []
         self._state = state
         self.triggered = False
-        self.state_history = [state]
-        self.log = []
+        if getattr(workflow, 'record_history', True):
+            self.state_history = [state]
+        else:
+            self.state_history = None
+        self._log = None
         self.task_spec = task_spec
         self.id = uuid4() #UUID(int=random.getrandbits(128),version=4)
         self.thread_id = self.__class__.thread_id_pool
         self.last_state_change = time.time()
-        self.data = {}
+        self._data = None
+        # The data that is shared with other tasks, which is copied into
+        # _data once the data of this task is used. It is never changed.
+        self._shared_data = None
+        # Whether _data was handed out through Task.data.
+        self._data_exposed = False
         self.terminate_current_loop = False
-        self.internal_data = {}
-        self.mi_collect_data = {}
+        self._internal_data = None
+        self._mi_collect_data = None
         if parent is not None:
             self.parent._child_added_notify(self)
+        notify = getattr(workflow, '_task_added_notify', None)
+        if notify is not None:
+            notify(self)
+
+    @property
+    def data(self):
+        data = self._get_own_data()
+        self._data_exposed = True
+        return data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._shared_data = None
+        self._data_exposed = True
+
+    @property
+    def data_view(self):
+        """
+        A read-only view of the data of the task, which unlike Task.data
+        does not copy the data that the task shares with other tasks.
+        """
+        return MappingProxyType(self._get_shared_data())
+
+    def _get_own_data(self):
+        """
+        Returns the data of the task to be changed, copying it first if it
+        is shared with other tasks.
+        """
+        if self._data is None:
+            if self._shared_data is None:
+                self._data = {}
+            else:
+                self._data = dict(self._shared_data)
+                self._shared_data = None
+            self._data_exposed = False
+        return self._data
+
+    def _get_shared_data(self):
+        """
+        Returns the data of the task without copying it, to be read or
+        shared with other tasks; it must not be changed.
+        """
+        if self._data is not None:
+            return self._data
+        if self._shared_data is not None:
+            return self._shared_data
+        return {}
+
+    def _share_data(self):
+        """
+        Returns the data of the task, to be shared with another task. The
+        data is no longer changed through this task: it gets a copy once
+        its data is changed again.
+        """
+        if self._data is not None:
+            if self._data_exposed:
+                # Whoever got the dict through Task.data may still change
+                # it, so the other task gets a copy.
+                return dict(self._data)
+            self._shared_data = self._data
+            self._data = None
+        return self._get_shared_data()
+
+    @property
+    def internal_data(self):
+        if self._internal_data is None:
+            self._internal_data = {}
+        return self._internal_data
+
+    @internal_data.setter
+    def internal_data(self, value):
+        self._internal_data = value
+
+    @property
+    def mi_collect_data(self):
+        if self._mi_collect_data is None:
+            self._mi_collect_data = {}
+        return self._mi_collect_data
+
+    @mi_collect_data.setter
+    def mi_collect_data(self, value):
+        self._mi_collect_data = value
+
+    @property
+    def log(self):
+        if self._log is None:
+            self._log = []
+        return self._log
+
+    @log.setter
+    def log(self, value):
+        self._log = value
 
     def __repr__(self):
         return '<Task object (%s) in state %s at %s>' % (
@@ -241,7 +361,7 @@ class Task(object):
         directly.  It will handle deeper merges of data,
         and MultiInstance tasks will be updated correctly.
         """
-        self.data = DeepMerge.merge(self.data, data)
+        DeepMerge.merge(self._get_own_data(), data)
 
     def task_info(self):
         """
@@ -297,6 +417,8 @@ class Task(object):
             return
 
         if isinstance(self.task_spec,CallActivity):
+            for child in self.children:
+                self._child_removed_notify(child)
             self.children = [] # if we have a call activity,
                                # force reset of children.
 
@@ -357,17 +479,22 @@ class Task(object):
                                     'state went from %s to %s!' % (
                                         self.get_state_name(),
                                         self.state_names[value]))
-        if __debug__:
-            old = self.get_state_name()
+        old_state = self._state
         self._state = value
-        if __debug__:
-            self.log.append("Moving '%s' from %s to %s" % (
+        notify = getattr(self.workflow, '_task_state_changed_notify', None)
+        if notify is not None:
+            notify(self, old_state)
+        if self.state_history is not None:
+            if __debug__:
+                self.log.append("Moving '%s' from %s to %s" % (
+                    self.get_name(),
+                    self.state_names[old_state], self.get_state_name()))
+            self.state_history.append(value)
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug("Moving '%s' (spec=%s) from %s to %s" % (
                 self.get_name(),
-                old, self.get_state_name()))
-        self.state_history.append(value)
-        LOG.debug("Moving '%s' (spec=%s) from %s to %s" % (
-            self.get_name(),
-            self.task_spec.name, old, self.get_state_name()))
+                self.task_spec.name, self.state_names[old_state],
+                self.get_state_name()))
 
     def _delstate(self):
         del self._state
@@ -377,8 +504,16 @@ class Task(object):
     def __iter__(self):
         return Task.Iterator(self)
 
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', {}))
+        for name in Task.__slots__:
+            if name != '__dict__':
+                state[name] = getattr(self, name)
+        return state
+
     def __setstate__(self, dict):
-        self.__dict__.update(dict)
+        for name, value in dict.items():
+            setattr(self, name, value)
         # If unpickled in the same Python process in which a workflow
         # (Task) is built through the API, we need to make sure
         # that there will not be any ID collisions.
@@ -408,6 +543,20 @@ class Task(object):
         assert child is not None
         self.children.append(child)
 
+    def _child_removed_notify(self, child):
+        """
+        Called when a child was removed from this task, so that the child
+        and all tasks below it are dropped from the workflow's indexes.
+        """
+        assert child is not None
+        stack = [child]
+        while stack:
+            task = stack.pop()
+            notify = getattr(task.workflow, '_task_removed_notify', None)
+            if notify is not None:
+                notify(task)
+            stack.extend(task.children)
+
     def _drop_children(self, force=False):
         drop = []
         for child in self.children:
@@ -417,6 +566,7 @@ class Task(object):
                 child._drop_children()
         for task in drop:
             self.children.remove(task)
+            self._child_removed_notify(task)
 
     def _set_state(self, state, force=True):
         """
@@ -530,6 +680,7 @@ class Task(object):
         # Remove and add the children accordingly.
         for child in remove:
             self.children.remove(child)
+            self._child_removed_notify(child)
         for task_spec in add:
             self._add_child(task_spec, state)
 
@@ -635,6 +786,10 @@ class Task(object):
         if self._has_state(self.COMPLETED) or self._has_state(self.CANCELLED):
             return
         self._set_state(self.READY)
+        if not self.children and getattr(self.workflow, 'lazy_prediction',
+                                         False):
+            # The children were left out by the lazy prediction.
+            self.task_spec._predict(self)
         self.task_spec._on_ready(self)
 
     def get_name(self):
@@ -680,22 +835,32 @@ class Task(object):
         self.internal_data.update(kwargs)
 
     def _get_internal_data(self, name, default=None):
-        return self.internal_data.get(name, default)
+        if self._internal_data is None:
+            return default
+        return self._internal_data.get(name, default)
 
     def set_data(self, **kwargs):
         """
         Defines the given attribute/value pairs.
         """
-        self.data.update(kwargs)
+        self._get_own_data().update(kwargs)
 
     def _inherit_data(self):
         """
-        Inherits the data from the parent.
-        """
-        LOG.debug("'%s' inheriting data from '%s'" % (self.get_name(),
-                                                      self.parent.get_name()),
-                  extra=dict(data=self.parent.data))
-        self.set_data(**self.parent.data)
+        Inherits the data from the parent. The data is shared with the parent
+        until either of them changes it.
+        """
+        data = self.parent._share_data()
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug("'%s' inheriting data from '%s'" % (
+                self.get_name(), self.parent.get_name()),
+                extra=dict(data=data))
+        if not self._data and not self._data_exposed and (
+                self._shared_data is None or self._shared_data is data):
+            self._data = None
+            self._shared_data = data
+        else:
+            self.set_data(**data)
 
     def get_data(self, name, default=None):
         """
@@ -709,7 +874,7 @@ class Task(object):
         :rtype:  obj
         :returns: The value of the data field
         """
-        return self.data.get(name, default)
+        return self._get_shared_data().get(name, default)
 
     def cancel(self):
         """
@@ -3,6 +3,8 @@ from __future__ import division, absolute_import
 from __future__ import print_function
 
 import copy
+import heapq
+import itertools
 from builtins import next
 from builtins import object
 # Copyright (C) 2007 Samuel Abels
@@ -22,6 +24,7 @@ from builtins import object
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 import logging
+import time
 from . import specs
 from .task import Task
 from .util.compat import mutex
@@ -50,12 +53,45 @@ class Workflow(object):
         :param deserializing: set to true when deserializing to avoid
           generating tasks twice (and associated problems with multiple
           hierarchies of tasks)
+        :type index_tasks: bool
+        :param index_tasks: keep an index of the tasks by state and by id, so
+          that state queries and id lookups do not have to walk the task
+          tree. Set to False if you change Task._state directly. Defaults to
+          the setting of the outer workflow.
+        :type record_history: bool
+        :param record_history: record the state_history and the log of each
+          task. Set to False to save memory on large workflows. Defaults to
+          the setting of the outer workflow.
+        :type lazy_prediction: bool
+        :param lazy_prediction: predict the future tasks only up to the
+          lookahead of each task spec, instead of following every definite
+          path to its end. The remaining tasks are predicted once they are
+          needed: when a task becomes READY, when a join checks its incoming
+          branches, when the workflow is serialized or when predict() is
+          called. Saves time and memory on large workflows. Defaults to the
+          setting of the outer workflow.
         """
         assert workflow_spec is not None
         LOG.debug("__init__ Workflow instance: %s" % self.__str__())
         self.spec = workflow_spec
         self.data = {}
         self.outer_workflow = kwargs.get('parent', self)
+        self.index_tasks = kwargs.get(
+            'index_tasks', getattr(self.outer_workflow, 'index_tasks', True))
+        self.record_history = kwargs.get(
+            'record_history',
+            getattr(self.outer_workflow, 'record_history', True))
+        self.lazy_prediction = kwargs.get(
+            'lazy_prediction',
+            getattr(self.outer_workflow, 'lazy_prediction', False))
+        self._tasks_by_state = self._new_task_index()
+        self._tasks_by_id = {}
+        self._reset_waiting_index()
+        self._event_names = None
+        # The tasks that became READY since they were last taken from the
+        # queue, or None if the workflow does not keep a queue.
+        self._ready_queue = None
+        self._is_integrated = False
         self.locks = {}
         self.last_task = None
         if deserializing:
@@ -92,6 +128,11 @@ class Workflow(object):
         :return: Whether the workflow is completed.
         """
         mask = Task.NOT_FINISHED_MASK
+        if self.index_tasks:
+            for state, tasks in self._tasks_by_state.items():
+                if state & mask and tasks:
+                    return False
+            return True
         iter = Task.Iterator(self.task_tree, mask)
         try:
             nexttask = next(iter)
@@ -100,16 +141,45 @@ class Workflow(object):
             return True
         return False
 
-    def _get_waiting_tasks(self):
-        waiting = Task.Iterator(self.task_tree, Task.WAITING)
-        return [w for w in waiting]
+    def _get_waiting_tasks(self, events=None, any_event=True):
+        """
+        Returns the WAITING tasks that may make progress after one of the
+        given events, see TaskSpec._get_wakeup_events(): the tasks waiting
+        for one of the events or (if any_event is True) for any event, and
+        those whose wakeup time has passed. Returns all WAITING tasks if no
+        events are given.
+        """
+        if events is None or not self.index_tasks:
+            return self.get_tasks(Task.WAITING)
+        tasks = {}
+        if any_event:
+            tasks.update(dict.fromkeys(self._waiting_subscribers.get(None,
+                                                                     ())))
+        for event in events:
+            tasks.update(dict.fromkeys(self._waiting_subscribers.get(event,
+                                                                     ())))
+        tasks.update(dict.fromkeys(self._pop_due_tasks(time.time())))
+        tasks = list(tasks)
+        if len(tasks) > 1:
+            self._sort_by_tree_position(tasks)
+        return tasks
+
+    def _update_waiting_tasks(self, events=None, any_event=True):
+        """
+        Updates the WAITING tasks that may make progress after one of the
+        given events (all of them if no events are given), and registers
+        what the tasks that keep waiting are waiting for.
+        """
+        for task in self._get_waiting_tasks(events, any_event):
+            task.task_spec._update(task)
+            if task._has_state(Task.WAITING):
+                self._subscribe_waiting_task(task)
 
     def _task_completed_notify(self, task):
         if task.get_name() == 'End':
             self.data.update(task.data)
-        # Update the state of every WAITING task.
-        for thetask in self._get_waiting_tasks():
-            thetask.task_spec._update(thetask)
+        # Update the state of the WAITING tasks that may depend on the task.
+        self._update_waiting_tasks([task.task_spec])
         if self.completed_event.n_subscribers() == 0:
             # Since is_completed() is expensive it makes sense to bail
             # out if calling it is not necessary.
@@ -117,6 +187,13 @@ class Workflow(object):
         if self.is_completed():
             self.completed_event(self)
 
+    def _task_cancelled_notify(self, task):
+        # Update the WAITING tasks that wait for the task to be cancelled.
+        # Without the index, they are updated once the next task completes.
+        if self.index_tasks:
+            self._update_waiting_tasks([('cancel', task.task_spec)],
+                                       any_event=False)
+
     def _get_mutex(self, name):
         if name not in self.locks:
             self.locks[name] = mutex()
@@ -125,13 +202,16 @@ class Workflow(object):
     def _get_task_mapping(self):
         task_mapping = {}
         for task in self.task_tree:
-            thread_task_mapping = task_mapping.get(task.thread_id, {})
-            tasks = thread_task_mapping.get(task.task_spec, set())
-            tasks.add(task)
-            thread_task_mapping[task.task_spec] = tasks
-            task_mapping[task.thread_id] = thread_task_mapping
+            self._add_to_task_mapping(task_mapping, task)
         return task_mapping
 
+    def _add_to_task_mapping(self, task_mapping, task):
+        thread_task_mapping = task_mapping.get(task.thread_id, {})
+        tasks = thread_task_mapping.get(task.task_spec, set())
+        tasks.add(task)
+        thread_task_mapping[task.task_spec] = tasks
+        task_mapping[task.thread_id] = thread_task_mapping
+
     def update_task_mapping(self):
         """
         Update the task_mapping of workflow, make sure the method is called
@@ -139,6 +219,273 @@ class Workflow(object):
         """
         self.task_mapping = self._get_task_mapping()
 
+    def predict(self):
+        """
+        Predicts all the future tasks of the workflow, including the ones
+        that were left out because the workflow uses lazy_prediction.
+        """
+        tasks = [task for task in Task.Iterator(self.task_tree,
+                                                Task.NOT_FINISHED_MASK)
+                 if task.parent is None or task.parent._is_finished()]
+        for task in tasks:
+            task.task_spec._predict(task, lazy=False)
+
+    def _new_task_index(self):
+        return dict((state, {}) for state in Task.state_names)
+
+    def _get_outer_workflows(self):
+        """
+        Returns the workflows whose task tree includes the tasks of this
+        (sub) workflow, excluding this workflow itself.
+        """
+        workflow = self
+        while workflow.outer_workflow is not workflow and \
+                workflow._is_integrated:
+            workflow = workflow.outer_workflow
+            yield workflow
+
+    def _integrate_task_index(self, children):
+        """
+        Called once the given children of the root of this sub workflow were
+        merged into the tree of the outer workflow, so that their tasks show
+        up in the indexes of the outer workflows from then on.
+        """
+        self._is_integrated = True
+        outer_workflows = list(self._get_outer_workflows())
+        for child in children:
+            for task in child:
+                for workflow in outer_workflows:
+                    workflow._index_task(task)
+
+    def _index_task(self, task):
+        if self.index_tasks:
+            self._tasks_by_state[task._state][task] = None
+            self._tasks_by_id[task.id] = task
+            if task._state == Task.WAITING:
+                self._add_waiting_task(task)
+            elif task._state == Task.READY and self._ready_queue is not None:
+                self._ready_queue[task] = None
+
+    def _unindex_task(self, task):
+        if self.index_tasks:
+            self._tasks_by_state[task._state].pop(task, None)
+            if self._tasks_by_id.get(task.id) is task:
+                del self._tasks_by_id[task.id]
+            self._remove_waiting_task(task)
+            if self._ready_queue is not None:
+                self._ready_queue.pop(task, None)
+
+    def _reset_waiting_index(self):
+        # The events that WAITING tasks wait for, mapped to the tasks. The
+        # None event stands for any completed task.
+        self._waiting_subscribers = {}
+        self._waiting_events = {}
+        # The deadlines of the waiting tasks, along with a heap of (deadline,
+        # sequence number, task) entries. Entries whose deadline is not the
+        # one of the task (anymore) are skipped.
+        self._waiting_deadlines = {}
+        self._deadline_heap = []
+        self._deadline_sequence = itertools.count()
+
+    def _add_waiting_task(self, task, events=None, deadline=None):
+        """
+        Registers a WAITING task of the index to be updated after one of the
+        given events or once the given deadline has passed. A task that has
+        just entered the WAITING state is updated after any event, until it
+        gets a chance to tell what it is waiting for.
+        """
+        previous_deadline = self._waiting_deadlines.get(task)
+        self._remove_waiting_task(task)
+        if events is None:
+            events = [None]
+        for event in events:
+            self._waiting_subscribers.setdefault(event, {})[task] = None
+        self._waiting_events[task] = events
+        if deadline is not None:
+            self._waiting_deadlines[task] = deadline
+            if deadline != previous_deadline:
+                heapq.heappush(self._deadline_heap, (
+                    deadline, next(self._deadline_sequence), task))
+
+    def _remove_waiting_task(self, task):
+        for event in self._waiting_events.pop(task, ()):
+            subscribers = self._waiting_subscribers[event]
+            del subscribers[task]
+            if not subscribers:
+                del self._waiting_subscribers[event]
+        self._waiting_deadlines.pop(task, None)
+
+    def _get_next_deadline(self):
+        """
+        Returns the earliest deadline of the WAITING tasks, or None.
+        """
+        heap = self._deadline_heap
+        while heap:
+            deadline, sequence, task = heap[0]
+            if self._waiting_deadlines.get(task) == deadline:
+                return deadline
+            heapq.heappop(heap)
+        return None
+
+    def _get_due_tasks(self, now):
+        """
+        Returns the WAITING tasks whose deadline is not after the given
+        time, in the order of the task tree.
+        """
+        tasks = [task for task, deadline in self._waiting_deadlines.items()
+                 if deadline <= now]
+        self._sort_by_tree_position(tasks)
+        return tasks
+
+    def _pop_due_tasks(self, now):
+        """
+        Returns the WAITING tasks whose deadline is not after the given
+        time, and forgets their deadlines until they are subscribed again.
+        """
+        heap = self._deadline_heap
+        tasks = []
+        while heap and heap[0][0] <= now:
+            deadline, sequence, task = heapq.heappop(heap)
+            if self._waiting_deadlines.get(task) == deadline:
+                del self._waiting_deadlines[task]
+                tasks.append(task)
+        return tasks
+
+    def _subscribe_waiting_tasks(self):
+        """
+        Asks the specs of the WAITING tasks that are updated after any event
+        (such as the ones that just entered the WAITING state) what they
+        are waiting for.
+        """
+        for task in list(self._waiting_subscribers.get(None, ())):
+            self._subscribe_waiting_task(task)
+
+    def _subscribe_waiting_task(self, task):
+        """
+        Asks the spec of a WAITING task what the task is waiting for, and
+        registers it in the indexes of the workflows that include the task.
+        """
+        workflows = [workflow for workflow
+                     in [task.workflow] + list(
+                         task.workflow._get_outer_workflows())
+                     if workflow.index_tasks and
+                     task in workflow._waiting_events]
+        if not workflows:
+            return
+        events = task.task_spec._get_wakeup_events(task)
+        deadline = task.task_spec._get_wakeup_time(task)
+        for workflow in workflows:
+            workflow._add_waiting_task(task, events, deadline)
+
+    def _task_added_notify(self, task):
+        """
+        Called by a Task of this workflow when it is created.
+        """
+        self._index_task(task)
+        for workflow in self._get_outer_workflows():
+            workflow._index_task(task)
+
+    def _task_removed_notify(self, task):
+        """
+        Called when a Task of this workflow is removed from the task tree.
+        """
+        self._unindex_task(task)
+        for workflow in self._get_outer_workflows():
+            workflow._unindex_task(task)
+
+    def _task_state_changed_notify(self, task, old_state):
+        """
+        Called by a Task of this workflow when its state changes. Tasks
+        that are not in the index (because they were removed from the tree)
+        are left alone.
+        """
+        for workflow in [self] + list(self._get_outer_workflows()):
+            if not workflow.index_tasks:
+                continue
+            tasks = workflow._tasks_by_state
+            if tasks[old_state].pop(task, False) is None:
+                tasks[task._state][task] = None
+                if old_state == Task.WAITING:
+                    workflow._remove_waiting_task(task)
+                elif task._state == Task.WAITING:
+                    workflow._add_waiting_task(task)
+                if task._state == Task.READY and \
+                        workflow._ready_queue is not None:
+                    workflow._ready_queue[task] = None
+
+    @staticmethod
+    def _sort_by_tree_position(tasks):
+        """
+        Sorts the given tasks in place, in the order of Task.Iterator. The
+        position of an ancestor that several of the tasks share is only
+        worked out once, and so are the indices of the children of each
+        parent, so sorting costs about as much as walking up from the tasks
+        to their closest shared ancestors.
+
+        The position of a task is given by the indices of the children
+        along its path from the root, of which only those that are not
+        the first child are kept (along with their depth), and by its
+        depth. Paths of first children, such as the tasks of a sequence,
+        therefore take no room.
+        """
+        positions = {}
+        child_indices = {}
+
+        def get_position(task):
+            path = []
+            ancestor = task
+            while ancestor is not None and ancestor not in positions:
+                path.append(ancestor)
+                ancestor = ancestor.parent
+            if ancestor is None:
+                branches, depth = (), 0
+            else:
+                branches, depth = positions[ancestor]
+            for ancestor in reversed(path):
+                depth += 1
+                parent = ancestor.parent
+                if parent is not None:
+                    indices = child_indices.get(parent)
+                    if indices is None:
+                        indices = child_indices[parent] = dict(
+                            (child, idx)
+                            for idx, child in enumerate(parent.children))
+                    idx = indices.get(ancestor, 0)
+                    if idx:
+                        # Of two paths that branch off at different
+                        # depths, the deeper one comes first: higher up,
+                        # it still follows the first child.
+                        branches = branches + ((-depth, idx),)
+                positions[ancestor] = (branches, depth)
+            return positions[task]
+
+        tasks.sort(key=get_position)
+
+    def update_task_index(self):
+        """
+        Rebuild the task indexes and the task_mapping of the workflow in a
+        single pass over the task tree, make sure the method is called every
+        time you reconstruct the task tree or change Task._state or Task.id
+        directly.
+        """
+        self._tasks_by_state = self._new_task_index()
+        self._tasks_by_id = {}
+        self._reset_waiting_index()
+        if self._ready_queue is not None:
+            self._ready_queue = {}
+        task_mapping = {}
+        sub_workflows = []
+        for task in self.task_tree:
+            self._index_task(task)
+            self._add_to_task_mapping(task_mapping, task)
+            if task.workflow is not self and \
+                    task.workflow not in sub_workflows:
+                sub_workflows.append(task.workflow)
+        self.task_mapping = task_mapping
+        for workflow in sub_workflows:
+            workflow._is_integrated = True
+            workflow.update_task_index()
+
     def set_data(self, **kwargs):
         """
         Defines the given attribute/value pairs.
@@ -168,10 +515,7 @@ class Workflow(object):
                         completed.
         """
         self.success = success
-        cancel = []
-        mask = Task.NOT_FINISHED_MASK
-        for task in Task.Iterator(self.task_tree, mask):
-            cancel.append(task)
+        cancel = self.get_tasks(Task.NOT_FINISHED_MASK)
         for task in cancel:
             task.cancel()
 
@@ -200,6 +544,8 @@ class Workflow(object):
         """
         if tasklist:
             tasks = [task for task in tasklist if task.id == id]
+        elif self.index_tasks:
+            return self._tasks_by_id.get(id)
         else:
             tasks = [task for task in self.get_tasks() if task.id == id]
         return tasks[0] if len(tasks) == 1 else None
@@ -248,43 +594,127 @@ class Workflow(object):
                             sibling._setstate(Task.WAITING, force=True)
         return message_name_xlate
 
-    def message(self,message_name,payload,resultVar):
-
-        message_name_xlate = self.get_message_name_xlate()
+    def _get_event_names(self):
+        """
+        Returns the names of the message and signal events of the workflow
+        spec, mapped to the message or signal they refer to.
+        """
+        if self._event_names is None or self._event_names[0] is not self.spec:
+            event_names = {}
+            for task_spec in self.spec.task_specs.values():
+                event_definition = getattr(task_spec, 'event_definition', None)
+                if hasattr(event_definition, 'message'):
+                    event_names[event_definition.name] = \
+                        event_definition.message
+            self._event_names = self.spec, event_names
+        return self._event_names[1]
 
-        if message_name in message_name_xlate.keys() or \
-            message_name in message_name_xlate.values():
+    def _rearm_boundary_events(self):
+        """
+        Moves the message events attached to a READY task that were
+        triggered before back to the WAITING state, so that they can be
+        triggered again.
+        """
+        for task in list(self._tasks_by_state[Task.READY]):
+            parent = task.parent
+            if parent is None or \
+                    not isinstance(parent.task_spec, _BoundaryEventParent):
+                continue
+            for sibling in parent.children:
+                if sibling.state == Task.COMPLETED and hasattr(
+                        getattr(sibling.task_spec, 'event_definition', None),
+                        'message'):
+                    sibling._setstate(Task.WAITING, force=True)
+
+    def _route_event(self, kind, message_name, correlation_key=None):
+        """
+        Returns the message or signal that the given name (which is either
+        the message or signal itself or the name of its event) refers to,
+        if a task is waiting for it (with the given correlation key, if
+        any), or None otherwise.
+        """
+        if not self.index_tasks:
+            message_name_xlate = self.get_message_name_xlate()
             if message_name in message_name_xlate.keys():
-                message_name = message_name_xlate[message_name]
-            self.task_tree.internal_data['messages'] = self.task_tree.internal_data.get('messages',{}) # ensure
-            self.task_tree.internal_data['messages'][message_name] = (payload,resultVar)
-        self.refresh_waiting_tasks()
+                return message_name_xlate[message_name]
+            if message_name in message_name_xlate.values():
+                return message_name
+            return None
+        message_name = self._get_event_names().get(message_name, message_name)
+        self._rearm_boundary_events()
+        self._subscribe_waiting_tasks()
+        event = self._get_message_event(kind, message_name, correlation_key)
+        if event not in self._waiting_subscribers:
+            return None
+        return message_name
+
+    def _get_message_event(self, kind, message_name, correlation_key=None):
+        if correlation_key is None:
+            return kind, message_name
+        return kind, message_name, correlation_key
+
+    def message(self, message_name, payload, resultVar,
+                correlation_key=None):
+        """
+        Sends the message with the given name (or the name of its event) to
+        the tasks that are waiting for it, and runs the engine steps. If a
+        correlation key is given, only the tasks whose correlation key
+        equals it receive the message.
+        Returns False if no task is waiting for the message.
+        """
+        if not self._send_message(message_name, payload, resultVar,
+                                  correlation_key):
+            return False
         self.do_engine_steps()
         self.task_tree.internal_data['messages'] = {}
+        return True
+
+    def _send_message(self, message_name, payload, resultVar,
+                      correlation_key=None):
+        message_name = self._route_event('message', message_name,
+                                         correlation_key)
+        if message_name is None:
+            return False
+        self.task_tree.internal_data['messages'] = self.task_tree.internal_data.get('messages',{}) # ensure
+        self.task_tree.internal_data['messages'][message_name] = (
+            payload, resultVar, correlation_key)
+        self._update_waiting_tasks([self._get_message_event(
+            'message', message_name, correlation_key)])
+        return True
 
     def signal(self, message_name):
-        # breakpoint()
-        message_name_xlate = self.get_message_name_xlate()
-
-        if message_name in message_name_xlate.keys() or \
-            message_name in message_name_xlate.values():
-            if message_name in message_name_xlate.keys():
-                message_name = message_name_xlate[message_name]
-            self.task_tree.internal_data['signals'] = self.task_tree.internal_data.get('signals',{}) # ensure
-            self.task_tree.internal_data['signals'][message_name] = True
-        LOG.debug("signal Workflow instance: %s" % self.task_tree.internal_data)
-        self.refresh_waiting_tasks()
-        LOG.debug("signal Workflow instance: %s" % self.task_tree.internal_data)
+        """
+        Sends the signal with the given name (or the name of its event) to
+        the tasks that are waiting for it, and runs the engine steps.
+        Returns False if no task is waiting for the signal.
+        """
+        if not self._send_signal(message_name):
+            return False
         self.do_engine_steps()
         self.task_tree.internal_data['signals'] = {}
+        return True
+
+    def _send_signal(self, message_name):
+        message_name = self._route_event('signal', message_name)
+        if message_name is None:
+            return False
+        self.task_tree.internal_data['signals'] = self.task_tree.internal_data.get('signals',{}) # ensure
+        self.task_tree.internal_data['signals'][message_name] = True
+        LOG.debug("signal Workflow instance: %s" % self.task_tree.internal_data)
+        self._update_waiting_tasks([('signal', message_name)])
+        LOG.debug("signal Workflow instance: %s" % self.task_tree.internal_data)
+        return True
 
     def cancel_notify(self):
+        self._send_cancel()
+        self.do_engine_steps()
+        self.task_tree.internal_data['cancels'] = {}
+
+    def _send_cancel(self):
         self.task_tree.internal_data['cancels'] = \
                 self.task_tree.internal_data.get('cancels', {})  # ensure
         self.task_tree.internal_data['cancels']['TokenReset'] = True
-        self.refresh_waiting_tasks()
-        self.do_engine_steps()
-        self.task_tree.internal_data['cancels'] = {}
+        self._update_waiting_tasks([('cancel', 'TokenReset')])
 
     def get_flat_nav_list(self):
         """Returns a navigation list with indentation hints, but the list
@@ -308,6 +738,18 @@ class Workflow(object):
         :rtype:  list[Task]
         :returns: A list of tasks.
         """
+        # The iterator does not descend into LIKELY tasks unless they are
+        # searched for, so predicted states are only taken from the index
+        # when LIKELY is part of the mask.
+        if self.index_tasks and state != Task.ANY_MASK and \
+                (state & Task.LIKELY or not state & Task.PREDICTED_MASK):
+            tasks = []
+            for bucket_state, bucket in self._tasks_by_state.items():
+                if bucket_state & state:
+                    tasks.extend(bucket)
+            if len(tasks) > 1:
+                self._sort_by_tree_position(tasks)
+            return tasks
         return [t for t in Task.Iterator(self.task_tree, state)]
 
     def reset_task_from_id(self, task_id):
@@ -319,9 +761,9 @@ class Workflow(object):
         """
         if task_id is None:
             raise WorkflowException(self.spec, 'task_id is None')
-        for task in self.task_tree:
-            if task.id == task_id:
-                return task.reset_token()
+        task = self.get_task(task_id)
+        if task is not None:
+            return task.reset_token()
         msg = 'A task with the given task_id (%s) was not found' % task_id
         raise WorkflowException(self.spec, msg)
 
@@ -345,9 +787,9 @@ class Workflow(object):
         """
         if task_id is None:
             raise WorkflowException(self.spec, 'task_id is None')
-        for task in self.task_tree:
-            if task.id == task_id:
-                return task.complete()
+        task = self.get_task(task_id)
+        if task is not None:
+            return task.complete()
         msg = 'A task with the given task_id (%s) was not found' % task_id
         raise WorkflowException(self.spec, msg)
 
@@ -9,7 +9,7 @@ import glob
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from SpiffWorkflow.specs import *
-from SpiffWorkflow import Task
+from SpiffWorkflow import Task, Workflow
 from SpiffWorkflow.serializer.prettyxml import XmlSerializer
 from tests.SpiffWorkflow.util import run_workflow
 
@@ -91,6 +91,12 @@ class PatternTest(unittest.TestCase):
             print(test.filename)
             run_workflow(self, test.spec, test.path, test.data)
 
+    def testLazyPrediction(self):
+        for test in self.workflows:
+            print(test.filename)
+            workflow = Workflow(test.spec, lazy_prediction=True)
+            run_workflow(self, test.spec, test.path, test.data, workflow)
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(PatternTest)
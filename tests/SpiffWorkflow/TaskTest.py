@@ -3,6 +3,7 @@ from __future__ import print_function, absolute_import, division
 
 from __future__ import division
 from builtins import object
+import pickle
 import sys
 import unittest
 import re
@@ -80,6 +81,82 @@ class TaskTest(unittest.TestCase):
                         'Expected:\n' + repr(expected2.pattern) + '\n' +
                         'but got:\n' + repr(result))
 
+    def testLazyData(self):
+        spec = WorkflowSpec()
+        workflow = MockWorkflow()
+        task = Task(workflow, Simple(spec, 'Simple 1'))
+        self.assertEqual(task.get_data('a', 1), 1)
+        self.assertEqual(task._get_internal_data('a', 1), 1)
+        self.assertIsNone(task._data)
+        self.assertIsNone(task._internal_data)
+        task.set_data(a=2)
+        self.assertEqual(task.data, {'a': 2})
+        self.assertEqual(task.mi_collect_data, {})
+
+        # Task specs may still set attributes of their own.
+        task.results = ['a']
+        task.state = Task.COMPLETED
+        copied = pickle.loads(pickle.dumps(task))
+        self.assertEqual(copied.data, {'a': 2})
+        self.assertEqual(copied.results, ['a'])
+        self.assertEqual(copied.state_history, [Task.MAYBE, Task.COMPLETED])
+        self.assertEqual(len(copied.log), 1)
+
+    def testRecordHistory(self):
+        spec = WorkflowSpec()
+        workflow = MockWorkflow()
+        workflow.record_history = False
+        task = Task(workflow, Simple(spec, 'Simple 1'))
+        task.state = Task.COMPLETED
+        self.assertIsNone(task.state_history)
+        self.assertIsNone(task._log)
+
+    def testCopyOnWriteData(self):
+        spec = WorkflowSpec()
+        workflow = MockWorkflow()
+        parent = Task(workflow, Simple(spec, 'Simple 1'))
+        parent.set_data(a=1)
+        first = Task(workflow, Simple(spec, 'Simple 2'), parent)
+        second = Task(workflow, Simple(spec, 'Simple 3'), parent)
+        first._inherit_data()
+        second._inherit_data()
+        # The children share the data of the parent until it is used.
+        self.assertIs(first._get_shared_data(), second._get_shared_data())
+        self.assertEqual(first.get_data('a'), 1)
+
+        first.data['b'] = 2
+        parent.data['c'] = 3
+        self.assertEqual(parent.data, {'a': 1, 'c': 3})
+        self.assertEqual(first.data, {'a': 1, 'b': 2})
+        self.assertEqual(second.data, {'a': 1})
+
+        # Inheriting again merges the data of the parent into the own data.
+        first._inherit_data()
+        self.assertEqual(first.data, {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(parent.data, {'a': 1, 'c': 3})
+
+    def testDataView(self):
+        spec = WorkflowSpec()
+        workflow = MockWorkflow()
+        parent = Task(workflow, Simple(spec, 'Simple 1'))
+        parent.set_data(a=1)
+        child = Task(workflow, Simple(spec, 'Simple 2'), parent)
+        child._inherit_data()
+        # Reading the data does not copy it.
+        self.assertEqual(child.data_view['a'], 1)
+        self.assertIs(child._get_shared_data(), parent._get_shared_data())
+        with self.assertRaises(TypeError):
+            child.data_view['b'] = 2
+
+        # A dict that was handed out may still be changed, so it is not
+        # shared with other tasks.
+        data = parent.data
+        other = Task(workflow, Simple(spec, 'Simple 3'), parent)
+        other._inherit_data()
+        data['c'] = 3
+        self.assertEqual(parent.data_view, {'a': 1, 'c': 3})
+        self.assertEqual(other.data_view, {'a': 1})
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(TaskTest)
@@ -11,6 +11,7 @@ from SpiffWorkflow import Workflow
 from SpiffWorkflow.specs import *
 from SpiffWorkflow.operators import *
 from SpiffWorkflow.task import Task
+from SpiffWorkflow.exceptions import WorkflowException
 from SpiffWorkflow.serializer.prettyxml import XmlSerializer
 
 
@@ -70,6 +71,56 @@ class WorkflowTest(unittest.TestCase):
         self.assertEqual(tasks[0].task_spec.name, 'synch_1')
         # haven't reached the end of the workflow, but stopping at "synch_1"
 
+    def _assertIndexMatchesTree(self, workflow):
+        for state in Task.state_names:
+            mask = state | Task.LIKELY
+            expected = [t for t in Task.Iterator(workflow.task_tree, mask)]
+            self.assertEqual(expected, workflow.get_tasks(mask))
+
+    def testTaskIndex(self):
+        xml_file = os.path.join(data_dir, 'spiff', 'workflow1.xml')
+        with open(xml_file) as fp:
+            xml = fp.read()
+        wf_spec = WorkflowSpec.deserialize(XmlSerializer(), xml)
+        workflow = Workflow(wf_spec)
+        self._assertIndexMatchesTree(workflow)
+        while workflow.complete_next():
+            self._assertIndexMatchesTree(workflow)
+        self.assertTrue(workflow.is_completed())
+
+    def testGetTask(self):
+        xml_file = os.path.join(data_dir, 'spiff', 'workflow1.xml')
+        with open(xml_file) as fp:
+            xml = fp.read()
+        wf_spec = WorkflowSpec.deserialize(XmlSerializer(), xml)
+        workflow = Workflow(wf_spec)
+        workflow.complete_next()
+        for task in workflow.task_tree:
+            self.assertIs(task, workflow.get_task(task.id))
+
+        # Predicted tasks that are dropped can no longer be found.
+        task = workflow.get_tasks(Task.READY)[0]
+        dropped = task.children[0]
+        task._drop_children()
+        self.assertIsNone(workflow.get_task(dropped.id))
+        self.assertRaises(WorkflowException,
+                          workflow.complete_task_from_id, dropped.id)
+
+    def testTaskIndexOptOut(self):
+        xml_file = os.path.join(data_dir, 'spiff', 'workflow1.xml')
+        with open(xml_file) as fp:
+            xml = fp.read()
+        wf_spec = WorkflowSpec.deserialize(XmlSerializer(), xml)
+        workflow = Workflow(wf_spec, index_tasks=False)
+        task = workflow.get_tasks(Task.READY)[0]
+        task._state = Task.COMPLETED
+        self.assertNotIn(task, workflow.get_tasks(Task.READY))
+        self.assertIn(task, workflow.get_tasks(Task.COMPLETED))
+
+        workflow.index_tasks = True
+        workflow.update_task_index()
+        self._assertIndexMatchesTree(workflow)
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(WorkflowTest)
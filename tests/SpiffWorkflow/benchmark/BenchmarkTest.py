@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from tests.SpiffWorkflow.benchmark.generator import GENERATORS
+from tests.SpiffWorkflow.benchmark.runner import run, run_scenario, \
+    compare, METRICS
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def testRunAllScenarios(self):
+        results = json.loads(json.dumps(
+            run(size=3, repeat=1, memory_instances=1)))
+        self.assertEqual(sorted(result['scenario']
+                                for result in results['results']),
+                         sorted(GENERATORS))
+        for result in results['results']:
+            self.assertEqual(sorted(result['timings']), sorted(METRICS))
+            self.assertGreater(result['completed_tasks'], 0)
+            self.assertGreater(result['memory_per_instance'], 0)
+            self.assertGreater(result['memory_per_task'], 0)
+        rows = compare(results, results)
+        self.assertEqual(len(rows), len(GENERATORS) * (len(METRICS) + 2))
+        self.assertTrue(all(ratio in (1.0, None)
+                            for scenario, size, metric, old, new, ratio
+                            in rows))
+
+    def testTaskFootprint(self):
+        # A task of the parallel scenario, along with its index entries,
+        # took about 950 bytes before tasks got slots and lazy dicts, and
+        # takes about 700 bytes since.
+        result = run_scenario('parallel', size=50, repeat=1,
+                              memory_instances=3)
+        self.assertLess(result['memory_per_task'], 850)
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(BenchmarkTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for SpiffWorkflow on synthetic processes of configurable size.
+See __main__.py for how to run them.
+"""
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmarks from the command line, e.g.
+
+    python -m tests.SpiffWorkflow.benchmark --output before.json
+    python -m tests.SpiffWorkflow.benchmark --compare before.json
+"""
+import argparse
+import json
+import sys
+
+from .generator import GENERATORS
+from .runner import run, compare
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.SpiffWorkflow.benchmark',
+        description='Benchmarks SpiffWorkflow on synthetic processes.')
+    parser.add_argument('--scenario', action='append',
+                        choices=sorted(GENERATORS),
+                        help='the scenarios to run (default: all)')
+    parser.add_argument('--size', type=int,
+                        help='the size of the generated processes')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the number of runs per scenario')
+    parser.add_argument('--memory-instances', type=int, default=10,
+                        help='the number of instances to measure memory on')
+    parser.add_argument('--output', default='-',
+                        help='the file to write the JSON results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='a previous JSON result to compare against')
+    args = parser.parse_args(argv)
+
+    results = run(args.scenario, args.size, args.repeat,
+                  args.memory_instances)
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for scenario, size, metric, old, new, ratio in compare(baseline,
+                                                               results):
+            sys.stderr.write('%-16s %6d %-20s %12.6g %12.6g %8s\n' % (
+                scenario, size, metric, old, new,
+                '-' if ratio is None else '%.2fx' % ratio))
+
+
+if __name__ == '__main__':
+    main()
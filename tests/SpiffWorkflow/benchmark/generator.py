@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Generates synthetic BPMN processes and DMN tables of a given size.
+
+Each generator returns a BpmnDmnParser loaded with the generated documents
+and the id of the process to run.
+"""
+from lxml import etree
+
+from SpiffWorkflow.dmn.parser.BpmnDmnParser import BpmnDmnParser
+
+BPMN_NS = 'http://www.omg.org/spec/BPMN/20100524/MODEL'
+CAMUNDA_NS = 'http://camunda.org/schema/1.0/bpmn'
+XSI_NS = 'http://www.w3.org/2001/XMLSchema-instance'
+DMN_NS = 'https://www.omg.org/spec/DMN/20191111/MODEL/'
+
+DEFINITIONS = (
+    '<bpmn:definitions xmlns:bpmn="%s" xmlns:camunda="%s" xmlns:xsi="%s" '
+    'id="Definitions_%%s" targetNamespace="http://bpmn.io/schema/bpmn">'
+    '%%s</bpmn:definitions>' % (BPMN_NS, CAMUNDA_NS, XSI_NS))
+
+
+class ProcessBuilder(object):
+    """
+    Builds the XML of a single process out of flow nodes that are connected
+    by sequence flows.
+    """
+
+    def __init__(self, process_id):
+        self.process_id = process_id
+        self.nodes = []
+        self.flows = []
+        self.incoming = {}
+        self.outgoing = {}
+
+    def add(self, tag, node_id, body='', **attribs):
+        self.nodes.append((tag, node_id, body, attribs))
+        self.incoming[node_id] = []
+        self.outgoing[node_id] = []
+        return node_id
+
+    def connect(self, source, target):
+        flow_id = '%s_Flow_%d' % (self.process_id, len(self.flows))
+        self.flows.append((flow_id, source, target))
+        self.outgoing[source].append(flow_id)
+        self.incoming[target].append(flow_id)
+
+    def chain(self, node_ids):
+        for source, target in zip(node_ids, node_ids[1:]):
+            self.connect(source, target)
+
+    def to_xml(self):
+        parts = ['<bpmn:process id="%s" isExecutable="true">'
+                 % self.process_id]
+        for tag, node_id, body, attribs in self.nodes:
+            attributes = ''.join(' %s="%s"' % (name.replace('__', ':'), value)
+                                 for name, value in sorted(attribs.items()))
+            flows = ''.join(
+                '<bpmn:incoming>%s</bpmn:incoming>' % flow_id
+                for flow_id in self.incoming[node_id])
+            flows += ''.join(
+                '<bpmn:outgoing>%s</bpmn:outgoing>' % flow_id
+                for flow_id in self.outgoing[node_id])
+            parts.append('<bpmn:%s id="%s" name="%s"%s>%s%s</bpmn:%s>' % (
+                tag, node_id, node_id, attributes, flows, body, tag))
+        for flow_id, source, target in self.flows:
+            parts.append(
+                '<bpmn:sequenceFlow id="%s" sourceRef="%s" targetRef="%s" />'
+                % (flow_id, source, target))
+        parts.append('</bpmn:process>')
+        return ''.join(parts)
+
+
+def _parse(definitions_id, builders, dmn=None):
+    parser = BpmnDmnParser()
+    if dmn is not None:
+        parser.add_dmn_xml(etree.fromstring(dmn))
+    xml = DEFINITIONS % (definitions_id,
+                         ''.join(builder.to_xml() for builder in builders))
+    parser.add_bpmn_xml(etree.ElementTree(etree.fromstring(xml)))
+    return parser
+
+
+def sequence(length):
+    """
+    A process with a sequence of user tasks, each followed by a script task.
+    """
+    builder = ProcessBuilder('Sequence')
+    nodes = [builder.add('startEvent', 'StartEvent')]
+    for idx in range(length):
+        nodes.append(builder.add('userTask', 'User_%d' % idx))
+        nodes.append(builder.add(
+            'scriptTask', 'Script_%d' % idx,
+            '<bpmn:script>counter = %d</bpmn:script>' % idx))
+    nodes.append(builder.add('endEvent', 'EndEvent'))
+    builder.chain(nodes)
+    return _parse('Sequence', [builder]), 'Sequence'
+
+
+def scripts(length):
+    """
+    A process that runs straight through a sequence of script tasks before
+    it reaches a single user task.
+    """
+    builder = ProcessBuilder('Scripts')
+    nodes = [builder.add('startEvent', 'StartEvent')]
+    for idx in range(length):
+        nodes.append(builder.add(
+            'scriptTask', 'Script_%d' % idx,
+            '<bpmn:script>counter = %d</bpmn:script>' % idx))
+    nodes.append(builder.add('userTask', 'Review'))
+    nodes.append(builder.add('endEvent', 'EndEvent'))
+    builder.chain(nodes)
+    return _parse('Scripts', [builder]), 'Scripts'
+
+
+def parallel(width):
+    """
+    A process that splits into the given number of branches with a user task
+    each, and joins them again.
+    """
+    builder = ProcessBuilder('Parallel')
+    start = builder.add('startEvent', 'StartEvent')
+    split = builder.add('parallelGateway', 'Split')
+    join = builder.add('parallelGateway', 'Join')
+    end = builder.add('endEvent', 'EndEvent')
+    builder.chain([start, split])
+    for idx in range(width):
+        builder.chain([split, builder.add('userTask', 'User_%d' % idx), join])
+    builder.chain([join, end])
+    return _parse('Parallel', [builder]), 'Parallel'
+
+
+def call_activities(depth):
+    """
+    A process calling a process, down to the given depth. Each level has a
+    user task before it calls the next one.
+    """
+    builders = []
+    for level in range(depth + 1):
+        builder = ProcessBuilder('Level_%d' % level)
+        nodes = [builder.add('startEvent', 'StartEvent_%d' % level),
+                 builder.add('userTask', 'User_%d' % level)]
+        if level < depth:
+            nodes.append(builder.add('callActivity', 'Call_%d' % level,
+                                     calledElement='Level_%d' % (level + 1)))
+        nodes.append(builder.add('endEvent', 'EndEvent_%d' % level))
+        builder.chain(nodes)
+        builders.append(builder)
+    return _parse('CallActivities', builders), 'Level_0'
+
+
+def multi_instance(count):
+    """
+    A process with a parallel multi-instance user task of the given
+    cardinality.
+    """
+    builder = ProcessBuilder('MultiInstance')
+    loop = ('<bpmn:multiInstanceLoopCharacteristics>'
+            '<bpmn:loopCardinality xsi:type="bpmn:tFormalExpression">%d'
+            '</bpmn:loopCardinality>'
+            '</bpmn:multiInstanceLoopCharacteristics>' % count)
+    builder.chain([builder.add('startEvent', 'StartEvent'),
+                   builder.add('userTask', 'Loop', loop),
+                   builder.add('endEvent', 'EndEvent')])
+    return _parse('MultiInstance', [builder]), 'MultiInstance'
+
+
+def timers(width, duration='timedelta(days=1)'):
+    """
+    A process that splits into the given number of branches with a user task
+    each, and joins them again. Each user task has a timer boundary event
+    with the given duration that ends its branch.
+    """
+    builder = ProcessBuilder('Timers')
+    start = builder.add('startEvent', 'StartEvent')
+    split = builder.add('parallelGateway', 'Split')
+    join = builder.add('parallelGateway', 'Join')
+    end = builder.add('endEvent', 'EndEvent')
+    timer = ('<bpmn:timerEventDefinition id="%%s_Definition">'
+             '<bpmn:timeDuration xsi:type="bpmn:tFormalExpression">%s'
+             '</bpmn:timeDuration></bpmn:timerEventDefinition>' % duration)
+    builder.chain([start, split])
+    for idx in range(width):
+        user_task = builder.add('userTask', 'User_%d' % idx)
+        builder.chain([split, user_task, join])
+        boundary = builder.add('boundaryEvent', 'Timer_%d' % idx,
+                               timer % ('Timer_%d' % idx),
+                               attachedToRef=user_task)
+        builder.chain([boundary,
+                       builder.add('endEvent', 'TimerEndEvent_%d' % idx)])
+    builder.chain([join, end])
+    return _parse('Timers', [builder]), 'Timers'
+
+
+def decision_table_xml(rows):
+    """
+    A DMN decision table with an equality entry on an integer input per row,
+    followed by a catch all row.
+    """
+    parts = ['<definitions xmlns="%s" id="Definitions_Decision" name="DRD" '
+             'namespace="http://camunda.org/schema/1.0/dmn">'
+             '<decision id="Decision" name="Decision">'
+             '<decisionTable id="DecisionTable">'
+             '<input id="Input" label="Input">'
+             '<inputExpression id="InputExpression" typeRef="integer">'
+             '<text>value</text></inputExpression></input>'
+             '<output id="Output" label="Result" name="result" '
+             'typeRef="integer" />' % DMN_NS]
+    for idx in range(rows + 1):
+        entry = str(idx) if idx < rows else ''
+        parts.append(
+            '<rule id="Rule_%d"><inputEntry id="InputEntry_%d">'
+            '<text>%s</text></inputEntry><outputEntry id="OutputEntry_%d">'
+            '<text>%d</text></outputEntry></rule>'
+            % (idx, idx, entry, idx, idx))
+    parts.append('</decisionTable></decision></definitions>')
+    return ''.join(parts)
+
+
+def decision(rows):
+    """
+    A process that sets the input of a decision table of the given number of
+    rows so that the last row matches, and then makes the decision.
+    """
+    builder = ProcessBuilder('Decision')
+    builder.chain([
+        builder.add('startEvent', 'StartEvent'),
+        builder.add('scriptTask', 'Script',
+                    '<bpmn:script>value = %d</bpmn:script>' % (rows - 1)),
+        builder.add('businessRuleTask', 'Decide',
+                    camunda__decisionRef='Decision'),
+        builder.add('userTask', 'Review'),
+        builder.add('endEvent', 'EndEvent')])
+    return _parse('Decision', [builder], decision_table_xml(rows)), 'Decision'
+
+
+GENERATORS = {
+    'sequence': sequence,
+    'scripts': scripts,
+    'parallel': parallel,
+    'call_activities': call_activities,
+    'multi_instance': multi_instance,
+    'decision': decision,
+    'timers': timers,
+}
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmark scenarios and collects the results as plain dictionaries
+that can be written as JSON.
+"""
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from SpiffWorkflow.bpmn.serializer.BpmnSerializer import BpmnSerializer
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.task import Task
+from .generator import GENERATORS
+
+DEFAULT_SIZES = {
+    'sequence': 200,
+    'scripts': 1000,
+    'parallel': 100,
+    'call_activities': 10,
+    'multi_instance': 100,
+    'decision': 500,
+    'timers': 100,
+}
+
+# The serializers recurse through the task tree, which is as deep as the
+# longest path through a process.
+RECURSION_LIMIT = 20000
+
+METRICS = ['parse', 'create', 'engine_steps', 'complete_task', 'serialize',
+           'deserialize']
+
+
+class Timer(object):
+    """
+    Adds up the time spent in each metric during one run.
+    """
+
+    def __init__(self):
+        self.totals = dict((metric, 0.0) for metric in METRICS)
+
+    def time(self, metric, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.totals[metric] += time.perf_counter() - start
+        return result
+
+
+def run_once(scenario, size):
+    """
+    Parses the scenario and runs a single instance of it to completion. The
+    instance is serialized and restored once its first user tasks are
+    ready.
+    """
+    timer = Timer()
+    parser, process_id = timer.time('parse', GENERATORS[scenario], size)
+    spec = timer.time('parse', parser.get_spec, process_id)
+    workflow = timer.time('create', BpmnWorkflow, spec)
+    timer.time('engine_steps', workflow.do_engine_steps)
+
+    serializer = BpmnSerializer()
+    state = timer.time('serialize', serializer.serialize_workflow, workflow,
+                       include_spec=False)
+    workflow = timer.time('deserialize', serializer.deserialize_workflow,
+                          state, workflow_spec=spec)
+    counts = {'tasks': len(workflow.get_tasks(Task.ANY_MASK)),
+              'serialized_bytes': len(state),
+              'completed_tasks': 0}
+
+    while not workflow.is_completed():
+        ready = workflow.get_ready_user_tasks()
+        if not ready:
+            raise Exception('The %s scenario did not complete' % scenario)
+        for task in ready:
+            timer.time('complete_task', workflow.complete_task_from_id,
+                       task.id)
+            counts['completed_tasks'] += 1
+        timer.time('engine_steps', workflow.do_engine_steps)
+    return timer.totals, counts
+
+
+def measure_memory(scenario, size, instances):
+    """
+    Returns the average number of bytes allocated by an instance of the
+    scenario once its first user tasks are ready.
+    """
+    parser, process_id = GENERATORS[scenario](size)
+    spec = parser.get_spec(process_id)
+    # Leave out what the first instance allocates once, like compiled code.
+    BpmnWorkflow(spec).do_engine_steps()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        workflows = []
+        for idx in range(instances):
+            workflow = BpmnWorkflow(spec)
+            workflow.do_engine_steps()
+            workflows.append(workflow)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) // instances
+
+
+def summarize(values):
+    return {'min': min(values),
+            'median': statistics.median(values),
+            'mean': statistics.mean(values)}
+
+
+def run_scenario(scenario, size=None, repeat=5, memory_instances=10):
+    """
+    Runs the scenario the given number of times and returns a dictionary
+    with the timings of each metric in seconds, the task counts of a run,
+    and the memory used per instance and per task in bytes.
+    """
+    if size is None:
+        size = DEFAULT_SIZES[scenario]
+    runs = [run_once(scenario, size) for idx in range(repeat)]
+    result = {
+        'scenario': scenario,
+        'size': size,
+        'repeat': repeat,
+        'timings': dict(
+            (metric, summarize([totals[metric] for totals, counts in runs]))
+            for metric in METRICS),
+    }
+    result.update(runs[0][1])
+    if memory_instances:
+        result['memory_per_instance'] = measure_memory(scenario, size,
+                                                       memory_instances)
+        result['memory_per_task'] = \
+            result['memory_per_instance'] // result['tasks']
+    return result
+
+
+def get_commit():
+    """
+    Returns the git commit of the working tree, if there is one.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios=None, size=None, repeat=5, memory_instances=10):
+    """
+    Runs the given scenarios (all of them by default) and returns the
+    results along with a description of the environment they ran in.
+    """
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), RECURSION_LIMIT))
+    results = [run_scenario(scenario, size, repeat, memory_instances)
+               for scenario in scenarios or sorted(GENERATORS)]
+    return {
+        'environment': {
+            'commit': get_commit(),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current):
+    """
+    Returns a list of (scenario, size, metric, baseline, current, ratio)
+    tuples for the median timings and memory of the scenarios in both
+    results.
+    """
+    previous = dict(((result['scenario'], result['size']), result)
+                    for result in baseline['results'])
+    rows = []
+    for result in current['results']:
+        old = previous.get((result['scenario'], result['size']))
+        if old is None:
+            continue
+        values = [(metric, old['timings'][metric]['median'],
+                   result['timings'][metric]['median'])
+                  for metric in METRICS if metric in old['timings']]
+        for metric in ('memory_per_instance', 'memory_per_task'):
+            if metric in old and metric in result:
+                values.append((metric, old[metric], result[metric]))
+        for metric, old_value, new_value in values:
+            ratio = new_value / old_value if old_value else None
+            rows.append((result['scenario'], result['size'], metric,
+                         old_value, new_value, ratio))
+    return rows
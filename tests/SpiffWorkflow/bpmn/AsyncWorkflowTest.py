@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+
+from SpiffWorkflow.exceptions import WorkflowTaskExecException
+from SpiffWorkflow.bpmn.AsyncScriptEngine import AsyncScriptEngine
+from SpiffWorkflow.bpmn.workflow import AsyncBpmnWorkflow
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class Meeting(object):
+    """
+    Lets the given number of coroutines wait for each other.
+    """
+
+    def __init__(self, parties):
+        self.parties = parties
+        self.arrived = 0
+        self.event = asyncio.Event()
+
+    async def meet(self, value):
+        self.arrived += 1
+        if self.arrived == self.parties:
+            self.event.set()
+        await asyncio.wait_for(self.event.wait(), 5)
+        return value
+
+
+class AsyncWorkflowTest(BpmnWorkflowTestCase):
+
+    def create_workflow(self, process_name, meeting):
+        spec = self.load_workflow_spec('async_scripts.bpmn', process_name)
+        return AsyncBpmnWorkflow(spec, script_engine=AsyncScriptEngine(
+            scriptingAdditions={'meet': meeting.meet}))
+
+    def testWorkflowsRunConcurrently(self):
+        # The scripts of all the branches of both workflows only get past
+        # the meeting if they run at the same time.
+        async def run():
+            meeting = Meeting(6)
+            workflows = [self.create_workflow('AwaitingBranches', meeting)
+                         for idx in range(2)]
+            await asyncio.gather(*[workflow.do_engine_steps_async()
+                                   for workflow in workflows])
+            return workflows
+
+        for workflow in asyncio.run(run()):
+            task = workflow.get_ready_user_tasks()[0]
+            self.assertEqual(task.task_spec.name, 'Review_AwaitingBranches')
+            self.assertEqual(task.data, {'a': 'a', 'b': 'b', 'c': 'c'})
+            self.assertEqual(workflow._executions, {})
+
+    def testUnusedScriptsAreCancelled(self):
+        async def run():
+            workflow = self.create_workflow('AwaitingBranches', Meeting(1))
+            await workflow.do_engine_steps_async(
+                exit_at='Script_AwaitingBranches_a')
+            task = workflow.get_tasks_from_spec_name(
+                'Script_AwaitingBranches_b')[0]
+            self.assertIn(task, workflow._executions)
+            task.cancel()
+            await workflow.do_engine_steps_async()
+            return workflow
+
+        workflow = asyncio.run(run())
+        self.assertEqual(workflow._executions, {})
+
+    def testCancelledScriptsDoNotRun(self):
+        # The terminating end event of the first branch cancels the scripts
+        # of the other branches, so these never run.
+        steps = []
+
+        def step(branch, idx):
+            steps.append(branch)
+            return idx
+
+        async def run():
+            spec = self.load_workflow_spec('terminating_branch.bpmn',
+                                           'TerminatingBranch')
+            workflow = AsyncBpmnWorkflow(spec, script_engine=AsyncScriptEngine(
+                scriptingAdditions={'step': step}))
+            await workflow.do_engine_steps_async()
+            return workflow
+
+        workflow = asyncio.run(run())
+        self.assertTrue(workflow.is_completed())
+        self.assertEqual(steps, [])
+        self.assertEqual(workflow._executions, {})
+
+    def testScriptErrors(self):
+        async def run():
+            workflow = self.create_workflow('FailingScript', Meeting(1))
+            await workflow.do_engine_steps_async()
+
+        with self.assertRaises(WorkflowTaskExecException) as context:
+            asyncio.run(run())
+        self.assertEqual(context.exception.line_number, 1)
+
+    def testAwaitingScriptsNeedTheEventLoop(self):
+        workflow = self.create_workflow('AwaitingScript', Meeting(1))
+        self.assertRaises(WorkflowTaskExecException,
+                          workflow.do_engine_steps)
+
+        workflow = self.create_workflow('PlainScript', Meeting(1))
+        workflow.do_engine_steps()
+        self.assertEqual(workflow.get_ready_user_tasks()[0].data, {'a': 1})
+
+    def testMessages(self):
+        workflow = self.create_workflow('AwaitingMessage', Meeting(1))
+        workflow.do_engine_steps()
+        self.assertRaises(WorkflowTaskExecException,
+                          workflow.message, 'Go', 'hello', 'go')
+
+        async def run():
+            workflow = self.create_workflow('AwaitingMessage', Meeting(1))
+            await workflow.do_engine_steps_async()
+            self.assertFalse(await workflow.message_async(
+                'Unknown', 'hello', 'go'))
+            self.assertTrue(await workflow.message_async(
+                'Go', 'hello', 'go'))
+            return workflow
+
+        task = asyncio.run(run()).get_ready_user_tasks()[0]
+        self.assertEqual(task.task_spec.name, 'Review_AwaitingMessage')
+        self.assertEqual(task.data['reply'], 'hello')
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(AsyncWorkflowTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from SpiffWorkflow.bpmn.serializer.BpmnBinarySerializer import \
+    BpmnBinarySerializer
+from SpiffWorkflow.bpmn.serializer.BpmnSerializer import BpmnSerializer
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from tests.SpiffWorkflow.bpmn.BpmnSerializerTest import BpmnSerializerTest
+
+
+class BpmnBinarySerializerTest(BpmnSerializerTest):
+
+    def setUp(self):
+        super(BpmnBinarySerializerTest, self).setUp()
+        self.serializer = BpmnBinarySerializer()
+        self.return_type = bytes
+
+    def testSpecFromState(self):
+        self.workflow.do_engine_steps()
+        state = self.serializer.serialize_workflow(self.workflow)
+        restored = self.serializer.deserialize_workflow(state)
+        self.assertEqual(restored.get_dump(), self.workflow.get_dump())
+
+    def testCallActivitiesAndSize(self):
+        spec = self.load_workflow_spec('nested_call_activities.bpmn',
+                                       'Level_0')
+        workflow = BpmnWorkflow(spec)
+        workflow.data['payload'] = 'x' * 10000
+        for level in range(2):
+            workflow.do_engine_steps()
+            task = workflow.get_ready_user_tasks()[0]
+            task.update_data({'payload': 'x' * 10000, 'level': level})
+            workflow.complete_task_from_id(task.id)
+        workflow.do_engine_steps()
+
+        state = self.serializer.serialize_workflow(workflow,
+                                                   include_spec=False)
+        json_state = BpmnSerializer().serialize_workflow(workflow,
+                                                         include_spec=False)
+        self.assertLess(len(state) * 3, len(json_state))
+
+        restored = self.serializer.deserialize_workflow(
+            state, workflow_spec=spec)
+        self.assertEqual(restored.get_dump(), workflow.get_dump())
+        self.assertEqual(self.serializer.serialize_workflow(
+            restored, include_spec=False), state)
+        while not restored.is_completed():
+            task = restored.get_ready_user_tasks()[0]
+            restored.complete_task_from_id(task.id)
+            restored.do_engine_steps()
+        self.assertEqual(restored.last_task.data['level'], 1)
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(
+        BpmnBinarySerializerTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+from lxml import etree
+
+from SpiffWorkflow.bpmn.parser.BpmnParser import BpmnParser
+from SpiffWorkflow.bpmn.parser.ElementIndex import ElementIndex
+from SpiffWorkflow.bpmn.parser.ValidationException import ValidationException
+from SpiffWorkflow.bpmn.parser.util import full_tag
+
+
+class ElementIndexTest(unittest.TestCase):
+
+    def load_document(self, filename):
+        return etree.parse(os.path.join(os.path.dirname(__file__), 'data',
+                                        filename))
+
+    def testLookups(self):
+        index = ElementIndex(self.load_document('element_index.bpmn'))
+
+        self.assertEqual(index.get_by_id('Definitions_Index'), [])
+        self.assertEqual([e.get('id') for e in index.get_by_id('Task')],
+                         ['Task'])
+        self.assertEqual(index.get_by_id('Task', 'sequenceFlow'), [])
+        self.assertEqual(
+            [e.get('targetRef') for e in index.get_by_source_ref(
+                'Task', 'sequenceFlow')], ['First', 'Second'])
+        self.assertEqual(
+            [e.get('id') for e in index.get_by_attached_to_ref('Task')],
+            ['Boundary'])
+        self.assertEqual(len(index.get_by_tag(full_tag('endEvent'))), 2)
+        self.assertEqual(index.duplicate_ids, [])
+
+    def testDuplicateIds(self):
+        bpmn = self.load_document('duplicate_ids.bpmn')
+        self.assertEqual(len(ElementIndex(bpmn).duplicate_ids), 1)
+        with self.assertRaises(ValidationException) as context:
+            BpmnParser().add_bpmn_xml(bpmn)
+        self.assertIn('(Start) repeats', str(context.exception))
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(ElementIndexTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
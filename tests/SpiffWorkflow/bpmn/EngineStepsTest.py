@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from SpiffWorkflow.bpmn.PythonScriptEngine import PythonScriptEngine
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.exceptions import WorkflowTaskExecException
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class RecordingScriptEngine(PythonScriptEngine):
+
+    def __init__(self):
+        super(RecordingScriptEngine, self).__init__(
+            scriptingAdditions={'step': lambda branch, idx: idx})
+        self.executed = []
+
+    def execute(self, task, script, data, external_methods=None):
+        self.executed.append(task.task_spec.name)
+        return super(RecordingScriptEngine, self).execute(
+            task, script, data, external_methods=external_methods)
+
+
+class EngineStepsTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec = self.load_workflow_spec('script_branches.bpmn',
+                                            'ScriptBranches')
+
+    def run_engine_steps(self, index_tasks, exit_at=None):
+        workflow = BpmnWorkflow(self.spec,
+                                script_engine=RecordingScriptEngine(),
+                                index_tasks=index_tasks)
+        if exit_at is not None:
+            task = workflow.do_engine_steps(exit_at=exit_at)
+            self.assertEqual(task.task_spec.name, exit_at)
+        workflow.do_engine_steps()
+        self.assertEqual([t.task_spec.name
+                          for t in workflow.get_ready_user_tasks()],
+                         ['Review'])
+        return workflow.script_engine.executed
+
+    def testOrderIsKept(self):
+        expected = self.run_engine_steps(index_tasks=False)
+        self.assertEqual(expected[:3], ['Script_a_0', 'Script_b_0',
+                                        'Script_c_0'])
+        self.assertEqual(self.run_engine_steps(index_tasks=True), expected)
+
+    def testExitAt(self):
+        expected = self.run_engine_steps(index_tasks=False,
+                                         exit_at='Script_a_0')
+        self.assertEqual(
+            self.run_engine_steps(index_tasks=True, exit_at='Script_a_0'),
+            expected)
+
+    def testExecutor(self):
+        # The scripts of the three branches only get past the barrier if
+        # they run at the same time.
+        barrier = threading.Barrier(3, timeout=5)
+
+        def meet(branch, idx):
+            barrier.wait()
+            return idx
+
+        with ThreadPoolExecutor(3) as executor:
+            workflow = BpmnWorkflow(
+                self.spec, script_engine=PythonScriptEngine(
+                    scriptingAdditions={'step': meet}),
+                executor=executor)
+            workflow.do_engine_steps()
+        expected = BpmnWorkflow(self.spec, script_engine=PythonScriptEngine(
+            scriptingAdditions={'step': lambda branch, idx: idx}))
+        expected.do_engine_steps()
+
+        task = workflow.get_ready_user_tasks()[0]
+        self.assertEqual(task.task_spec.name, 'Review')
+        self.assertEqual(task.data,
+                         expected.get_ready_user_tasks()[0].data)
+        self.assertEqual(task.data['c_2'], 2)
+        self.assertEqual(workflow._executions, {})
+
+    def testExecutorDropsUnusedWork(self):
+        with ThreadPoolExecutor(3) as executor:
+            workflow = BpmnWorkflow(self.spec, script_engine=PythonScriptEngine(
+                scriptingAdditions={'step': lambda branch, idx: idx}),
+                executor=executor)
+            workflow.do_engine_steps(exit_at='Script_a_0')
+            task = workflow.get_tasks_from_spec_name('Script_b_0')[0]
+            self.assertIn(task, workflow._executions)
+            task.cancel()
+            workflow.do_engine_steps()
+        self.assertEqual(workflow._executions, {})
+
+    def testExecutorSkipsCancelledWork(self):
+        # The terminating end event of the first branch cancels the scripts
+        # of the other branches, so these never run.
+        steps = []
+
+        def step(branch, idx):
+            steps.append(branch)
+            return idx
+
+        spec = self.load_workflow_spec('terminating_branch.bpmn',
+                                       'TerminatingBranch')
+        with ThreadPoolExecutor(3) as executor:
+            workflow = BpmnWorkflow(spec, script_engine=PythonScriptEngine(
+                scriptingAdditions={'step': step}), executor=executor)
+            workflow.do_engine_steps()
+        self.assertTrue(workflow.is_completed())
+        self.assertEqual(steps, [])
+        self.assertEqual(workflow._executions, {})
+
+    def testExecutorKeepsRunningWork(self):
+        # The script of the first branch fails once the scripts of the other
+        # branches ran. Their work is used once the engine steps go on,
+        # rather than running the scripts again.
+        steps = []
+
+        def step(branch, idx):
+            if branch == 'a' and 'a' not in steps:
+                steps.append('a')
+                # Wait for the scripts of the other branches.
+                while len(steps) < 3:
+                    time.sleep(0.01)
+                raise ValueError('a failed')
+            steps.append(branch)
+            return idx
+
+        with ThreadPoolExecutor(3) as executor:
+            workflow = BpmnWorkflow(self.spec, script_engine=PythonScriptEngine(
+                scriptingAdditions={'step': step}), executor=executor)
+            self.assertRaises(WorkflowTaskExecException,
+                              workflow.do_engine_steps)
+            self.assertEqual(sorted(steps), ['a', 'b', 'c'])
+            workflow.do_engine_steps()
+        self.assertEqual(sorted(steps), ['a'] * 4 + ['b'] * 3 + ['c'] * 3)
+        self.assertEqual(workflow._executions, {})
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(EngineStepsTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -56,6 +56,28 @@ class ExternalMessageBoundaryTest(BpmnWorkflowTestCase):
         self.assertEqual('SomethingDrastic', ready_tasks[0].data['reset_var'])
         self.assertEqual(False, ready_tasks[0].data['caughtinterrupt'])
 
+    def testMessageRouting(self):
+        self.workflow = BpmnWorkflow(self.spec)
+        self.workflow.do_engine_steps()
+        waiting_tasks = self.workflow.get_tasks(Task.WAITING)
+        self.assertEqual(2, len(waiting_tasks))
+        updated = []
+        for task in waiting_tasks:
+            task.task_spec._update = updated.append
+
+        # Unknown messages are rejected without updating any task.
+        self.assertFalse(self.workflow.message('Unknown', 'Nothing', 'var'))
+        self.assertEqual([], updated)
+
+        # Messages are routed by the name of their event or by their id.
+        self.assertTrue(self.workflow.message('Message_0yaysrr',
+                                              'SomethingImportant',
+                                              'interrupt_var'))
+        self.assertEqual(['Message_0yaysrr'],
+                         [t.task_spec.event_definition.message
+                          for t in updated])
+
+
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(ExternalMessageBoundaryTest)
 if __name__ == '__main__':
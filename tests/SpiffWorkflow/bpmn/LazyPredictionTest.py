@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.bpmn.serializer.BpmnSerializer import BpmnSerializer
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class LazyPredictionTest(BpmnWorkflowTestCase):
+
+    def create_workflows(self, filename, process_name, **data):
+        spec = self.load_workflow_spec(filename, process_name)
+        workflows = BpmnWorkflow(spec), BpmnWorkflow(spec, lazy_prediction=True)
+        for workflow in workflows:
+            workflow.get_tasks(Task.READY)[0].set_data(**data)
+        return workflows
+
+    def run_workflow(self, workflow):
+        workflow.do_engine_steps()
+        while not workflow.is_completed():
+            task = workflow.get_ready_user_tasks()[0]
+            task.update_data({task.task_spec.name: True})
+            workflow.complete_task_from_id(task.id)
+            workflow.do_engine_steps()
+        return workflow.last_task.data
+
+    def testScripts(self):
+        eager, lazy = self.create_workflows('script_sequence.bpmn',
+                                            'ScriptSequence')
+        self.assertLess(len(lazy.get_tasks()), 10)
+        self.assertGreater(len(eager.get_tasks()), 50)
+        eager.do_engine_steps()
+        lazy.do_engine_steps()
+        self.assertEqual(lazy.get_ready_user_tasks()[0].data,
+                         eager.get_ready_user_tasks()[0].data)
+        self.assertEqual(self.run_workflow(lazy), self.run_workflow(eager))
+
+    def testJoinsAndCallActivities(self):
+        for filename, process_name, data in (
+                ('user_branches.bpmn', 'UserBranches', {}),
+                ('nested_call_activities.bpmn', 'Level_0', {}),
+                ('timer_branches.bpmn', 'TimerBranches',
+                 {'timer_seconds': 86400})):
+            eager, lazy = self.create_workflows(filename, process_name,
+                                                **data)
+            self.assertEqual(self.run_workflow(lazy),
+                             self.run_workflow(eager))
+
+    def testSerializeAllPredictions(self):
+        eager, lazy = self.create_workflows('nested_call_activities.bpmn',
+                                            'Level_0')
+        eager.do_engine_steps()
+        lazy.do_engine_steps()
+        self.assertLess(len(lazy.get_tasks()), len(eager.get_tasks()))
+
+        serializer = BpmnSerializer()
+        state = serializer.serialize_workflow(lazy, include_spec=False)
+        self.assertEqual(len(lazy.get_tasks()), len(eager.get_tasks()))
+        self.assertEqual(len(lazy.get_tasks(Task.FUTURE)),
+                         len(eager.get_tasks(Task.FUTURE)))
+        restored = serializer.deserialize_workflow(state,
+                                                   workflow_spec=lazy.spec)
+        self.assertFalse(restored.lazy_prediction)
+        self.assertEqual(self.run_workflow(restored),
+                         self.run_workflow(eager))
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(LazyPredictionTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
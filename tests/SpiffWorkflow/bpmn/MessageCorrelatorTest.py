@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.bpmn.MessageCorrelator import MessageCorrelator
+from SpiffWorkflow.bpmn.serializer.BpmnSerializer import BpmnSerializer
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class MessageCorrelatorTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec = self.load_workflow_spec('message_correlation.bpmn',
+                                            'MessageCorrelation')
+
+    def create_workflow(self, order_id):
+        workflow = BpmnWorkflow(self.spec)
+        workflow.do_engine_steps()
+        task = workflow.get_ready_user_tasks()[0]
+        task.update_data({'order_id': order_id})
+        workflow.complete_task_from_id(task.id)
+        workflow.do_engine_steps()
+        return workflow
+
+    def assertPaid(self, workflow, payment):
+        self.assertTrue(workflow.is_completed())
+        self.assertEqual(workflow.last_task.data['payment'], payment)
+
+    def testCorrelationKey(self):
+        first = self.create_workflow(1)
+        second = self.create_workflow(2)
+        event = ('message', 'Message_Payment', 2)
+        self.assertEqual(len(first._waiting_subscribers.get(event, {})), 0)
+        self.assertEqual(len(second._waiting_subscribers.get(event, {})), 1)
+
+        self.assertFalse(first.message('Payment', 10, 'payment',
+                                       correlation_key=2))
+        self.assertEqual(len(first.get_tasks(Task.WAITING)), 1)
+        self.assertTrue(second.message('Payment', 20, 'payment',
+                                       correlation_key=2))
+        self.assertPaid(second, 20)
+
+        # Without a correlation key, any waiting task receives the message.
+        self.assertTrue(first.message('Payment', 10, 'payment'))
+        self.assertPaid(first, 10)
+
+    def testCorrelateWorkflows(self):
+        workflows = dict((order_id, self.create_workflow(order_id))
+                         for order_id in range(5))
+        correlator = MessageCorrelator()
+        for order_id, workflow in workflows.items():
+            correlator.add_workflow(order_id, workflow)
+        self.assertEqual(correlator.get_workflow_ids('Payment', 3), [3])
+        self.assertEqual(correlator.get_workflow_ids('Message_Payment'),
+                         [0, 1, 2, 3, 4])
+
+        self.assertEqual(correlator.correlate('Payment', 30, 'payment', 3), 3)
+        self.assertPaid(workflows[3], 30)
+        self.assertEqual(correlator.get_workflow_ids('Payment'),
+                         [0, 1, 2, 4])
+        self.assertIsNone(correlator.correlate('Payment', 30, 'payment', 3))
+        self.assertIsNone(correlator.correlate('Unknown', 30, 'payment'))
+
+        # Without a correlation key, the first waiting workflow is chosen.
+        self.assertEqual(correlator.correlate('Payment', 0, 'payment'), 0)
+        self.assertPaid(workflows[0], 0)
+        self.assertEqual(len(correlator), 5)
+        correlator.remove(1)
+        self.assertNotIn(1, correlator)
+        self.assertEqual(correlator.get_workflow_ids('Payment'), [2, 4])
+
+    def testCorrelateSummaries(self):
+        serializer = BpmnSerializer()
+        states = {}
+        summaries = {}
+        for order_id in range(3):
+            workflow = self.create_workflow(order_id)
+            states[order_id] = serializer.serialize_workflow(
+                workflow, include_spec=False)
+            summaries[order_id] = json.dumps(
+                MessageCorrelator.get_summary(workflow))
+
+        loaded = []
+
+        def load_workflow(order_id):
+            loaded.append(order_id)
+            return serializer.deserialize_workflow(states[order_id],
+                                                   workflow_spec=self.spec)
+
+        def save_workflow(order_id, workflow):
+            states[order_id] = serializer.serialize_workflow(
+                workflow, include_spec=False)
+
+        correlator = MessageCorrelator(load_workflow, save_workflow)
+        for order_id, summary in summaries.items():
+            correlator.add_summary(order_id, json.loads(summary))
+        self.assertEqual(correlator.correlate('Payment', 20, 'payment', 2), 2)
+        self.assertEqual(loaded, [2])
+        self.assertPaid(load_workflow(2), 20)
+        self.assertEqual(correlator.get_workflow_ids('Payment'), [0, 1])
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(MessageCorrelatorTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from SpiffWorkflow.bpmn.parser.SpecCache import SpecCache
+from SpiffWorkflow.bpmn.parser.ValidationException import ValidationException
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.dmn.parser.BpmnDmnParser import BpmnDmnParser
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data', 'parallel_loading')
+
+
+class ParallelLoadingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for filename in os.listdir(DATA_DIR):
+            if filename != 'errors':
+                shutil.copy(os.path.join(DATA_DIR, filename), self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy_error(self, filename):
+        shutil.copy(os.path.join(DATA_DIR, 'errors', filename),
+                    self.directory)
+
+    def create_parser(self, parser_class=BpmnDmnParser, **kwargs):
+        parser = parser_class(**kwargs)
+        parser.add_bpmn_files_by_glob(os.path.join(self.directory, '*.bpmn'))
+        parser.add_dmn_files_by_glob(os.path.join(self.directory, '*.dmn'))
+        return parser
+
+    def run_workflow(self, spec):
+        workflow = BpmnWorkflow(spec)
+        workflow.do_engine_steps()
+        self.assertTrue(workflow.is_completed())
+        return workflow.last_task.data
+
+    def testSpecsAreBuiltOnTheExecutor(self):
+        names = ['Process_%d' % idx for idx in range(4)]
+        expected = self.create_parser().get_specs(names)
+
+        parser = self.create_parser(executor=self.executor)
+        specs = parser.get_specs(names)
+        self.assertEqual(parser.process_parsers, {})
+        self.assertEqual(parser.dmn_parsers, {})
+        for name in names:
+            self.assertEqual(self.run_workflow(specs[name]),
+                             self.run_workflow(expected[name]))
+            self.assertIs(parser.get_spec(name), specs[name])
+
+        # The processes can still be parsed here.
+        self.assertEqual(parser.get_process_parser('Process_0').get_spec(
+            ).get_specs_depth_first()[-1].name, 'Process_3')
+
+    def testSpecCache(self):
+        cache = SpecCache(os.path.join(self.directory, 'cache'))
+        self.create_parser(spec_cache=cache,
+                           executor=self.executor).get_specs(['Process_0'])
+        parser = self.create_parser(spec_cache=cache)
+        self.assertEqual(self.run_workflow(parser.get_spec('Process_0')),
+                         {'value': 3, 'result': 3})
+        self.assertEqual(parser.process_parsers, {})
+
+    def testErrors(self):
+        self.copy_error('duplicate.bpmn')
+        self.assertRaises(ValidationException, self.create_parser,
+                          executor=self.executor)
+
+        os.remove(os.path.join(self.directory, 'duplicate.bpmn'))
+        self.copy_error('broken.bpmn')
+        self.assertRaises(etree.XMLSyntaxError, self.create_parser,
+                          executor=self.executor)
+
+    def testExecutorErrors(self):
+        # Errors that do not come from the files are not hidden. Here the
+        # parser class cannot be sent to the processes of the executor.
+        class LocalParser(BpmnDmnParser):
+            pass
+
+        self.assertRaises(AttributeError, self.create_parser,
+                          parser_class=LocalParser, executor=self.executor)
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(ParallelLoadingTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -6,7 +6,9 @@ import sys
 import os
 import unittest
 
-from SpiffWorkflow.bpmn.PythonScriptEngine import PythonScriptEngine
+from SpiffWorkflow.bpmn.PythonScriptEngine import PythonScriptEngine, CodeCache, \
+    Box
+from SpiffWorkflow.exceptions import WorkflowTaskExecException
 from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
@@ -46,6 +48,77 @@ localtime_str = localtime.strftime("%Y-%m-%d %H:%M:%S")
         self.assertEqual(data['now_est'].tzinfo.zone, "US/Eastern")
         self.assertEqual(data['localtime_str'], "2021-09-23 12:11:00")
         self.assertTrue(True)
+    def testCompiledExpressionsAreCached(self):
+        cache = PythonScriptEngine.code_cache
+        cache.clear()
+        for value in range(3):
+            self.assertTrue(
+                self.expressionEngine._evaluate('a + 1 == b', a=value,
+                                                b=value + 1))
+        info = cache.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.currsize, 1)
+
+        data = {'a': 1}
+        self.expressionEngine.execute(self.task, 'b = a + 1', data)
+        self.expressionEngine.execute(self.task, 'b = a + 1', data)
+        self.assertEqual(data['b'], 2)
+        self.assertEqual(cache.cache_info().misses, 2)
+        self.assertEqual(cache.cache_info().hits, 3)
+
+    def testCodeCacheIsBounded(self):
+        cache = CodeCache(maxsize=2)
+        for text in ['a', 'b', 'a', 'c']:
+            cache.get(text, lambda: compile(text, '<string>', 'eval'))
+        self.assertEqual(cache.cache_info(), (1, 3, 2, 2))
+        cache.get('a', lambda: None)
+        self.assertEqual(cache.cache_info().hits, 2)
+        self.assertIsNone(cache.get('b', lambda: None))
+
+    def testEvaluationDoesNotCopyData(self):
+        nested = {'b': {'c': 1}}
+        data = {'a': nested, 'x': 2}
+        self.assertTrue(self.expressionEngine._evaluate('a.b.c + x == 3', **data))
+        self.assertTrue(self.expressionEngine._evaluate('"x" in vars()', **data))
+        self.assertIs(data['a'], nested)
+        self.assertEqual(data, {'a': {'b': {'c': 1}}, 'x': 2})
+
+        # Neither the data nor the globals are copied into the namespace.
+        class Uncopyable(dict):
+            def keys(self):
+                raise AssertionError('The data was copied')
+            __iter__ = items = keys
+
+        engine = PythonScriptEngine()
+        engine.globals = Uncopyable(engine.globals)
+        self.assertTrue(engine._evaluate_data(
+            'a.b.c + x == 2 + len([datetime])', Uncopyable(data)))
+
+        engine = PythonScriptEngine()
+        engine.copy_context = True
+        self.assertTrue(engine._evaluate('a.b.c + x == 3', **data))
+        self.assertEqual(data, {'a': {'b': {'c': 1}}, 'x': 2})
+
+
+    def testExecuteConvertsDataLazily(self):
+        untouched = {'big': [{'x': 1}]}
+        data = {'a': {'b': {'c': 1}}, 'items': [1, 2], 'other': untouched}
+        script = "a.b.c = 2\ntotal = sum([i + a.b.c for i in items])"
+        self.expressionEngine.execute(self.task, script, data)
+        self.assertEqual(data['total'], 7)
+        self.assertEqual(data['a'], {'b': {'c': 2}})
+        self.assertNotIsInstance(data['a'], Box)
+        self.assertNotIsInstance(data['a']['b'], Box)
+        self.assertIs(data['other'], untouched)
+        # Neither the data nor the external methods leak into the globals.
+        self.expressionEngine.execute(self.task, 'y = 1', {},
+                                      external_methods={'f': len})
+        self.assertNotIn('total', self.expressionEngine.globals)
+        self.assertNotIn('f', self.expressionEngine.globals)
+        with self.assertRaises(WorkflowTaskExecException):
+            self.expressionEngine.execute(self.task, 'z = total', {})
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(PythonScriptEngineTest)
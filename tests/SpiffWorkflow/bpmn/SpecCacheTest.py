@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from SpiffWorkflow.bpmn.parser.SpecCache import SpecCache
+from SpiffWorkflow.bpmn.parser.ValidationException import ValidationException
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.dmn.parser.BpmnDmnParser import BpmnDmnParser
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data', 'spec_cache')
+
+
+class SpecCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        # The files are copied, so that the tests can change them.
+        self.directory = tempfile.mkdtemp()
+        for filename in ('top.bpmn', 'other.bpmn', 'sub.bpmn',
+                         'decision.dmn'):
+            shutil.copy(os.path.join(DATA_DIR, filename), self.directory)
+        self.cache = SpecCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy_change(self, filename):
+        shutil.copy(os.path.join(DATA_DIR, 'changes', filename),
+                    self.directory)
+
+    def write_sub(self, value):
+        path = os.path.join(self.directory, 'sub.bpmn')
+        with open(path) as f:
+            xml = f.read()
+        with open(path, 'w') as f:
+            f.write(xml.replace('value = 1', 'value = %d' % value))
+
+    def create_parser(self, spec_cache):
+        parser = BpmnDmnParser(spec_cache=spec_cache)
+        parser.add_bpmn_files_by_glob(os.path.join(self.directory, '*.bpmn'))
+        parser.add_dmn_files_by_glob(os.path.join(self.directory, '*.dmn'))
+        return parser
+
+    def run_workflow(self, spec):
+        workflow = BpmnWorkflow(spec)
+        workflow.do_engine_steps()
+        while not workflow.is_completed():
+            for task in workflow.get_ready_user_tasks():
+                workflow.complete_task_from_id(task.id)
+            workflow.do_engine_steps()
+        return workflow.last_task.data
+
+    def testWarmStartParsesNothing(self):
+        expected = self.run_workflow(self.create_parser(None).get_spec('Top'))
+        self.assertEqual(expected['result'], 1)
+
+        cold = self.create_parser(self.cache)
+        self.assertEqual(self.run_workflow(cold.get_spec('Top')), expected)
+        cold.get_spec('Other')
+
+        warm = self.create_parser(self.cache)
+        spec = warm.get_spec('Top')
+        other = warm.get_spec('Other')
+        self.assertEqual(warm.process_parsers, {})
+        self.assertEqual(warm.dmn_parsers, {})
+        self.assertIs(warm.get_spec('Top'), spec)
+        self.assertEqual(other.name, 'Other')
+        self.assertEqual(self.run_workflow(spec), expected)
+        # The processes are still parsed when their parsers are asked for.
+        self.assertEqual(warm.get_process_parser('Sub').get_id(), 'Sub')
+
+    def testChangedFilesAreParsedAgain(self):
+        self.create_parser(self.cache).get_spec('Top')
+        self.create_parser(self.cache).get_spec('Other')
+        self.write_sub(2)
+
+        parser = self.create_parser(self.cache)
+        self.assertEqual(self.run_workflow(parser.get_spec('Top'))['result'],
+                         2)
+        parser.get_spec('Other')
+        self.assertIn('Top', parser.process_parsers)
+        self.assertNotIn('Other', parser.process_parsers)
+
+        self.copy_change('decision.dmn')
+        parser = self.create_parser(self.cache)
+        self.assertEqual(self.run_workflow(parser.get_spec('Top'))['result'],
+                         1)
+
+    def testDuplicateProcessIds(self):
+        self.create_parser(self.cache)
+        self.copy_change('copy.bpmn')
+        self.assertRaises(ValidationException, self.create_parser, self.cache)
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(SpecCacheTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+
+from SpiffWorkflow.bpmn.PythonScriptEngine import PythonScriptEngine
+from SpiffWorkflow.bpmn.TimerScheduler import TimerScheduler
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.task import Task
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class CountingScriptEngine(PythonScriptEngine):
+
+    def __init__(self):
+        super(CountingScriptEngine, self).__init__()
+        self.evaluations = 0
+
+    def evaluate(self, task, expression):
+        self.evaluations += 1
+        return super(CountingScriptEngine, self).evaluate(task, expression)
+
+
+class TimerSchedulerTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec = self.load_workflow_spec('timer_branches.bpmn',
+                                            'TimerBranches')
+
+    def create_workflow(self, timer_seconds):
+        workflow = BpmnWorkflow(self.spec,
+                                script_engine=CountingScriptEngine())
+        workflow.get_tasks(Task.READY)[0].set_data(timer_seconds=timer_seconds)
+        workflow.do_engine_steps()
+        return workflow
+
+    def testDueTimeIsComputedOnce(self):
+        workflow = self.create_workflow(0.2)
+        started = time.time()
+        due_time = workflow.get_next_due_time()
+        self.assertAlmostEqual(due_time, started + 0.2, delta=0.1)
+        self.assertEqual(workflow.script_engine.evaluations, 3)
+        for idx in range(3):
+            workflow.refresh_waiting_tasks()
+        self.assertEqual(workflow.get_due_tasks(), [])
+        self.assertEqual(workflow.get_next_due_time(), due_time)
+        self.assertEqual(workflow.script_engine.evaluations, 3)
+
+    def testRefreshDueTasks(self):
+        workflow = self.create_workflow(0.2)
+        workflow.refresh_due_tasks()
+        self.assertEqual(len(workflow.get_ready_user_tasks()), 3)
+        time.sleep(max(0, workflow.get_next_due_time() - time.time()) + 0.01)
+
+        due_tasks = workflow.get_due_tasks()
+        self.assertEqual([task.task_spec.name for task in due_tasks],
+                         ['Timer_0', 'Timer_1', 'Timer_2'])
+        workflow.refresh_due_tasks()
+        workflow.do_engine_steps()
+        self.assertEqual(workflow.get_ready_user_tasks(), [])
+        self.assertEqual(workflow.get_due_tasks(), [])
+        self.assertIsNone(workflow.get_next_due_time())
+
+    def testSchedulerRunsDueWorkflows(self):
+        later = self.create_workflow(86400)
+        soon = self.create_workflow(0.1)
+        scheduler = TimerScheduler()
+        scheduler.schedule(later)
+        scheduler.schedule(soon)
+        self.assertEqual(len(scheduler), 2)
+        self.assertEqual(scheduler.get_next_due_time(),
+                         soon.get_next_due_time())
+        self.assertEqual(scheduler.run_due_workflows(time.time()), [])
+
+        time.sleep(max(0, scheduler.get_next_due_time() - time.time()) + 0.01)
+        self.assertEqual(scheduler.run_due_workflows(), [soon])
+        self.assertEqual(soon.get_ready_user_tasks(), [])
+        # The timers of the workflow fired, so it is not scheduled again.
+        self.assertNotIn(soon, scheduler)
+        self.assertEqual(scheduler.get_next_due_time(),
+                         later.get_next_due_time())
+
+        scheduler.unschedule(later)
+        self.assertIsNone(scheduler.get_next_due_time())
+        self.assertEqual(scheduler.pop_due_workflows(time.time() + 86400),
+                         [])
+
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(TimerSchedulerTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
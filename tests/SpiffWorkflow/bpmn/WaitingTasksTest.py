@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from tests.SpiffWorkflow.bpmn.BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class WaitingTasksTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.updates = []
+
+    def create_workflow(self, timer_seconds):
+        spec = self.load_workflow_spec('timer_branches.bpmn', 'TimerBranches')
+        for name in ['Join', 'Timer_0', 'Timer_1', 'Timer_2']:
+            self.count_updates(spec.get_task_spec_from_name(name))
+        workflow = BpmnWorkflow(spec)
+        workflow.get_tasks(Task.READY)[0].set_data(timer_seconds=timer_seconds)
+        workflow.do_engine_steps()
+        return workflow
+
+    def count_updates(self, task_spec):
+        update = task_spec._update
+
+        def counting_update(my_task):
+            self.updates.append(task_spec.name)
+            return update(my_task)
+        task_spec._update = counting_update
+
+    def complete(self, workflow, name):
+        task = [t for t in workflow.get_ready_user_tasks()
+                if t.task_spec.name == name][0]
+        task.complete()
+        workflow.do_engine_steps()
+
+    def testOnlyAffectedTasksAreUpdated(self):
+        workflow = self.create_workflow(86400)
+        self.assertEqual(len(workflow.get_waiting_tasks()), 3)
+        self.complete(workflow, 'User_0')
+        self.assertEqual(len(workflow.get_waiting_tasks()), 3)
+
+        # The timers and joins now told what they are waiting for, so only
+        # the new instance of the join is updated.
+        del self.updates[:]
+        self.complete(workflow, 'User_1')
+        self.assertEqual(set(self.updates), set(['Join']))
+        self.assertEqual(len(workflow.get_waiting_tasks()), 3)
+
+        # Refreshing still updates all of them.
+        del self.updates[:]
+        workflow.refresh_waiting_tasks()
+        self.assertEqual(sorted(self.updates),
+                         ['Join', 'Join', 'Timer_2'])
+
+        self.complete(workflow, 'User_2')
+        self.assertTrue(workflow.is_completed())
+
+    def testTimersAreUpdatedOnceDue(self):
+        workflow = self.create_workflow(0.2)
+        self.complete(workflow, 'User_0')
+        self.assertEqual(len(workflow.get_ready_user_tasks()), 2)
+        time.sleep(0.3)
+
+        # The completion of a task updates the timers that are due.
+        self.complete(workflow, 'User_1')
+        self.assertEqual(workflow.get_ready_user_tasks(), [])
+        self.assertEqual(
+            [t.task_spec.name for t in workflow.get_tasks(Task.COMPLETED)
+             if t.task_spec.name.startswith('TimerEndEvent')],
+            ['TimerEndEvent_2'])
+
+    def testInclusiveGatewayWaitsForBlockingTasks(self):
+        spec = self.load_workflow_spec('inclusive_join.bpmn', 'InclusiveJoin')
+        self.count_updates(spec.get_task_spec_from_name('Join'))
+        workflow = BpmnWorkflow(spec)
+        workflow.do_engine_steps()
+        self.complete(workflow, 'Task_A')
+        join = workflow.get_waiting_tasks()[0]
+        self.assertEqual(join.task_spec.name, 'Join')
+        task_spec = spec.get_task_spec_from_name('Task_B1')
+        self.assertEqual(join.task_spec._get_wakeup_events(join),
+                         [task_spec, ('cancel', task_spec)])
+
+        # Task C has no path to the gateway, unlike Task B1.
+        del self.updates[:]
+        self.complete(workflow, 'Task_C')
+        self.assertEqual(self.updates, [])
+        self.complete(workflow, 'Task_B1')
+        self.assertEqual(self.updates, ['Join'])
+        task_spec = spec.get_task_spec_from_name('Task_B2')
+        self.assertEqual(join.task_spec._get_wakeup_events(join),
+                         [task_spec, ('cancel', task_spec)])
+        self.complete(workflow, 'Task_B2')
+        self.assertTrue(workflow.is_completed())
+
+    def testInclusiveGatewayWakesOnCancelledTasks(self):
+        spec = self.load_workflow_spec('inclusive_join.bpmn', 'InclusiveJoin')
+        workflow = BpmnWorkflow(spec)
+        workflow.do_engine_steps()
+        self.complete(workflow, 'Task_A')
+        join = workflow.get_waiting_tasks()[0]
+
+        # Once the task that blocks the gateway is cancelled, nothing may
+        # reach the gateway anymore.
+        workflow.get_tasks_from_spec_name('Task_B1')[0].cancel()
+        self.assertEqual(join.state, Task.READY)
+        workflow.do_engine_steps()
+        self.complete(workflow, 'Task_C')
+        self.assertTrue(workflow.is_completed())
+
+def suite():
+    return unittest.TestLoader().loadTestsFromTestCase(WaitingTasksTest)
+
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
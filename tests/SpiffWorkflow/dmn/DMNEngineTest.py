@@ -0,0 +1,183 @@
+import random
+import unittest
+from decimal import Decimal
+
+from SpiffWorkflow.bpmn.FeelLikeScriptEngine import FeelLikeScriptEngine
+from SpiffWorkflow.bpmn.PythonScriptEngine import PythonScriptEngine
+from SpiffWorkflow.dmn.engine.DMNEngine import DMNEngine, ColumnIndex, \
+    have_numpy
+from SpiffWorkflow.dmn.specs.model import DecisionTable, Input, InputEntry, \
+    Rule
+
+
+def make_table(expressions, rows):
+    """
+    Builds a decision table with an input per expression and a rule per
+    row of input entry texts; a rule is described by its index.
+    """
+    table = DecisionTable('table', 'Table')
+    for idx, expression in enumerate(expressions):
+        table.inputs.append(
+            Input('input_%d' % idx, 'Input %d' % idx, '', expression, ''))
+    for row_idx, row in enumerate(rows):
+        rule = Rule('rule_%d' % row_idx)
+        rule.description = str(row_idx)
+        for idx, text in enumerate(row):
+            entry = InputEntry('entry_%d_%d' % (row_idx, idx),
+                               table.inputs[idx])
+            entry.lhs.append(text)
+            rule.inputEntries.append(entry)
+        table.rules.append(rule)
+    return table
+
+
+class DMNEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.script_engine = PythonScriptEngine()
+        self.engine = DMNEngine(make_table(
+            ['probe(x)', 'name'],
+            [['< 10', '"a"'],
+             ['10 <= ? < 20', None],
+             ['20', '"b"'],
+             [None, None]]))
+        self.calls = 0
+
+    def probe(self, value):
+        self.calls += 1
+        return value
+
+    def decide(self, x, name):
+        return self.engine.decide(self.script_engine, x=x, name=name,
+                                  probe=self.probe)
+
+    def testDecide(self):
+        self.assertEqual(self.decide(5, 'a').description, '0')
+        self.assertEqual(self.decide(5, 'b').description, '3')
+        self.assertEqual(self.decide(15, 'b').description, '1')
+        self.assertEqual(self.decide(20, 'b').description, '2')
+        self.assertEqual(self.decide(20, 'c').description, '3')
+        self.assertEqual(self.decide(25, 'c').description, '3')
+
+    def testInputIsEvaluatedOnce(self):
+        self.assertEqual(self.decide(25, 'c').description, '3')
+        self.assertEqual(self.calls, 1)
+
+    def testTableIsCompiledOnce(self):
+        compiled = self.engine.compile(self.script_engine)
+        self.decide(5, 'a')
+        self.assertIs(self.engine.compile(PythonScriptEngine()), compiled)
+        self.assertIsNot(self.engine.compile(FeelLikeScriptEngine()),
+                         compiled)
+        self.assertEqual([len(entries) for entries in compiled[1]], [1, 0])
+
+
+class SequentialDMNEngine(DMNEngine):
+
+    def get_indexes(self, script_engine):
+        return []
+
+
+class DMNEngineIndexTest(unittest.TestCase):
+
+    CELLS = [None, '1', '2', '"a"', 'True', '< 2', '>= 3', '1 <= ? <= 3',
+             '3 > ? > 1.5', '-1']
+
+    def assertSameDecisions(self, expressions, rows, values, script_engine):
+        indexed = DMNEngine(make_table(expressions, rows))
+        sequential = SequentialDMNEngine(make_table(expressions, rows))
+        for value in values:
+            data = dict(('x%d' % idx, v) for idx, v in enumerate(value))
+            self.assertEqual(self.describe(sequential, script_engine, data),
+                             self.describe(indexed, script_engine, data),
+                             value)
+        return indexed
+
+    def describe(self, engine, script_engine, data):
+        try:
+            rule = engine.decide(script_engine, **data)
+        except Exception as e:
+            return str(e)
+        return rule.description if rule is not None else None
+
+    def testIndexedDecisionsMatchSequentialOnes(self):
+        rng = random.Random(42)
+        rows = [[rng.choice(self.CELLS) for column in range(3)]
+                for row in range(200)]
+        choices = [0, 1, 1.0, 1.5, 2, 2.5, 3, 4, -1, True, 'a', Decimal('2')]
+        values = [[rng.choice(choices) for column in range(3)]
+                  for value in range(300)]
+        engine = self.assertSameDecisions(['x0', 'x1', 'x2'], rows, values,
+                                          PythonScriptEngine())
+        self.assertEqual(len(engine.get_indexes(PythonScriptEngine())), 3)
+
+    def testUnindexedColumnsAreCheckedInOrder(self):
+        rows = [['1', 'x1.startswith("b")'], ['< 2', None], [None, '"c"'],
+                ['3', '> 1']]
+        values = [[1, 'b'], [1, 'c'], [0, 'a'], [3, 'c'], [3, 'd'], ['a', 1]]
+        engine = self.assertSameDecisions(['x0', 'x1'], rows, values,
+                                          PythonScriptEngine())
+        self.assertEqual(len(engine.get_indexes(PythonScriptEngine())), 1)
+        # The comparisons with a string raise, like they do without index.
+        with self.assertRaises(Exception):
+            engine.decide(PythonScriptEngine(), x0='a', x1='c')
+        with self.assertRaises(Exception):
+            engine.decide(PythonScriptEngine(), x0=3, x1='d')
+
+    def testFeelIntervals(self):
+        rows = [['[1..3]'], ['(3..5)'], ['[5..6.5]'], ['> 6.5']]
+        values = [[v] for v in [0, 1, 3, 3.5, 5, 6.5, 6.50001, 7]]
+        engine = self.assertSameDecisions(['x0'], rows, values,
+                                          FeelLikeScriptEngine())
+        self.assertEqual(len(engine.get_indexes(FeelLikeScriptEngine())), 1)
+
+    def assertSameBatchDecisions(self, vectorize):
+        rng = random.Random(7)
+        rows = [[rng.choice(self.CELLS) for column in range(2)]
+                for row in range(50)] + [['x0 > x1', None]]
+        engine = DMNEngine(make_table(['x0', 'x1'], rows))
+        engine.batch_size = 16
+        choices = [0, 1, 1.5, 2, 3, 4, -1, True, Decimal('2')]
+        inputs = [{'x0': rng.choice(choices), 'x1': rng.choice(choices)}
+                  for value in range(100)]
+        script_engine = PythonScriptEngine()
+        expected = [engine.decide(script_engine, **data) for data in inputs]
+        self.assertEqual(
+            engine.decide_many(script_engine, inputs, vectorize=vectorize),
+            expected)
+
+    def testDecideMany(self):
+        self.assertSameBatchDecisions(False)
+        if not have_numpy:
+            with self.assertRaises(Exception):
+                DMNEngine(make_table(['x'], [['1']])).decide_many(
+                    PythonScriptEngine(), [{'x': 1}], vectorize=True)
+
+    @unittest.skipUnless(have_numpy, 'NumPy is not installed')
+    def testDecideManyWithNumpy(self):
+        self.assertSameBatchDecisions(True)
+        engine = DMNEngine(make_table(['x'], [['"a"'], ['"b"'], [None]]))
+        rules = engine.decide_many(PythonScriptEngine(),
+                                   [{'x': 'b'}, {'x': 'c'}, {'x': 'a'}])
+        self.assertEqual([rule.description for rule in rules], ['1', '2', '0'])
+
+    def testColumnIndex(self):
+        table = make_table(['x'], [['1'], ['< 1'], [None], ['1 < ? <= 2']])
+        index = DMNEngine(table).get_indexes(PythonScriptEngine())[0]
+        self.assertIsInstance(index, ColumnIndex)
+        self.assertEqual(index.get_candidates(0), 0b0110)
+        self.assertEqual(index.get_candidates(1), 0b0101)
+        self.assertEqual(index.get_candidates(2), 0b1100)
+        self.assertEqual(index.get_candidates(3), 0b0100)
+        self.assertIsNone(index.get_candidates([1]))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(DMNEngineTest))
+    suite.addTest(
+        unittest.TestLoader().loadTestsFromTestCase(DMNEngineIndexTest))
+    return suite
+
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
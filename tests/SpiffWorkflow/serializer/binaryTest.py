@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, division
+import sys
+import unittest
+import os
+dirname = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(dirname, '..', '..', '..'))
+
+import uuid
+from SpiffWorkflow.serializer.binary import BinarySerializer, dumps, loads
+from .dictTest import DictionarySerializerTest
+
+
+class BinarySerializerTest(DictionarySerializerTest):
+
+    def setUp(self):
+        super(BinarySerializerTest, self).setUp()
+        self.serializer = BinarySerializer()
+        self.return_type = bytes
+
+    def _prepare_result(self, item):
+        return loads(item)
+
+    def testDumpsAndLoads(self):
+        task_id = uuid.uuid4()
+        value = {'id': task_id, 'state': 16, 'parent': None, 'ratio': 0.5,
+                 'children': [{'id': task_id, 'flag': True}, (-300, 2 ** 70)],
+                 'data': {'payload': b'x' * 100, 'copy': b'x' * 100},
+                 'name': 'Task', 'other': 'Task', 'text': u'été',
+                 'when': {1, 2}}
+        data = dumps(value)
+        # Repeated strings and bytes are only written once.
+        self.assertEqual(data.count(b'x' * 100), 1)
+        self.assertEqual(data.count(b'Task'), 1)
+        self.assertEqual(data.count(task_id.bytes), 2)
+        value['children'][1] = list(value['children'][1])
+        self.assertEqual(loads(data), value)
+        self.assertRaises(ValueError, loads, b'{}')
+
+
+def suite():
+    return unittest.defaultTestLoader.loadTestsFromTestCase(
+        BinarySerializerTest)
+if __name__ == '__main__':
+    unittest.TextTestRunner(verbosity=2).run(suite())
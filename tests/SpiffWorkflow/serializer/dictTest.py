@@ -9,9 +9,12 @@ dirname = os.path.dirname(__file__)
 sys.path.insert(0, os.path.join(dirname, '..', '..', '..'))
 
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from SpiffWorkflow.serializer.dict import DictionarySerializer
 from .baseTest import SerializerTest
-from SpiffWorkflow import Workflow
+from SpiffWorkflow import Workflow, Task
+from data.spiff.workflow1 import TestWorkflowSpec
 
 
 class DictionarySerializerTest(SerializerTest):
@@ -67,6 +70,98 @@ class DictionarySerializerTest(SerializerTest):
             self.assertEqual(type(item1), type(item2), msg)
             self.assertEqual(item1, item2)
 
+    def testDeserializeWorkflowConnectsParents(self):
+        workflow = Workflow(TestWorkflowSpec())
+        workflow.complete_next()
+        workflow.complete_next()
+        s_state = workflow.serialize(self.serializer)
+        restored = Workflow.deserialize(self.serializer, s_state)
+
+        self.assertIsNone(restored.task_tree.parent)
+        for task in restored.task_tree:
+            for child in task.children:
+                self.assertIs(task, child.parent)
+        self.assertEqual(workflow.last_task.id, restored.last_task.id)
+        self.assertIs(restored.last_task,
+                      restored.get_task(restored.last_task.id))
+        self.assertEqual(restored._get_task_mapping(), restored.task_mapping)
+
+    def testTaskDataIsWrittenOnce(self):
+        workflow = Workflow(TestWorkflowSpec())
+        workflow.task_tree.children[0].set_data(payload='x' * 1000)
+        for idx in range(5):
+            workflow.complete_next()
+        s_state = self._prepare_result(workflow.serialize(self.serializer))
+
+        tasks = [s_state['task_tree']]
+        for task in tasks:
+            tasks.extend(task['children'])
+        self.assertNotIn('data', tasks[0])
+        self.assertLess(len(s_state['task_data']), 5)
+        self.assertGreater(len(tasks), 10)
+
+        restored = Workflow.deserialize(self.serializer,
+                                        workflow.serialize(self.serializer))
+        for task in workflow.get_tasks():
+            self.assertEqual(restored.get_task(task.id).data, task.data)
+        task = restored.get_tasks(Task.READY)[0]
+        task.set_data(payload='changed')
+        self.assertEqual(task.parent.data['payload'], 'x' * 1000)
+
+    def testInternalDataIsNotAllocated(self):
+        workflow = Workflow(TestWorkflowSpec())
+        workflow.complete_next()
+        restored = Workflow.deserialize(self.serializer,
+                                        workflow.serialize(self.serializer))
+        for task in workflow.get_tasks() + restored.get_tasks():
+            self.assertIsNone(task._internal_data)
+
+    def testDeserializeTaskDataOfOldStates(self):
+        serializer = DictionarySerializer()
+        workflow = Workflow(TestWorkflowSpec())
+        workflow.task_tree.children[0].set_data(payload='x')
+        workflow.complete_next()
+        s_state = serializer.serialize_workflow(workflow)
+
+        task_data = s_state.pop('task_data')
+        tasks = [s_state['task_tree']]
+        for task in tasks:
+            task['data'] = task_data[task.pop('data_ref')]
+            tasks.extend(task['children'])
+        restored = serializer.deserialize_workflow(s_state)
+        for task in workflow.get_tasks():
+            self.assertEqual(restored.get_task(task.id).data, task.data)
+
+    def testSerializeInThreads(self):
+        # The serializer keeps no state of its own while it is serializing:
+        # the threads wait for each other whenever they serialize a payload.
+        barrier = threading.Barrier(2, timeout=5)
+
+        class Serializer(DictionarySerializer):
+            def serialize_dict(self, thedict):
+                if 'payload' in thedict:
+                    barrier.wait()
+                return super(Serializer, self).serialize_dict(thedict)
+
+        serializer = Serializer()
+        workflows = []
+        for idx in range(2):
+            workflow = Workflow(TestWorkflowSpec())
+            workflow.task_tree.children[0].set_data(payload=idx)
+            workflow.complete_next()
+            workflow.get_tasks(Task.READY)[0].set_data(payload=-idx)
+            workflows.append(workflow)
+
+        with ThreadPoolExecutor(2) as executor:
+            s_states = list(executor.map(serializer.serialize_workflow,
+                                         workflows))
+        for workflow, s_state in zip(workflows, s_states):
+            self.assertEqual(
+                s_state, DictionarySerializer().serialize_workflow(workflow))
+            restored = serializer.deserialize_workflow(s_state)
+            for task in workflow.get_tasks():
+                self.assertEqual(restored.get_task(task.id).data, task.data)
+
 
 def suite():
     return unittest.defaultTestLoader.loadTestsFromTestCase(DictionarySerializerTest)
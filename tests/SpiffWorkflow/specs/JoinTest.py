@@ -8,8 +8,9 @@ import unittest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from .TaskSpecTest import TaskSpecTest
-from SpiffWorkflow.specs import Join
+from SpiffWorkflow.specs import Join, Simple, WorkflowSpec
 from SpiffWorkflow import Workflow
+from SpiffWorkflow.task import Task
 
 
 class JoinTest(TaskSpecTest):
@@ -23,6 +24,32 @@ class JoinTest(TaskSpecTest):
                     'testtask',
                     description='foo')
 
+    def testLazyPredictionOfInputs(self):
+        wf_spec = WorkflowSpec()
+        join = Join(wf_spec, 'join')
+        for branch in 'abc':
+            previous = wf_spec.start
+            for idx in range(5):
+                task_spec = Simple(wf_spec, '%s_%d' % (branch, idx))
+                previous.connect(task_spec)
+                previous = task_spec
+            if branch != 'c':
+                previous.connect(join)
+
+        workflow = Workflow(wf_spec, lazy_prediction=True)
+        task_mapping = workflow.task_mapping
+        self.assertEqual(workflow.get_tasks_from_spec_name('b_4'), [])
+        for name in ('Start', 'a_0', 'a_1', 'a_2', 'a_3', 'a_4'):
+            workflow.get_tasks_from_spec_name(name)[0].complete()
+
+        # Checking the join predicts the branches that lead to it, and only
+        # those.
+        self.assertEqual(workflow.get_tasks_from_spec_name('join')[0].state,
+                         Task.WAITING)
+        self.assertEqual(len(workflow.get_tasks_from_spec_name('b_4')), 1)
+        self.assertEqual(workflow.get_tasks_from_spec_name('c_4'), [])
+        self.assertIs(workflow.task_mapping, task_mapping)
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(JoinTest)